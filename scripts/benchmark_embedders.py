@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding backends (embedders.py) on the Obsidian vault.
+
+Embeds the same sample of vault chunks with each backend and reports:
+- model load time, indexing throughput (chunks/s, chars/s)
+- single-query latency (p50/p95), the cost paid by every obsidian_search
+- recall@k: each sampled chunk's heading is used as a query, a hit counts
+  when a chunk of the same file is in the top k (brute-force cosine)
+- agreement@k between backends: overlap of their top-k files per query
+
+Usage:
+    python3 benchmark_embedders.py                          # openai vs local, 500 chunks
+    python3 benchmark_embedders.py --backends local --sample 2000 --k 10
+    python3 benchmark_embedders.py --queries gold.jsonl     # {"query", "file_path"} per line
+    python3 benchmark_embedders.py --json
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+from embedders import get_embedder
+from index_obsidian_vault_direct import VAULT_PATH, scan_vault, chunk_markdown
+
+# ANSI colors
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+BLUE = '\033[0;34m'
+BOLD = '\033[1m'
+NC = '\033[0m'
+
+BATCH_SIZE = 64  # chunks per embed_batch call
+LATENCY_QUERIES = 30  # queries embedded one at a time for latency
+
+def load_chunks(vault_path, sample, seed):
+    """[(rel_path, heading_path, text)] for a random sample of vault chunks."""
+    chunks = []
+    for rel_path, file_path in sorted(scan_vault(vault_path).items()):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for chunk in chunk_markdown(content):
+            chunks.append((rel_path, chunk['heading_path'], chunk['text']))
+
+    random.Random(seed).shuffle(chunks)
+    return chunks[:sample]
+
+def build_queries(chunks, queries_file, max_queries):
+    """[(query, file_path)]: from a gold file, else from chunk headings."""
+    if queries_file:
+        with open(queries_file, 'r') as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        return [(item['query'], item['file_path']) for item in items][:max_queries]
+
+    queries = {}
+    for rel_path, heading_path, _ in chunks:
+        if heading_path and len(heading_path[-1]) > 3:
+            queries.setdefault(heading_path[-1], rel_path)
+    return list(queries.items())[:max_queries]
+
+def normalize(vectors):
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def top_files(query_matrix, chunk_matrix, chunk_files, k):
+    """Top-k distinct files per query by cosine similarity."""
+    scores = query_matrix @ chunk_matrix.T
+    results = []
+    for row in scores:
+        files = []
+        for index in np.argsort(-row):
+            if chunk_files[index] not in files:
+                files.append(chunk_files[index])
+                if len(files) == k:
+                    break
+        results.append(files)
+    return results
+
+def bench_backend(backend, chunks, queries, k):
+    """Embed chunks + queries with one backend; returns (stats, top-k files per query)."""
+    texts = [text for _, _, text in chunks]
+    chunk_files = [rel_path for rel_path, _, _ in chunks]
+
+    start = time.time()
+    embedder = get_embedder(backend)
+    embedder.embed("warm-up")  # model download/load, TLS handshake
+    load_s = time.time() - start
+
+    start = time.time()
+    vectors = []
+    for i in range(0, len(texts), BATCH_SIZE):
+        vectors.extend(embedder.embed_batch(texts[i:i + BATCH_SIZE]))
+    index_s = time.time() - start
+
+    latencies = []
+    for query, _ in queries[:LATENCY_QUERIES]:
+        query_start = time.time()
+        embedder.embed(query)
+        latencies.append((time.time() - query_start) * 1000)
+    latencies.sort()
+
+    query_vectors = embedder.embed_batch([query for query, _ in queries]) if queries else []
+    ranked = top_files(normalize(query_vectors), normalize(vectors), chunk_files, k) if queries else []
+    hits = sum(1 for (_, target), files in zip(queries, ranked) if target in files)
+
+    stats = {
+        'backend': backend,
+        'model': embedder.name,
+        'dim': len(vectors[0]) if vectors else 0,
+        'load_s': round(load_s, 2),
+        'index_s': round(index_s, 2),
+        'chunks_per_s': round(len(texts) / index_s, 1) if index_s else None,
+        'chars_per_s': round(sum(len(text) for text in texts) / index_s) if index_s else None,
+        'query_p50_ms': round(latencies[len(latencies) // 2], 1) if latencies else None,
+        'query_p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1) if latencies else None,
+        f'recall@{k}': round(hits / len(queries), 3) if queries else None
+    }
+    return stats, ranked
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on the Obsidian vault")
+    parser.add_argument('--backends', default='openai,local', help="Comma-separated backends (default: openai,local)")
+    parser.add_argument('--vault', default=str(VAULT_PATH), help="Vault path")
+    parser.add_argument('--sample', type=int, default=500, help="Chunks to embed (default: 500)")
+    parser.add_argument('--max-queries', type=int, default=200, help="Queries to evaluate (default: 200)")
+    parser.add_argument('--queries', help="JSONL gold queries: {\"query\": ..., \"file_path\": ...}")
+    parser.add_argument('--k', type=int, default=5, help="Top-k files for recall/agreement (default: 5)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.vault, args.sample, args.seed)
+    if not chunks:
+        print(f"❌ No chunks found in {args.vault}", file=sys.stderr)
+        sys.exit(1)
+    queries = build_queries(chunks, args.queries, args.max_queries)
+
+    results = []
+    rankings = {}
+    for backend in [name.strip() for name in args.backends.split(',') if name.strip()]:
+        if not args.json:
+            print(f"{BLUE}⏱️  {backend}: embedding {len(chunks)} chunks, {len(queries)} queries...{NC}")
+        try:
+            stats, ranked = bench_backend(backend, chunks, queries, args.k)
+        except Exception as e:
+            stats, ranked = {'backend': backend, 'error': str(e)}, None
+        results.append(stats)
+        if ranked is not None:
+            rankings[backend] = ranked
+
+    # Agreement between the first two backends that ran
+    agreement = None
+    if len(rankings) >= 2 and queries:
+        first, second = list(rankings)[:2]
+        overlaps = [len(set(a) & set(b)) / args.k for a, b in zip(rankings[first], rankings[second])]
+        agreement = {'backends': [first, second], f'agreement@{args.k}': round(sum(overlaps) / len(overlaps), 3)}
+
+    report = {'chunks': len(chunks), 'queries': len(queries), 'k': args.k, 'results': results, 'agreement': agreement}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print()
+    print(f"{BOLD}{'='*70}{NC}")
+    print(f"{BOLD}Embedding Benchmark ({len(chunks)} chunks, {len(queries)} queries){NC}")
+    print(f"{BOLD}{'='*70}{NC}")
+    for stats in results:
+        if 'error' in stats:
+            print(f"{YELLOW}⚠️  {stats['backend']}: {stats['error']}{NC}")
+            continue
+        print(f"{GREEN}{stats['backend']}{NC} ({stats['model']}, {stats['dim']} dims)")
+        print(f"   Load: {stats['load_s']}s | Index: {stats['index_s']}s "
+              f"({stats['chunks_per_s']} chunks/s, {stats['chars_per_s']} chars/s)")
+        print(f"   Query latency: p50 {stats['query_p50_ms']}ms | p95 {stats['query_p95_ms']}ms")
+        print(f"   Recall@{args.k}: {stats[f'recall@{args.k}']}")
+    if agreement:
+        print(f"{BLUE}Agreement@{args.k} ({' vs '.join(agreement['backends'])}): "
+              f"{agreement[f'agreement@{args.k}']}{NC}")
+    print(f"{BOLD}{'='*70}{NC}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Benchmark the MCP servers end to end, driven the way an MCP client drives them.
+
+Launches mem0_mcp_server.py (remote) or mem0_mcp_server_local.py (local) as a
+subprocess and sends JSON-RPC tools/call over stdin/stdout, several requests
+in flight at once (the dispatcher answers them concurrently, tagged by id).
+Everything runs offline against stand-ins, in a throwaway HOME:
+- remote: mem0_api_standin.py in-process, as MEM0_API_URL (latency/failures injectable)
+- local: embedded Qdrant (QDRANT_LOCATION, no server), EMBEDDING_BACKEND=hash,
+  a synthetic vault in the keyword index and Qdrant, seeded memories
+
+Reports, per tool, p50/p95/p99/max latency and errors, plus throughput and
+startup (spawn -> initialize answered, first call of each tool, which on the
+local server includes the lazy client init).
+
+mem0_save is not in the local defaults: Memory.add() needs the LLM. When
+asked for, the server's OpenAI calls go to a dead local port and fail fast.
+
+Usage:
+    python3 benchmark_mcp_servers.py                        # remote server, 200 calls, concurrency 4
+    python3 benchmark_mcp_servers.py --server local --requests 500 --concurrency 8
+    python3 benchmark_mcp_servers.py --tools mem0_save,mem0_queue_status --api-latency-ms 40
+    python3 benchmark_mcp_servers.py --server local --obsidian-mode keyword --json
+    python3 benchmark_mcp_servers.py --output before.json   # keep the JSON report to compare runs
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import argparse
+import itertools
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from mem0_api_standin import Mem0StandIn, serve
+
+# ANSI colors
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+RED = '\033[0;31m'
+BLUE = '\033[0;34m'
+BOLD = '\033[1m'
+NC = '\033[0m'
+
+SCRIPT_DIR = Path(__file__).parent
+SERVERS = {
+    'remote': SCRIPT_DIR / "mem0_mcp_server.py",
+    'local': SCRIPT_DIR / "mem0_mcp_server_local.py",
+}
+DEFAULT_TOOLS = {
+    'remote': ["mem0_save", "mem0_recall", "mem0_search", "mem0_queue_status"],
+    'local': ["obsidian_search", "mem0_recall", "mem0_search", "mem0_health"],
+}
+PROJECT = "benchmark-project"
+REQUEST_TIMEOUT = 120  # seconds per call (the first local call waits for client init)
+DEAD_OPENAI_URL = "http://127.0.0.1:9/v1"  # discard port: LLM calls fail at once, never billed
+
+VOCABULARY = (
+    "qdrant mem0 obsidian vault embedding index chunk search recall memory project docker deploy "
+    "vps queue worker retry backoff latency cache session hook config migration backup restore "
+    "python script server client transport batch upload health monitor keyword hybrid vector "
+    "collection payload manifest watcher sqlite journal checkpoint architecture decision pattern "
+    "guide api token model throughput benchmark startup profile"
+).split()
+
+class McpClient:
+    """JSON-RPC over a server's stdin/stdout; requests from many threads, matched by id"""
+
+    def __init__(self, command: list, env: dict, stderr):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr,
+                                        env=env, text=True, bufsize=1)
+        self.ids = itertools.count(1)
+        self.pending = {}  # id -> [Event, response]
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read, name="mcp-reader", daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue  # not ours (the protocol only allows JSON-RPC on stdout)
+            with self.lock:
+                waiter = self.pending.pop(message.get('id'), None)
+            if waiter:
+                waiter[1] = message
+                waiter[0].set()
+
+        # Server exited: release everyone still waiting
+        with self.lock:
+            waiters, self.pending = list(self.pending.values()), {}
+        for waiter in waiters:
+            waiter[0].set()
+
+    def request(self, method: str, params: dict = None, timeout: float = REQUEST_TIMEOUT) -> dict:
+        """Response message, or {'error': ...} on timeout / server exit"""
+        id = next(self.ids)
+        waiter = [threading.Event(), None]
+        with self.lock:
+            self.pending[id] = waiter
+        message = json.dumps({"jsonrpc": "2.0", "id": id, "method": method, "params": params or {}})
+        try:
+            with self.write_lock:
+                self.process.stdin.write(message + "\n")
+                self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            return {'error': {'message': "server stdin closed"}}
+
+        if not waiter[0].wait(timeout):
+            with self.lock:
+                self.pending.pop(id, None)
+            return {'error': {'message': f"timeout after {timeout}s"}}
+        return waiter[1] or {'error': {'message': "server exited"}}
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+def call_failed(response: dict) -> str:
+    """Error message of a tools/call response, '' when it succeeded"""
+    if 'error' in response:
+        return response['error'].get('message', 'error')
+    content = response.get('result', {}).get('content') or [{}]
+    text = content[0].get('text', '')
+    return text.splitlines()[0] if text.startswith(("❌", "Error")) else ""
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def tool_arguments(tool: str, index: int, rng: random.Random, obsidian_mode: str) -> dict:
+    if tool == "mem0_save":
+        return {"project_id": PROJECT, "content": f"Benchmark memory {index}: {sentence(rng)}"}
+    if tool == "mem0_recall":
+        return {"project_id": PROJECT, "limit": 20}
+    if tool == "mem0_search":
+        return {"project_id": PROJECT, "query": sentence(rng, 3), "limit": 10}
+    if tool == "obsidian_search":
+        return {"query": sentence(rng, 3), "limit": 5, "mode": obsidian_mode}
+    return {}
+
+def synthetic_note(index: int, rng: random.Random) -> str:
+    sections = [f"# Note {index}: {sentence(rng, 3)}\n\n{sentence(rng, 40)}\n"]
+    for section in range(rng.randint(1, 4)):
+        paragraphs = "\n\n".join(sentence(rng, 60) for _ in range(rng.randint(1, 3)))
+        sections.append(f"## {sentence(rng, 2)} {section}\n\n{paragraphs}\n")
+    return "\n".join(sections)
+
+def seed_local(home: Path, qdrant_path: Path, embedder, notes: int, memories: int, seed: int) -> dict:
+    """Synthetic vault (keyword index + Qdrant) and Mem0 memories, before the server opens Qdrant"""
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, VectorParams, PointStruct
+    from obsidian_keyword_index import KeywordIndex
+    from index_obsidian_vault_direct import build_docs
+    from mem0_points import memory_point
+
+    rng = random.Random(seed)
+    keyword_index = KeywordIndex(home / ".claude/obsidian_keyword_index.db")
+    client = QdrantClient(path=str(qdrant_path))
+    obsidian_collection = embedder.collection("obsidian_vault")
+    mem0_collection = embedder.collection("mem0")
+    for collection in (obsidian_collection, mem0_collection):
+        client.create_collection(collection, vectors_config=VectorParams(size=embedder.dim, distance=Distance.COSINE))
+
+    chunks = 0
+    for index in range(notes):
+        rel_path = f"benchmark/note_{index:04d}.md"
+        docs = build_docs(rel_path, str(home / "vault" / rel_path), synthetic_note(index, rng))
+        keyword_index.replace_file(rel_path, [(doc['id'], doc['text'], doc['payload']) for doc in docs])
+        vectors = embedder.embed_batch([doc['text'] for doc in docs])
+        client.upsert(obsidian_collection, points=[
+            PointStruct(id=doc['id'], vector=vector, payload=doc['payload']) for doc, vector in zip(docs, vectors)
+        ])
+        chunks += len(docs)
+
+    texts = [f"Benchmark memory {index}: {sentence(rng)}" for index in range(memories)]
+    vectors = embedder.embed_batch(texts)
+    client.upsert(mem0_collection, points=[
+        PointStruct(**memory_point(PROJECT, {'id': str(uuid.uuid4()), 'memory': text}, vector, source='benchmark'))
+        for text, vector in zip(texts, vectors)
+    ])
+    client.close()  # embedded Qdrant: one process at a time
+    return {'notes': notes, 'chunks': chunks, 'memories': memories}
+
+def latency_stats(latencies: list) -> dict:
+    """Nearest-rank percentiles, in ms"""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def percentile(q):
+        return round(ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))] * 1000, 2)
+
+    return {
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+def run_benchmark(args, home: Path) -> dict:
+    env = dict(os.environ, HOME=str(home), MEM0_TELEMETRY="False", PYTHONUNBUFFERED="1")
+    if args.server_workers:
+        env['MCP_MAX_WORKERS'] = str(args.server_workers)
+    (home / ".claude").mkdir(parents=True, exist_ok=True)
+    report = {'server': args.server, 'concurrency': args.concurrency, 'requests': args.requests}
+
+    standin = api_server = None
+    if args.server == 'remote':
+        standin = Mem0StandIn(args.api_latency_ms, args.api_jitter_ms, seed=args.seed)
+        rng = random.Random(args.seed)
+        for index in range(args.memories):
+            standin.store(PROJECT, f"Benchmark memory {index}: {sentence(rng)}")
+        standin.failure_rate = args.failure_rate  # seeded memories never fail
+        api_server = serve(standin, port=0)
+        env['MEM0_API_URL'] = f"http://127.0.0.1:{api_server.server_address[1]}"
+        report['standins'] = {'mem0_api': env['MEM0_API_URL'], 'api_latency_ms': args.api_latency_ms,
+                              'memories': args.memories}
+    else:
+        from embedders import HashEmbedder
+        embedder = HashEmbedder(args.hash_dim)
+        qdrant_path = home / "qdrant"
+        seeded = seed_local(home, qdrant_path, embedder, args.notes, args.memories, args.seed)
+        env.update(EMBEDDING_BACKEND="hash", HASH_EMBEDDING_DIM=str(embedder.dim), QDRANT_LOCATION=str(qdrant_path),
+                   OPENAI_API_KEY=os.getenv("OPENAI_API_KEY") or "sk-benchmark", OPENAI_BASE_URL=DEAD_OPENAI_URL)
+        report['standins'] = dict(seeded, qdrant="embedded", embedder=embedder.name)
+
+    log_file = open(home / "server.log", "w")
+    start = time.perf_counter()
+    client = McpClient([sys.executable, str(SERVERS[args.server])], env, log_file)
+    try:
+        response = client.request("initialize", {"protocolVersion": "2024-11-05", "capabilities": {},
+                                                 "clientInfo": {"name": "benchmark", "version": "1.0"}})
+        initialize_s = time.perf_counter() - start
+        if 'error' in response:
+            raise RuntimeError(f"initialize failed: {response['error'].get('message')}")
+        t0 = time.perf_counter()
+        tools_list = client.request("tools/list")
+        tools_list_s = time.perf_counter() - t0
+
+        available = {tool['name'] for tool in tools_list.get('result', {}).get('tools', [])}
+        unknown = [tool for tool in args.tools if tool not in available]
+        if unknown:
+            raise RuntimeError(f"{args.server} server has no tool {', '.join(unknown)}")
+
+        # Cold calls: one per tool, in order (the local server builds its clients here)
+        rng = random.Random(args.seed)
+        first_call = {}
+        for tool in args.tools:
+            t0 = time.perf_counter()
+            client.request("tools/call", {"name": tool, "arguments": tool_arguments(tool, -1, rng, args.obsidian_mode)})
+            first_call[tool] = round((time.perf_counter() - t0) * 1000, 2)
+        report['startup'] = {
+            'initialize_ms': round(initialize_s * 1000, 2),
+            'tools_list_ms': round(tools_list_s * 1000, 2),
+            'first_call_ms': first_call,
+            'ready_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+        for index in range(args.warmup):
+            tool = args.tools[index % len(args.tools)]
+            client.request("tools/call", {"name": tool, "arguments": tool_arguments(tool, index, rng, args.obsidian_mode)})
+
+        workload = [(tool, tool_arguments(tool, index, rng, args.obsidian_mode))
+                    for index, tool in zip(range(args.requests), itertools.cycle(args.tools))]
+        results = {tool: {'latencies': [], 'errors': []} for tool in args.tools}
+
+        def call(item):
+            tool, arguments = item
+            t0 = time.perf_counter()
+            response = client.request("tools/call", {"name": tool, "arguments": arguments})
+            return tool, time.perf_counter() - t0, call_failed(response)
+
+        if standin:
+            standin.stats = dict.fromkeys(standin.stats, 0)  # count the measured calls only
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for tool, seconds, error in pool.map(call, workload):
+                results[tool]['latencies'].append(seconds)
+                if error:
+                    results[tool]['errors'].append(error)
+        wall = time.perf_counter() - wall_start
+    finally:
+        client.close()
+        log_file.close()
+        if api_server:
+            api_server.shutdown()
+
+    all_latencies = []
+    report['tools'] = {}
+    for tool, result in results.items():
+        all_latencies += result['latencies']
+        report['tools'][tool] = dict(count=len(result['latencies']), errors=len(result['errors']),
+                                     **latency_stats(result['latencies']))
+        if result['errors']:
+            report['tools'][tool]['first_error'] = result['errors'][0]
+    report['total'] = dict(count=len(all_latencies), elapsed_s=round(wall, 3),
+                           throughput_rps=round(len(all_latencies) / wall, 1) if wall else 0,
+                           errors=sum(len(result['errors']) for result in results.values()),
+                           **latency_stats(all_latencies))
+    if standin:
+        report['standins']['api_stats'] = dict(standin.stats)
+    return report
+
+def print_report(report: dict):
+    print()
+    print(f"{BOLD}{'='*70}{NC}")
+    print(f"{BOLD}MCP Server Benchmark: {report['server']} "
+          f"({report['requests']} calls, concurrency {report['concurrency']}){NC}")
+    print(f"{BOLD}{'='*70}{NC}")
+    startup = report['startup']
+    print(f"{BLUE}Startup:{NC} initialize {startup['initialize_ms']}ms | tools/list {startup['tools_list_ms']}ms"
+          f" | ready after first calls {startup['ready_ms']}ms")
+    for tool, ms in startup['first_call_ms'].items():
+        print(f"   first {tool}: {ms}ms")
+    print()
+    print(f"{'Tool':<20} {'Calls':>6} {'Errors':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    print("-" * 73)
+    for tool, stats in list(report['tools'].items()) + [('TOTAL', report['total'])]:
+        color = RED if stats['errors'] else GREEN
+        print(f"{color}{tool:<20}{NC} {stats['count']:>6} {stats['errors']:>7} {stats.get('p50_ms', 0):>7}ms "
+              f"{stats.get('p95_ms', 0):>7}ms {stats.get('p99_ms', 0):>7}ms {stats.get('max_ms', 0):>7}ms")
+    print("-" * 73)
+    print(f"{BLUE}Throughput:{NC} {report['total']['throughput_rps']} calls/s over {report['total']['elapsed_s']}s")
+    for tool, stats in report['tools'].items():
+        if stats.get('first_error'):
+            print(f"{YELLOW}⚠️  {tool}: {stats['first_error']}{NC}")
+    print(f"{BOLD}{'='*70}{NC}")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark of the MCP servers, offline")
+    parser.add_argument('--server', choices=sorted(SERVERS), default='remote')
+    parser.add_argument('--tools', help="Comma-separated tools, called round-robin (default per server)")
+    parser.add_argument('--requests', type=int, default=200, help="Measured tool calls")
+    parser.add_argument('--concurrency', type=int, default=4, help="Calls in flight at once")
+    parser.add_argument('--warmup', type=int, default=10, help="Unmeasured calls after the first ones")
+    parser.add_argument('--server-workers', type=int, help="MCP_MAX_WORKERS of the server (default: its own)")
+    parser.add_argument('--api-latency-ms', type=float, default=20, help="Remote: stand-in latency per request")
+    parser.add_argument('--api-jitter-ms', type=float, default=5, help="Remote: stand-in latency jitter")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Remote: stand-in failure probability")
+    parser.add_argument('--memories', type=int, default=200, help="Memories seeded for recall/search")
+    parser.add_argument('--notes', type=int, default=200, help="Local: synthetic vault notes")
+    parser.add_argument('--hash-dim', type=int, help="Local: stub embedder dimensions")
+    parser.add_argument('--obsidian-mode', choices=["hybrid", "keyword", "vector"], default="hybrid")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary HOME (server.log, queue, Qdrant)")
+    args = parser.parse_args()
+    args.tools = args.tools.split(",") if args.tools else DEFAULT_TOOLS[args.server]
+
+    home = Path(tempfile.mkdtemp(prefix="mcp_benchmark_"))
+    if not args.json:
+        print(f"{BLUE}⏱️  {args.server} server: {args.requests} calls of {', '.join(args.tools)}...{NC}")
+    try:
+        report = run_benchmark(args, home)
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}", file=sys.stderr)
+        log = home / "server.log"
+        if log.exists():
+            print("".join(log.read_text().splitlines(keepends=True)[-20:]), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.keep:
+            print(f"📁 Kept {home}", file=sys.stderr)
+        else:
+            shutil.rmtree(home, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
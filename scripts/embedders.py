@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Embedders - Pluggable embedding backends
+Used by index_obsidian_vault_direct.py, mem0_mcp_server_local.py and search_obsidian.py
+
+Backends (EMBEDDING_BACKEND, from the environment or ~/.claude/.env):
+- openai (default): text-embedding-3-small over the network, 1536 dims
+- local: CPU-only sentence-transformers model, batched on a thread pool,
+  no network once the model is downloaded (pip install sentence-transformers)
+- hash: deterministic feature hashing of words, no model and no network
+  (stand-in for tests and benchmark_mcp_servers.py, not for real search)
+
+Vectors of different backends cannot share a Qdrant collection, so each
+backend gets its own collection name (the OpenAI one keeps the historic names).
+
+    embedder = get_embedder()
+    vectors = embedder.embed_batch(["text", ...])
+    collection = embedder.collection("obsidian_vault")
+"""
+
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Configuration
+ENV_FILE = Path.home() / ".claude" / ".env"
+OPENAI_MODEL = "text-embedding-3-small"
+OPENAI_DIM = 1536
+OPENAI_MAX_RETRIES = 6  # attempts per batch on rate limits / transient errors
+LOCAL_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"  # French + English notes
+LOCAL_BATCH_SIZE = 32  # texts per encode() call
+HASH_DIM = 256
+MAX_INPUT_CHARS = 8000
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~3 chars/token keeps accented French text safe)"""
+    return len(text) // 3 + 1
+
+def load_setting(name: str, default: str = "") -> str:
+    """Environment variable, else KEY=value from ~/.claude/.env, else default"""
+    value = os.getenv(name, "")
+    if value:
+        return value
+    if ENV_FILE.exists():
+        for line in ENV_FILE.read_text().splitlines():
+            if line.startswith(f"{name}="):
+                return line.split("=", 1)[1].strip()
+    return default
+
+class Embedder(ABC):
+    """Interface: name (cache/manifest key), dim, embed_batch(texts)"""
+
+    backend = "base"
+    name = ""
+    dim = 0
+
+    @abstractmethod
+    def embed_batch(self, texts: list) -> list:
+        """One vector per text, in order"""
+
+    def embed(self, text: str) -> list:
+        return self.embed_batch([text])[0]
+
+    def collection(self, base: str) -> str:
+        """Qdrant collection holding this embedder's vectors"""
+        slug = re.sub(r"[^a-z0-9]+", "_", self.name.split("/")[-1].lower()).strip("_")
+        return f"{base}_{self.backend}_{slug}"
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI embeddings API, with backoff on rate limits (honours Retry-After)"""
+
+    backend = "openai"
+
+    def __init__(self, api_key: str = None, model: str = OPENAI_MODEL, dim: int = OPENAI_DIM,
+                 timeout: float = None):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key if api_key is not None else load_setting("OPENAI_API_KEY"))
+        self.name = model
+        self.dim = dim
+        self.timeout = timeout
+
+    def collection(self, base: str) -> str:
+        return base  # historic collections were built with text-embedding-3-small
+
+    def embed_batch(self, texts: list, timeout: float = None) -> list:
+        from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+
+        inputs = [text[:MAX_INPUT_CHARS] for text in texts]
+        options = {}
+        if timeout or self.timeout:
+            options["timeout"] = timeout or self.timeout
+
+        for attempt in range(OPENAI_MAX_RETRIES):
+            try:
+                response = self.client.embeddings.create(model=self.name, input=inputs, **options)
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as e:
+                if options.get("timeout"):
+                    raise  # Interactive caller: fail fast, it has a fallback
+                # Honour Retry-After when the API sends it, else exponential + jitter
+                retry_after = None
+                headers = getattr(getattr(e, 'response', None), 'headers', None) or {}
+                try:
+                    retry_after = float(headers.get('retry-after'))
+                except (TypeError, ValueError):
+                    pass
+                delay = retry_after or min(60, 2 ** attempt) + random.uniform(0, 1)
+                print(f"⏳ Embedding backoff {delay:.1f}s ({type(e).__name__})")
+                time.sleep(delay)
+
+        raise RuntimeError(f"Embedding batch failed after {OPENAI_MAX_RETRIES} attempts")
+
+class LocalEmbedder(Embedder):
+    """sentence-transformers on CPU; large inputs are split across a thread pool"""
+
+    backend = "local"
+
+    def __init__(self, model: str = None, threads: int = None, batch_size: int = LOCAL_BATCH_SIZE):
+        self.name = model or load_setting("LOCAL_EMBEDDING_MODEL", LOCAL_MODEL)
+        self.threads = threads or int(load_setting("LOCAL_EMBEDDING_THREADS", "2"))
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="embed")
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise RuntimeError("Local embeddings need sentence-transformers: pip install sentence-transformers")
+                self._model = SentenceTransformer(self.name, device="cpu")
+        return self._model
+
+    @property
+    def dim(self) -> int:
+        return self._load().get_sentence_embedding_dimension()
+
+    def _encode(self, texts: list) -> list:
+        vectors = self._load().encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.tolist()
+
+    def embed_batch(self, texts: list, timeout: float = None) -> list:
+        inputs = [text[:MAX_INPUT_CHARS] for text in texts]
+        if len(inputs) <= self.batch_size:
+            return self._encode(inputs)
+
+        # torch releases the GIL while encoding, sub-batches run in parallel
+        batches = [inputs[i:i + self.batch_size] for i in range(0, len(inputs), self.batch_size)]
+        vectors = []
+        for result in self._pool.map(self._encode, batches):
+            vectors.extend(result)
+        return vectors
+
+    def mem0_config(self) -> dict:
+        """Mem0 'embedder' section for this model (Mem0's huggingface provider)"""
+        return {'provider': 'huggingface', 'config': {'model': self.name}}
+
+class HashEmbedder(Embedder):
+    """Signed feature hashing of lowercase words, L2-normalized (stand-in only)"""
+
+    backend = "hash"
+
+    def __init__(self, dim: int = None):
+        self.dim = dim or int(load_setting("HASH_EMBEDDING_DIM", str(HASH_DIM)))
+        self.name = f"feature-hash-{self.dim}"
+
+    def _vector(self, text: str) -> list:
+        vector = [0.0] * self.dim
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_batch(self, texts: list, timeout: float = None) -> list:
+        return [self._vector(text[:MAX_INPUT_CHARS]) for text in texts]
+
+    def mem0_config(self):
+        """Mem0 has no provider for it: swap mem0_embedder() in after Memory.from_config"""
+        return None
+
+    def mem0_embedder(self):
+        return Mem0EmbedderAdapter(self)
+
+class Mem0EmbedderAdapter:
+    """Mem0's embedding_model interface (embed(text, memory_action)) over an Embedder"""
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+
+    def embed(self, text, memory_action=None):
+        return self.embedder.embed(text)
+
+    def embed_batch(self, texts, memory_action=None):
+        return self.embedder.embed_batch(list(texts))
+
+BACKENDS = {
+    "openai": OpenAIEmbedder,
+    "local": LocalEmbedder,
+    "hash": HashEmbedder,
+}
+
+def get_embedder(backend: str = None, **kwargs) -> Embedder:
+    """Embedder selected by EMBEDDING_BACKEND (openai | local | hash)"""
+    backend = (backend or load_setting("EMBEDDING_BACKEND", "openai")).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}' (expected: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](**kwargs)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Embedding Cache - Persistent query-embedding cache
+Used by mem0_mcp_server_local.py (mem0_search, obsidian_search) and search_obsidian.py
+
+Key: sha256(model + normalized text), normalized = NFC + collapsed whitespace
+Front: in-memory LRU (OrderedDict)
+Back: SQLite (WAL) at ~/.claude/embedding_cache.db, vectors stored as float32 blobs
+
+Repeated queries from /start and agent loops skip the embeddings API entirely.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+# Configuration
+CACHE_DB = Path.home() / ".claude/embedding_cache.db"
+MEMORY_SIZE = 1024  # vectors kept in the in-memory LRU
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize and collapse whitespace so trivial variants share a key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+class EmbeddingCache:
+    """LRU in memory + SQLite on disk, with hit/miss counters"""
+
+    def __init__(self, db_file: Path = CACHE_DB, memory_size: int = MEMORY_SIZE):
+        self.db_file = Path(db_file)
+        self.memory_size = memory_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_file), timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+                "vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: str, vector: list):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_size:
+            self._lru.popitem(last=False)
+
+    def get(self, model: str, text: str):
+        """Cached vector or None"""
+        key = cache_key(model, text)
+
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return self._lru[key]
+
+            try:
+                row = self._db().execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            vector = array('f', row[0]).tolist()
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+    def put(self, model: str, text: str, vector: list):
+        key = cache_key(model, text)
+
+        with self._lock:
+            self._remember(key, list(vector))
+            try:
+                self._db().execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, len(vector), array('f', vector).tobytes(), time.time())
+                )
+                self._db().commit()
+            except sqlite3.Error:
+                pass  # Disk cache is best effort, the LRU still has it
+
+    def get_or_create(self, model: str, text: str, create) -> list:
+        """Return the cached vector, or call create(text) and cache its result"""
+        vector = self.get(model, text)
+        if vector is None:
+            vector = create(text)
+            if vector:
+                self.put(model, text, vector)
+        return vector
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self._lru)
+        }
+
+class CachedSearchEmbedder:
+    """Wrap a Mem0 embedder so query embeddings ("search" action) hit the cache"""
+
+    def __init__(self, embedder, model: str, cache: EmbeddingCache):
+        self._embedder = embedder
+        self._model = model
+        self._cache = cache
+
+    def embed(self, text, *args, **kwargs):
+        action = kwargs.get("memory_action", args[0] if args else None)
+        if action != "search" or not isinstance(text, str):
+            return self._embedder.embed(text, *args, **kwargs)
+        return self._cache.get_or_create(self._model, text, lambda t: self._embedder.embed(t, *args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._embedder, name)
@@ -2,35 +2,75 @@
 """
 Index Obsidian vault markdown files directly into Qdrant (bypassing Mem0).
 
-Uses OpenAI embeddings + Qdrant client directly for faster, simpler indexation.
+Uses the configured embedder (embedders.py: OpenAI by default, or a local
+CPU model with EMBEDDING_BACKEND=local) + Qdrant client directly for faster,
+simpler indexation. Each backend has its own collection and manifest.
+
+Notes are split into chunks on headings and paragraph boundaries (with
+overlap), one point per chunk carrying heading_path, char_start/char_end and
+the parent file_path, so long notes are searchable past their first screens.
+
+Incremental by default: a manifest of (rel_path, mtime, size, sha256, point_ids)
+means only new or changed files are embedded, and points of removed files
+are deleted. A file that moved with unchanged content (same sha256) has its
+points re-keyed to the new path without re-embedding.
+
+Every chunk is also written to the local BM25 keyword index
+(obsidian_keyword_index.py) used for hybrid search.
+
+Embeddings are requested in batches packed up to a token budget, several
+batches in flight at once (with rate-limit backoff), and a separate thread
+upserts finished batches into Qdrant while the next ones are embedded.
+
+index_files() re-indexes only a given set of changed/deleted/moved paths;
+obsidian_vault_watcher.py imports it and keeps the clients warm.
+
+Usage:
+    python3 index_obsidian_vault_direct.py             # incremental
+    python3 index_obsidian_vault_direct.py --full      # re-embed every file
+    python3 index_obsidian_vault_direct.py --prune     # + drop points whose file_path is gone
+    python3 index_obsidian_vault_direct.py --recreate  # drop collection + full rebuild
 """
 
 import os
 import sys
+import json
+import queue
+import re
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from openai import OpenAI
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import Distance, VectorParams, PointStruct, PointIdsList
+from obsidian_keyword_index import KeywordIndex
+from embedders import get_embedder, estimate_tokens
 
 # Configuration
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
 VAULT_PATH = Path.home() / "Documents/APP_HOME/CascadeProjects/windsurf-project/Memories/vault"
-COLLECTION_NAME = "obsidian_vault"
+BASE_COLLECTION = "obsidian_vault"
+MANIFEST_FILE = Path.home() / ".claude/obsidian_index_manifest.json"
+
+# Set by init_clients() from the configured embedder
+COLLECTION_NAME = BASE_COLLECTION
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIM = 1536
 
-# OpenAI API Key
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
-if not OPENAI_API_KEY:
-    env_file = Path.home() / ".claude" / ".env"
-    if env_file.exists():
-        for line in env_file.read_text().splitlines():
-            if line.startswith('OPENAI_API_KEY='):
-                OPENAI_API_KEY = line.split('=', 1)[1].strip()
-                break
+# Chunking
+CHUNK_SIZE = 2000  # max chars per chunk
+CHUNK_OVERLAP = 200  # chars repeated at the start of the next chunk of a section
+CHUNK_MIN_CHARS = 200  # smaller sections are merged into the next one
+CHUNKING = f"headings-v1/{CHUNK_SIZE}/{CHUNK_OVERLAP}"  # manifest tag, change forces re-embed
+
+# Embedding batcher
+EMBED_BATCH_TOKENS = 100_000  # estimated tokens per embeddings request
+EMBED_BATCH_MAX_INPUTS = 256  # inputs per embeddings request
+EMBED_CONCURRENCY = 4  # batches in flight
+UPSERT_BATCH = 64  # points per Qdrant upsert
+SCROLL_BATCH = 1000  # points per page when scrolling the collection (--prune)
 
 # ANSI colors
 RED = '\033[0;31m'
@@ -40,14 +80,32 @@ BLUE = '\033[0;34m'
 BOLD = '\033[1m'
 NC = '\033[0m'
 
-# Initialize clients
-try:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    qdrant_client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
-    print(f"{GREEN}✅ Clients initialized (OpenAI + Qdrant){NC}")
-except Exception as e:
-    print(f"{RED}❌ Failed to initialize: {e}{NC}")
-    sys.exit(1)
+# Clients, created on first use and kept warm by long-running callers (watcher)
+embedder = None
+qdrant_client = None
+keyword_index = KeywordIndex()  # local BM25 mirror of the chunks (~/.claude/obsidian_keyword_index.db)
+
+def init_clients():
+    """Initialize the embedder + Qdrant client once. Returns False on failure."""
+    global embedder, qdrant_client, COLLECTION_NAME, EMBEDDING_MODEL, EMBEDDING_DIM, MANIFEST_FILE
+    if embedder is not None and qdrant_client is not None:
+        return True
+
+    try:
+        embedder = get_embedder()
+        qdrant_client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+
+        COLLECTION_NAME = embedder.collection(BASE_COLLECTION)
+        EMBEDDING_MODEL = embedder.name
+        EMBEDDING_DIM = embedder.dim
+        if COLLECTION_NAME != BASE_COLLECTION:
+            MANIFEST_FILE = MANIFEST_FILE.with_name(f"obsidian_index_manifest.{COLLECTION_NAME}.json")
+
+        print(f"{GREEN}✅ Clients initialized ({embedder.backend}: {EMBEDDING_MODEL} + Qdrant){NC}")
+        return True
+    except Exception as e:
+        print(f"{RED}❌ Failed to initialize: {e}{NC}")
+        return False
 
 def extract_project_from_path(rel_path):
     """Extract project ID from file path."""
@@ -64,26 +122,524 @@ def extract_project_from_path(rel_path):
 
     return 'SecondBrain'
 
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+
+def split_sections(content):
+    """Split markdown into (heading_path, start, end) sections on headings."""
+    sections = []
+    stack = []  # [(level, title)]
+    start = 0
+    path = []
+    in_fence = False
+    offset = 0
+
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith('```') or stripped.startswith('~~~'):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(stripped)
+        if match:
+            if offset > start:
+                sections.append((path, start, offset))
+            level = len(match.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, match.group(2)))
+            path = [title for _, title in stack]
+            start = offset
+        offset += len(line)
+
+    if offset > start:
+        sections.append((path, start, offset))
+
+    # Merge heading-only / tiny sections into the next one (keeps its deeper path)
+    merged = []
+    carry = None
+    for path, start, end in sections:
+        if carry is not None:
+            start = carry
+            carry = None
+        if end - start < CHUNK_MIN_CHARS:
+            carry = start
+            continue
+        merged.append((path, start, end))
+    if carry is not None:
+        if merged:
+            path, start, _ = merged.pop()
+            merged.append((path, start, len(content)))
+        else:
+            merged.append((sections[-1][0], carry, len(content)))
+
+    return merged
+
+def chunk_markdown(content):
+    """Chunk a note: sections by heading, long sections by paragraph with overlap.
+
+    Returns [{'text', 'heading_path', 'char_start', 'char_end'}].
+    """
+    chunks = []
+    for path, start, end in split_sections(content):
+        pos = start
+        while pos < end:
+            cut = min(end, pos + CHUNK_SIZE)
+            if cut < end:
+                # Prefer a paragraph break, then a line break, then a space
+                floor = pos + CHUNK_SIZE // 2
+                for sep in ('\n\n', '\n', ' '):
+                    boundary = content.rfind(sep, floor, cut)
+                    if boundary != -1:
+                        cut = boundary + len(sep)
+                        break
+
+            text = content[pos:cut]
+            if text.strip():
+                chunks.append({
+                    'text': text,
+                    'heading_path': path,
+                    'char_start': pos,
+                    'char_end': cut
+                })
+            if cut >= end:
+                break
+
+            # Next chunk repeats the tail of this one, starting on a word boundary
+            next_pos = max(cut - CHUNK_OVERLAP, pos + 1)
+            word_start = content.find(' ', next_pos, cut - CHUNK_OVERLAP // 2)
+            pos = word_start + 1 if word_start != -1 else next_pos
+
+    return chunks
+
+def create_embeddings(texts):
+    """Embed a list of texts in one call (the embedder handles rate-limit backoff)."""
+    return embedder.embed_batch(texts)
+
 def create_embedding(text):
-    """Create embedding using OpenAI."""
+    """Create embedding using the configured embedder."""
     try:
-        response = openai_client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text[:8000]  # Limit to 8k chars
-        )
-        return response.data[0].embedding
+        return create_embeddings([text])[0]
     except Exception as e:
         print(f"{RED}Embedding error: {e}{NC}")
         return None
 
+def pack_batches(docs):
+    """Group docs into embedding requests under the token/input budget."""
+    batch = []
+    batch_tokens = 0
+    for doc in docs:
+        tokens = estimate_tokens(doc['text'][:8000])
+        if batch and (batch_tokens + tokens > EMBED_BATCH_TOKENS or len(batch) >= EMBED_BATCH_MAX_INPUTS):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(doc)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+def embed_and_upsert(docs, on_file_done):
+    """Embed docs in concurrent batches and upsert them on a pipelined thread.
+
+    Each doc is {'id', 'text', 'payload', 'rel_path'}. on_file_done(rel_path)
+    is called once every point of that file has been upserted.
+    Returns (embedded_docs, error_count).
+    """
+    upsert_queue = queue.Queue(maxsize=EMBED_CONCURRENCY * 2)
+    remaining = {}
+    for doc in docs:
+        remaining[doc['rel_path']] = remaining.get(doc['rel_path'], 0) + 1
+    failed_files = set()
+    stats = {'upserted': 0, 'errors': 0}
+
+    def upserter():
+        points = []
+        rel_paths = []
+
+        def flush():
+            try:
+                qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
+                stats['upserted'] += len(points)
+                for rel_path in rel_paths:
+                    remaining[rel_path] -= 1
+                    if remaining[rel_path] == 0 and rel_path not in failed_files:
+                        on_file_done(rel_path)
+                print(f"{YELLOW}Uploaded {stats['upserted']}/{len(docs)}...{NC}")
+            except Exception as e:
+                print(f"{RED}Upsert error: {e}{NC}")
+                stats['errors'] += 1
+                failed_files.update(rel_paths)
+            points.clear()
+            rel_paths.clear()
+
+        while True:
+            item = upsert_queue.get()
+            if item is None:
+                break
+            for doc, vector in item:
+                points.append(PointStruct(id=doc['id'], vector=vector, payload=doc['payload']))
+                rel_paths.append(doc['rel_path'])
+                if len(points) >= UPSERT_BATCH:
+                    flush()
+        if points:
+            flush()
+
+    upsert_thread = threading.Thread(target=upserter, name="qdrant-upsert")
+    upsert_thread.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as pool:
+            futures = {
+                pool.submit(create_embeddings, [doc['text'] for doc in batch]): batch
+                for batch in pack_batches(docs)
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    print(f"{RED}Embedding error ({len(batch)} docs): {e}{NC}")
+                    stats['errors'] += 1
+                    failed_files.update(doc['rel_path'] for doc in batch)
+                    continue
+                upsert_queue.put(list(zip(batch, vectors)))
+    finally:
+        upsert_queue.put(None)
+        upsert_thread.join()
+
+    return stats['upserted'], stats['errors']
+
 def generate_point_id(file_path):
     """Generate deterministic point ID from file path."""
     hash_obj = hashlib.md5(file_path.encode())
     # Convert first 8 bytes to integer for Qdrant point ID
     return int.from_bytes(hash_obj.digest()[:8], byteorder='big')
 
-def index_vault(vault_path, recreate=False):
-    """Index all markdown files in vault."""
+def chunk_point_id(rel_path, index):
+    """Deterministic point ID of the index-th chunk of a file."""
+    return generate_point_id(f"{rel_path}#{index}")
+
+def entry_point_ids(entry):
+    """Point IDs recorded for a manifest entry (older manifests hold one point_id)."""
+    if 'point_ids' in entry:
+        return list(entry['point_ids'])
+    return [entry['point_id']] if 'point_id' in entry else []
+
+def load_manifest():
+    """Load {rel_path: {mtime, size, sha256, point_ids}} from the manifest file."""
+    try:
+        with open(MANIFEST_FILE, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    # A manifest built for another collection/model is useless
+    if data.get('collection') != COLLECTION_NAME or data.get('model') != EMBEDDING_MODEL:
+        return {}
+
+    files = data.get('files', {})
+    # Other chunking parameters: re-embed everything, but keep the point IDs
+    # so the old points are still cleaned up
+    if data.get('chunking') != CHUNKING:
+        for entry in files.values():
+            entry.update(mtime=None, sha256=None)
+    return files
+
+def save_manifest(files):
+    """Save the manifest atomically."""
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = MANIFEST_FILE.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump({
+            'collection': COLLECTION_NAME,
+            'model': EMBEDDING_MODEL,
+            'chunking': CHUNKING,
+            'updated_at': datetime.now().isoformat(),
+            'files': files
+        }, f)
+    tmp_file.replace(MANIFEST_FILE)
+
+def file_sha256(data):
+    """Content hash used to detect real changes behind an mtime bump."""
+    return hashlib.sha256(data).hexdigest()
+
+def scan_vault(vault_path, subdir=None):
+    """Map rel_path -> absolute path for every markdown file in the vault (or a subdir of it)."""
+    md_files = {}
+    for root, dirs, files in os.walk(subdir or vault_path):
+        if '.obsidian' in root:
+            continue
+        for file in files:
+            if file.endswith('.md'):
+                file_path = os.path.join(root, file)
+                md_files[os.path.relpath(file_path, vault_path)] = file_path
+    return md_files
+
+def delete_points(point_ids):
+    """Delete points from the collection (no-op for an empty list)."""
+    if point_ids:
+        qdrant_client.delete(
+            collection_name=COLLECTION_NAME,
+            points_selector=PointIdsList(points=list(point_ids))
+        )
+
+def ensure_collection(recreate=False):
+    """Create (or recreate) the collection. Returns whether it already existed."""
+    collections = qdrant_client.get_collections().collections
+    exists = any(c.name == COLLECTION_NAME for c in collections)
+
+    if exists:
+        if recreate:
+            print(f"{YELLOW}Recreating collection...{NC}")
+            qdrant_client.delete_collection(COLLECTION_NAME)
+            exists = False
+        else:
+            print(f"{YELLOW}Collection exists, will update existing points{NC}")
+
+    if not exists:
+        print(f"{GREEN}Creating collection...{NC}")
+        qdrant_client.create_collection(
+            collection_name=COLLECTION_NAME,
+            vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE)
+        )
+
+    return exists
+
+def rekey_file(old_rel_path, old_entry, rel_path, file_path, stat, manifest):
+    """Move a file's points to its new path, reusing the stored vectors.
+
+    Returns False when the old points are incomplete (caller re-embeds).
+    """
+    old_ids = entry_point_ids(old_entry)
+    records = qdrant_client.retrieve(
+        collection_name=COLLECTION_NAME,
+        ids=old_ids,
+        with_payload=True,
+        with_vectors=True
+    )
+    if not records or len(records) != len(old_ids):
+        return False
+
+    is_index = file_path.endswith('_INDEX.md')
+    points = []
+    for record in records:
+        payload = dict(record.payload)
+        payload.update(
+            file_path=rel_path,
+            full_path=str(file_path),
+            file_type="INDEX" if is_index else "DOC",
+            project_id=extract_project_from_path(rel_path),
+            indexed_at=datetime.now().isoformat()
+        )
+        point_id = chunk_point_id(rel_path, payload.get('chunk_index', 0))
+        points.append(PointStruct(id=point_id, vector=record.vector, payload=payload))
+
+    point_ids = [point.id for point in points]
+    for start in range(0, len(points), UPSERT_BATCH):
+        qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points[start:start + UPSERT_BATCH])
+    delete_points(set(old_ids) - set(point_ids))
+
+    manifest.pop(old_rel_path, None)
+    manifest[rel_path] = {
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'sha256': old_entry['sha256'],
+        'point_ids': point_ids
+    }
+    return True
+
+def moved_candidates(rel_paths, manifest):
+    """sha256 -> (rel_path, entry) for files that disappeared, to match moves."""
+    candidates = {}
+    for rel_path in rel_paths:
+        entry = manifest.get(rel_path)
+        if entry and entry.get('sha256') and entry_point_ids(entry):
+            candidates[entry['sha256']] = (rel_path, entry)
+    return candidates
+
+def build_docs(rel_path, file_path, content):
+    """One doc per chunk: {'id', 'rel_path', 'text', 'payload'}."""
+    is_index = file_path.endswith('_INDEX.md')
+    file_type = "INDEX" if is_index else "DOC"
+    project_id = extract_project_from_path(rel_path)
+
+    chunks = chunk_markdown(content)
+    docs = []
+    for index, chunk in enumerate(chunks):
+        heading = " > ".join(chunk['heading_path'])
+
+        # Create text for embedding (with metadata prefix)
+        text_for_embedding = f"""[OBSIDIAN:{file_type}] {rel_path}
+Project: {project_id}
+Section: {heading or '-'}
+
+{chunk['text']}"""
+
+        docs.append({
+            'id': chunk_point_id(rel_path, index),
+            'rel_path': rel_path,
+            'text': text_for_embedding,
+            'payload': {
+                'source': 'obsidian',
+                'file_path': rel_path,
+                'full_path': str(file_path),
+                'file_type': file_type,
+                'project_id': project_id,
+                'heading_path': chunk['heading_path'],
+                'chunk_index': index,
+                'chunk_count': len(chunks),
+                'char_start': chunk['char_start'],
+                'char_end': chunk['char_end'],
+                'indexed_at': datetime.now().isoformat(),
+                'content_preview': chunk['text'][:500]  # First 500 chars for preview
+            }
+        })
+    return docs
+
+def update_keyword_index(rel_path, file_docs):
+    """Mirror a file's chunks into the local BM25 index (no network involved)."""
+    keyword_index.replace_file(rel_path, [(doc['id'], doc['text'], doc['payload']) for doc in file_docs])
+
+def prepare_file(rel_path, file_path, manifest, docs, pending, moved_from=None):
+    """Queue the chunks of one file if it changed.
+
+    moved_from maps sha256 -> (old_rel_path, entry) of files that disappeared;
+    a new file with one of those hashes is re-keyed instead of re-embedded
+    (the candidate is consumed).
+    The keyword index is kept in step for moves, and back-filled for
+    unchanged files it does not know yet; queued files reach it in
+    commit_pending, once their points are in Qdrant.
+    Returns 'skipped' (unchanged), 'emptied' (points deleted), 'moved' or 'queued'.
+    """
+    stat = os.stat(file_path)
+    known = manifest.get(rel_path)
+
+    # Unchanged mtime + size: skip without reading the file
+    if (known and known['mtime'] == stat.st_mtime and known['size'] == stat.st_size
+            and keyword_index.has_file(rel_path)):
+        return 'skipped'
+
+    # Read file
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    sha256 = file_sha256(raw)
+    content = raw.decode('utf-8')
+
+    # Touched but identical content: refresh stat, keep the points
+    if known and known['sha256'] == sha256:
+        known.update(mtime=stat.st_mtime, size=stat.st_size)
+        if content.strip() and not keyword_index.has_file(rel_path):
+            update_keyword_index(rel_path, build_docs(rel_path, file_path, content))
+        return 'skipped'
+
+    # Same content as a file that disappeared: a move, keep the vectors
+    if not known and moved_from and sha256 in moved_from:
+        old_rel_path, old_entry = moved_from.pop(sha256)
+        if rekey_file(old_rel_path, old_entry, rel_path, file_path, stat, manifest):
+            keyword_index.remove_files([old_rel_path])
+            update_keyword_index(rel_path, build_docs(rel_path, file_path, content))
+            return 'moved'
+
+    # Skip empty files (and drop points indexed before they were emptied)
+    if not content.strip():
+        if known:
+            delete_points(entry_point_ids(known))
+            keyword_index.remove_files([rel_path])
+            del manifest[rel_path]
+            return 'emptied'
+        return 'skipped'
+
+    # One point per chunk, queued for the embedding batcher
+    file_docs = build_docs(rel_path, file_path, content)
+    docs.extend(file_docs)
+    pending[rel_path] = {
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'sha256': sha256,
+        'point_ids': [doc['id'] for doc in file_docs]
+    }
+    return 'queued'
+
+def commit_pending(docs, pending, manifest, previous):
+    """Embed + upsert queued chunks, then record the files in the manifest
+    and the keyword index.
+
+    Only files whose every chunk was upserted are recorded, so hybrid
+    search never fuses in keyword hits whose point is missing from Qdrant.
+    Returns (indexed_count, error_count).
+    """
+    if not docs:
+        return 0, 0
+
+    print(f"Embedding {len(docs)} chunks from {len(pending)} new/changed files...")
+    file_docs = {}
+    for doc in docs:
+        file_docs.setdefault(doc['rel_path'], []).append(doc)
+
+    indexed_files = []
+    _, error_count = embed_and_upsert(docs, indexed_files.append)
+    for rel_path in indexed_files:
+        manifest[rel_path] = pending[rel_path]
+        update_keyword_index(rel_path, file_docs[rel_path])
+
+        # A file that shrank leaves chunks past its new end
+        stale = set(entry_point_ids(previous.get(rel_path, {}))) - set(pending[rel_path]['point_ids'])
+        try:
+            delete_points(stale)
+        except Exception as e:
+            print(f"{RED}Error deleting stale chunks of {rel_path}: {e}{NC}")
+            error_count += 1
+
+    return len(indexed_files), error_count
+
+def prune_index(vault_path, manifest):
+    """Reconcile Qdrant with the filesystem in one scroll of the collection.
+
+    Deletes points whose file_path no longer exists, and points of indexed
+    files that the manifest does not list (orphans of older layouts).
+    Returns the number of points deleted.
+    """
+    on_disk = scan_vault(vault_path)
+    orphans = []
+    offset = None
+
+    while True:
+        records, offset = qdrant_client.scroll(
+            collection_name=COLLECTION_NAME,
+            limit=SCROLL_BATCH,
+            offset=offset,
+            with_payload=['file_path'],
+            with_vectors=False
+        )
+        for record in records:
+            file_path = (record.payload or {}).get('file_path')
+            if file_path not in on_disk:
+                orphans.append(record.id)
+            elif file_path in manifest and record.id not in entry_point_ids(manifest[file_path]):
+                orphans.append(record.id)
+        if offset is None:
+            break
+
+    for start in range(0, len(orphans), UPSERT_BATCH):
+        delete_points(orphans[start:start + UPSERT_BATCH])
+
+    # Files gone from disk have nothing left in Qdrant (nor in the keyword index)
+    keyword_index.remove_missing(set(on_disk))
+    for rel_path in [rel_path for rel_path in manifest if rel_path not in on_disk]:
+        del manifest[rel_path]
+
+    return len(orphans)
+
+def remove_files(rel_paths, manifest):
+    """Delete the points of files that no longer exist. Returns the count removed."""
+    removed = [rel_path for rel_path in rel_paths if rel_path in manifest]
+    if removed:
+        delete_points([point_id for rel_path in removed for point_id in entry_point_ids(manifest[rel_path])])
+        keyword_index.remove_files(removed)
+        for rel_path in removed:
+            del manifest[rel_path]
+    return len(removed)
+
+def index_vault(vault_path, recreate=False, full=False, prune=False):
+    """Index new/changed markdown files in vault, drop points of removed ones."""
     vault_path = Path(vault_path).resolve()
 
     if not vault_path.exists():
@@ -97,130 +653,102 @@ def index_vault(vault_path, recreate=False):
     print(f"Collection: {COLLECTION_NAME}")
     print()
 
+    if not init_clients():
+        return False
+
     # Create or recreate collection
     try:
-        collections = qdrant_client.get_collections().collections
-        exists = any(c.name == COLLECTION_NAME for c in collections)
-
-        if exists:
-            if recreate:
-                print(f"{YELLOW}Recreating collection...{NC}")
-                qdrant_client.delete_collection(COLLECTION_NAME)
-                exists = False
-            else:
-                print(f"{YELLOW}Collection exists, will update existing points{NC}")
-
-        if not exists:
-            print(f"{GREEN}Creating collection...{NC}")
-            qdrant_client.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE)
-            )
+        exists = ensure_collection(recreate)
     except Exception as e:
         print(f"{RED}Collection error: {e}{NC}")
         return False
 
+    # A fresh collection or --full means nothing in the manifest can be trusted
+    # (the previous one still tells us which points belong to removed files)
+    previous = load_manifest() if exists else {}
+    manifest = {} if full else dict(previous)
+    if full:
+        print(f"{YELLOW}Full rebuild: every file will be re-embedded{NC}")
+    elif manifest:
+        print(f"{YELLOW}Incremental: {len(manifest)} files in manifest{NC}")
+
     print()
 
     # Find all markdown files
-    md_files = []
-    for root, dirs, files in os.walk(vault_path):
-        if '.obsidian' in root:
-            continue
-        for file in files:
-            if file.endswith('.md'):
-                md_files.append(os.path.join(root, file))
+    md_files = scan_vault(vault_path)
 
     print(f"Found {len(md_files)} markdown files")
     print()
 
-    # Index each file
-    indexed_count = 0
+    # Index new/changed files
+    skipped_count = 0
+    moved_count = 0
+    deleted_count = 0
     error_count = 0
-    points = []
-
-    for file_path in md_files:
-        rel_path = os.path.relpath(file_path, vault_path)
+    docs = []
+    pending = {}  # rel_path -> manifest entry, committed once upserted
+    removed = [rel_path for rel_path in previous if rel_path not in md_files]
+    moved_from = {} if full else moved_candidates(removed, manifest)
 
+    for rel_path, file_path in sorted(md_files.items()):
         try:
-            # Read file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Skip empty files
-            if not content.strip():
-                continue
-
-            # Extract metadata
-            is_index = file_path.endswith('_INDEX.md')
-            file_type = "INDEX" if is_index else "DOC"
-            project_id = extract_project_from_path(rel_path)
+            status = prepare_file(rel_path, file_path, manifest, docs, pending, moved_from)
+            if status == 'skipped':
+                skipped_count += 1
+            elif status == 'moved':
+                moved_count += 1
+            elif status == 'emptied':
+                deleted_count += 1
+        except Exception as e:
+            print(f"{RED}Error indexing {rel_path}: {e}{NC}")
+            error_count += 1
 
-            # Create text for embedding (with metadata prefix)
-            text_for_embedding = f"""[OBSIDIAN:{file_type}] {rel_path}
-Project: {project_id}
+    # Embed in batches, upsert on a pipelined thread
+    indexed_count, errors = commit_pending(docs, pending, manifest, previous)
+    error_count += errors
 
-{content[:6000]}"""  # Limit to 6k chars for embedding
-
-            # Generate embedding
-            embedding = create_embedding(text_for_embedding)
-            if not embedding:
-                error_count += 1
-                continue
-
-            # Create point
-            point_id = generate_point_id(rel_path)
-            point = PointStruct(
-                id=point_id,
-                vector=embedding,
-                payload={
-                    'source': 'obsidian',
-                    'file_path': rel_path,
-                    'full_path': str(file_path),
-                    'file_type': file_type,
-                    'project_id': project_id,
-                    'indexed_at': datetime.now().isoformat(),
-                    'content_preview': content[:500]  # First 500 chars for preview
-                }
-            )
-            points.append(point)
-
-            indexed_count += 1
-
-            # Batch upload every 10 points
-            if len(points) >= 10:
-                qdrant_client.upsert(
-                    collection_name=COLLECTION_NAME,
-                    points=points
-                )
-                print(f"{YELLOW}Uploaded {indexed_count}/{len(md_files)}...{NC}")
-                points = []
+    # Delete points of files that no longer exist (and did not just move)
+    moved_away = {rel_path for rel_path in removed if rel_path not in manifest} if moved_count else set()
+    removed = [rel_path for rel_path in removed if rel_path not in moved_away]
+    if removed:
+        try:
+            # previous, not manifest: a --full run starts from an empty one
+            deleted_count += remove_files(removed, previous)
+            for rel_path in removed:
+                manifest.pop(rel_path, None)
+        except Exception as e:
+            print(f"{RED}Error deleting removed files: {e}{NC}")
+            error_count += 1
 
+    # Orphans the manifest cannot see (e.g. renames made before it existed)
+    pruned_count = 0
+    if prune:
+        try:
+            pruned_count = prune_index(vault_path, manifest)
         except Exception as e:
-            print(f"{RED}Error indexing {rel_path}: {e}{NC}")
+            print(f"{RED}Prune error: {e}{NC}")
             error_count += 1
 
-    # Upload remaining points
-    if points:
-        qdrant_client.upsert(
-            collection_name=COLLECTION_NAME,
-            points=points
-        )
+    save_manifest(manifest)
 
     print()
     print(f"{BOLD}{'='*70}{NC}")
     print(f"{BOLD}Indexation Summary{NC}")
     print(f"{BOLD}{'='*70}{NC}")
     print()
-    print(f"{GREEN}✅ Indexed: {indexed_count}{NC}")
+    print(f"{GREEN}✅ Embedded: {indexed_count}{NC}")
+    print(f"{BLUE}⏭️  Skipped (unchanged): {skipped_count}{NC}")
+    print(f"{BLUE}🔀 Moved (re-keyed, not re-embedded): {moved_count}{NC}")
+    print(f"{YELLOW}🗑️  Deleted: {deleted_count}{NC}")
+    if prune:
+        print(f"{YELLOW}🧹 Pruned orphan points: {pruned_count}{NC}")
     print(f"{RED}❌ Errors: {error_count}{NC}")
     print()
 
     # Show stats by project
     print(f"{BOLD}Files by Project:{NC}")
     project_counts = {}
-    for file_path in md_files:
-        rel_path = os.path.relpath(file_path, vault_path)
+    for rel_path in md_files:
         project_id = extract_project_from_path(rel_path)
         project_counts[project_id] = project_counts.get(project_id, 0) + 1
 
@@ -234,7 +762,122 @@ Project: {project_id}
 
     return error_count == 0
 
+def index_files(vault_path, changed=(), deleted=(), moved=()):
+    """Re-index only the given vault paths (absolute or vault-relative).
+
+    changed: created/modified files (or directories, scanned recursively)
+    deleted: removed files or directories
+    moved: (src, dest) pairs
+    The filesystem has the last word: a "changed" path that is gone is
+    removed, a "deleted" one that exists again is re-indexed.
+    Files that moved with unchanged content are re-keyed, not re-embedded.
+    Returns {'embedded', 'skipped', 'moved', 'deleted', 'errors', 'failed'} or
+    None if the clients/collection are unavailable. 'failed' lists the
+    vault-relative paths left stale (not embedded, or points not removed):
+    the manifest does not record them, so passing them again retries them.
+    """
+    vault_root = Path(os.path.abspath(vault_path))  # as given, may go through a symlink
+    vault_path = vault_root.resolve()
+
+    if not init_clients():
+        return None
+    try:
+        if not ensure_collection():
+            # Fresh collection: the manifest describes points that are gone
+            save_manifest({})
+    except Exception as e:
+        print(f"{RED}Collection error: {e}{NC}")
+        return None
+
+    def to_rel(path):
+        """Vault-relative path, None (reported) when the path is outside the vault.
+
+        Deleted and moved-away files cannot be resolved, so the path is tried
+        as given (and with its parent resolved) against both vault roots.
+        """
+        path = Path(path)
+        if not path.is_absolute():
+            return str(path)
+        candidates = [Path(os.path.abspath(path))]
+        if path.exists():
+            candidates.insert(0, path.resolve())
+        elif path.parent.exists():
+            candidates.append(path.parent.resolve() / path.name)
+        for candidate in candidates:
+            for root in (vault_path, vault_root):
+                try:
+                    return str(candidate.relative_to(root))
+                except ValueError:
+                    continue
+        print(f"{YELLOW}⚠️  Ignoring {path}: outside the vault ({vault_root}){NC}")
+        return None
+
+    touched = []
+    for src, dest in moved:
+        touched += [src, dest]
+    touched += list(deleted) + list(changed)
+
+    previous = load_manifest()
+    manifest = dict(previous)
+    stats = {'embedded': 0, 'skipped': 0, 'moved': 0, 'deleted': 0, 'errors': 0}
+    failed = set()
+    docs = []
+    pending = {}
+    gone = set()
+    present = {}
+
+    for path in touched:
+        rel_path = to_rel(path)
+        if rel_path is None or '.obsidian' in Path(rel_path).parts:
+            continue
+        abs_path = vault_path / rel_path
+
+        if abs_path.is_dir():
+            present.update(scan_vault(vault_path, abs_path))
+        elif abs_path.is_file():
+            if rel_path.endswith('.md'):
+                present[rel_path] = str(abs_path)
+        else:
+            # A file, or a whole directory, that no longer exists
+            prefix = rel_path.rstrip(os.sep) + os.sep
+            gone.update(known for known in manifest if known == rel_path or known.startswith(prefix))
+
+    gone -= set(present)
+    moved_from = moved_candidates(gone, manifest)
+
+    for rel_path, file_path in sorted(present.items()):
+        try:
+            status = prepare_file(rel_path, file_path, manifest, docs, pending, moved_from)
+            if status == 'skipped':
+                stats['skipped'] += 1
+            elif status == 'moved':
+                stats['moved'] += 1
+            elif status == 'emptied':
+                stats['deleted'] += 1
+        except Exception as e:
+            print(f"{RED}Error indexing {rel_path}: {e}{NC}")
+            stats['errors'] += 1
+            failed.add(rel_path)
+
+    stats['embedded'], errors = commit_pending(docs, pending, manifest, previous)
+    stats['errors'] += errors
+    # commit_pending records exactly the fully upserted files in the manifest
+    failed.update(rel_path for rel_path in pending if manifest.get(rel_path) is not pending[rel_path])
+
+    try:
+        stats['deleted'] += remove_files(sorted(gone), manifest)
+    except Exception as e:
+        print(f"{RED}Error deleting removed files: {e}{NC}")
+        stats['errors'] += 1
+        failed.update(gone)
+
+    save_manifest(manifest)
+    stats['failed'] = sorted(failed)
+    return stats
+
 if __name__ == "__main__":
     recreate = '--recreate' in sys.argv
-    success = index_vault(VAULT_PATH, recreate=recreate)
+    full = '--full' in sys.argv
+    prune = '--prune' in sys.argv
+    success = index_vault(VAULT_PATH, recreate=recreate, full=full, prune=prune)
     sys.exit(0 if success else 1)
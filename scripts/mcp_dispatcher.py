@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+MCP Dispatcher - Concurrent JSON-RPC handling over stdin/stdout
+Shared by mem0_mcp_server.py and mem0_mcp_server_local.py
+
+- stdin is read by an asyncio loop; tools/call requests run on a bounded
+  thread pool so a slow mem0_search no longer stalls mem0_queue_status
+- responses are written as soon as they are ready (out of order, tagged
+  by their JSON-RPC id) through a single locked writer
+- notifications/cancelled drops a request that has not started yet and
+  suppresses the response of one that is already running
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Configuration
+MAX_WORKERS = int(os.getenv("MCP_MAX_WORKERS", "4"))  # concurrent tool calls
+INLINE_METHODS = ("initialize", "notifications/initialized", "tools/list")
+
+_write_lock = threading.Lock()
+_cancelled = set()  # request ids whose response must not be sent
+_answered = set()  # running request ids whose response is already written
+
+def write_message(message: dict):
+    """Write one JSON-RPC message to stdout (thread-safe)"""
+    with _write_lock:
+        request_id = message.get("id")
+        if request_id is not None and "method" not in message:
+            _answered.add(request_id)
+            if request_id in _cancelled:
+                _cancelled.discard(request_id)
+                return
+        print(json.dumps(message), flush=True)
+
+def is_cancelled(request_id: Any) -> bool:
+    """Whether the client cancelled this request (handlers may stop early)"""
+    with _write_lock:
+        return request_id in _cancelled
+
+def _cancel(request_id: Any, future):
+    with _write_lock:
+        if future.done() or request_id in _answered:
+            return  # Response already written (checked under the writer's lock)
+        _cancelled.add(request_id)
+    if future.cancel():
+        # Never started - no response will be written, forget the id
+        with _write_lock:
+            _cancelled.discard(request_id)
+
+def _run_handler(handle_message: Callable, message: dict):
+    try:
+        handle_message(message)
+    except Exception as e:
+        print(f"❌ Error handling {message.get('method')}: {e}", file=sys.stderr)
+
+def _release(request_id: Any):
+    """Forget a finished request's id so a later request may reuse it"""
+    with _write_lock:
+        _answered.discard(request_id)
+        _cancelled.discard(request_id)
+
+async def _serve(handle_message: Callable, max_workers: int, inline_methods: tuple):
+    loop = asyncio.get_running_loop()
+    reader = ThreadPoolExecutor(max_workers=1)
+    workers = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    in_flight = {}  # request id -> concurrent future (only touched on the loop thread)
+
+    def forget(request_id, future):
+        # Runs on the loop thread, in order with notifications/cancelled: a late
+        # cancel either sees the id as answered or no longer finds it in flight
+        if in_flight.get(request_id) is future:
+            del in_flight[request_id]
+            _release(request_id)
+
+    def on_done(future, request_id):
+        try:
+            loop.call_soon_threadsafe(forget, request_id, future)
+        except RuntimeError:
+            pass  # Loop already closed (shutdown)
+
+    try:
+        while True:
+            line = await loop.run_in_executor(reader, sys.stdin.readline)
+            if not line:
+                break  # stdin closed
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"❌ Invalid JSON: {e}", file=sys.stderr)
+                continue
+
+            method = message.get("method")
+            request_id = message.get("id")
+
+            if method == "notifications/cancelled":
+                cancelled_id = (message.get("params") or {}).get("requestId")
+                future = in_flight.get(cancelled_id)
+                if future is not None:
+                    _cancel(cancelled_id, future)
+                continue
+
+            if method in inline_methods:
+                _run_handler(handle_message, message)
+                _release(request_id)
+                continue
+
+            previous = in_flight.get(request_id)
+            if previous is not None and previous.done():
+                forget(request_id, previous)  # Id reused before its done callback ran
+
+            future = workers.submit(_run_handler, handle_message, message)
+            if request_id is not None:
+                in_flight[request_id] = future
+                future.add_done_callback(lambda f, i=request_id: on_done(f, i))
+
+        # Let in-flight calls answer before exiting
+        pending = [asyncio.wrap_future(f) for f in list(in_flight.values())]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    finally:
+        workers.shutdown(wait=False)
+        reader.shutdown(wait=False)
+
+def run_dispatcher(handle_message: Callable, max_workers: int = MAX_WORKERS,
+                   inline_methods: tuple = INLINE_METHODS):
+    """Serve JSON-RPC messages from stdin until EOF"""
+    asyncio.run(_serve(handle_message, max_workers, inline_methods))
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Mem0 API Stand-in - Local, in-memory imitation of the VPS Mem0 REST API
+For measuring mem0_queue_worker.py / mem0_mcp_server.py offline
+
+Endpoints (same JSON shapes as the VPS):
+- GET  /health              advertises "memory_batch" in features (unless --no-batch)
+- POST /memory              {"user_id", "content"} -> {"success": true, "id"}
+- POST /memory/batch        {"items": [{"id", "user_id", "content"}], "stop_on_error"}
+                            -> {"success": true, "results": [{"id", "success", "skipped"?, "error"?}]}
+- GET  /memory/<user_id>    ?limit=N -> {"success": true, "memories": {"results": [...]}}
+- POST /memory/search       {"user_id", "query", "limit"} -> word-overlap scoring
+- GET  /stats               requests, items stored, failures injected
+
+Batch semantics: items are stored in order. With stop_on_error, the items
+after the first failure are not attempted and come back with skipped=true,
+so a client keeping per-project order knows exactly what to resend.
+
+Usage:
+    python3 mem0_api_standin.py --port 8081 --latency-ms 40
+    python3 mem0_api_standin.py --failure-rate 0.05 --per-item-ms 2 --no-batch
+    MEM0_API_URL=http://127.0.0.1:8081 python3 mem0_queue_worker.py
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import argparse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Defaults
+DEFAULT_PORT = 8081
+BATCH_MAX_ITEMS = 100
+
+WORD_RE = re.compile(r"\w+")
+
+class Mem0StandIn:
+    """Memories per user_id, with latency and failure injection"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, per_item_ms: float = 0,
+                 failure_rate: float = 0.0, error_rate: float = 0.0, batch: bool = True,
+                 batch_max_items: int = BATCH_MAX_ITEMS, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_item_ms = per_item_ms
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.batch = batch
+        self.batch_max_items = batch_max_items
+        self.random = random.Random(seed)
+        self.memories = {}
+        self.stats = {'requests': 0, 'batches': 0, 'stored': 0, 'failed_items': 0, 'http_errors': 0}
+        self._lock = threading.Lock()
+
+    def delay(self, items: int = 1):
+        """Simulated round trip + server-side work"""
+        with self._lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        seconds = max(0.0, self.latency_ms + jitter + self.per_item_ms * items) / 1000
+        if seconds:
+            time.sleep(seconds)
+
+    def roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self.random.random() < rate
+
+    def store(self, user_id: str, content: str, memory_id: str = None) -> dict:
+        """Store one memory, or fail it with probability failure_rate"""
+        if self.roll(self.failure_rate):
+            with self._lock:
+                self.stats['failed_items'] += 1
+            return {'success': False, 'error': 'injected failure'}
+
+        memory = {
+            'id': memory_id or str(uuid.uuid4()),
+            'memory': content,
+            'user_id': user_id,
+            'created_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            self.memories.setdefault(user_id, []).append(memory)
+            self.stats['stored'] += 1
+        return {'success': True, 'id': memory['id']}
+
+    def store_batch(self, items: list, stop_on_error: bool) -> list:
+        results = []
+        stopped = False
+        for item in items:
+            if stopped:
+                results.append({'id': item.get('id'), 'success': False, 'skipped': True})
+                continue
+            result = self.store(item.get('user_id'), item.get('content', ''), item.get('id'))
+            result['id'] = item.get('id') or result.get('id')
+            results.append(result)
+            stopped = stop_on_error and not result['success']
+        return results
+
+    def search(self, user_id: str, query: str, limit: int) -> list:
+        terms = set(WORD_RE.findall(query.lower()))
+        with self._lock:
+            memories = list(self.memories.get(user_id, []))
+        scored = []
+        for memory in memories:
+            words = set(WORD_RE.findall(memory['memory'].lower()))
+            if terms and words:
+                score = len(terms & words) / len(terms)
+                if score:
+                    scored.append(dict(memory, score=score))
+        scored.sort(key=lambda m: m['score'], reverse=True)
+        return scored[:limit]
+
+def make_handler(api: Mem0StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the VPS behind its proxy
+
+        def _send(self, code: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                return json.loads(self.rfile.read(length)) if length else {}
+            except ValueError:
+                return {}
+
+        def _begin(self) -> bool:
+            """Count the request; False (and a 503 sent) when an HTTP error is injected"""
+            with api._lock:
+                api.stats['requests'] += 1
+            if api.roll(api.error_rate):
+                with api._lock:
+                    api.stats['http_errors'] += 1
+                api.delay()
+                self._send(503, {'error': 'injected HTTP error'})
+                return False
+            return True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                with api._lock:
+                    return self._send(200, dict(api.stats, users=len(api.memories)))
+            if not self._begin():
+                return
+
+            if url.path == '/health':
+                api.delay()
+                body = {'status': 'healthy', 'version': 'standin', 'vector_store': 'memory', 'features': []}
+                if api.batch:
+                    body['features'].append('memory_batch')
+                    body['batch_max_items'] = api.batch_max_items
+                return self._send(200, body)
+
+            match = re.fullmatch(r'/memory/([^/]+)', url.path)
+            if match:
+                limit = int(parse_qs(url.query).get('limit', ['20'])[0])
+                api.delay()
+                with api._lock:
+                    memories = list(api.memories.get(match.group(1), []))[-limit:]
+                return self._send(200, {'success': True, 'memories': {'results': memories}})
+
+            self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self._body()
+            if not self._begin():
+                return
+
+            if url.path == '/memory':
+                api.delay()
+                return self._send(200, api.store(body.get('user_id'), body.get('content', '')))
+
+            if url.path == '/memory/batch' and api.batch:
+                items = body.get('items', [])
+                if len(items) > api.batch_max_items:
+                    return self._send(413, {'error': f'at most {api.batch_max_items} items per batch'})
+                with api._lock:
+                    api.stats['batches'] += 1
+                api.delay(len(items))
+                results = api.store_batch(items, bool(body.get('stop_on_error')))
+                return self._send(200, {'success': True, 'results': results})
+
+            if url.path == '/memory/search':
+                api.delay()
+                results = api.search(body.get('user_id'), body.get('query', ''), int(body.get('limit', 10)))
+                return self._send(200, {'success': True, 'results': {'results': results}})
+
+            self._send(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass  # Quiet: benchmarks send thousands of requests
+
+    return Handler
+
+def serve(api: Mem0StandIn, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread (port 0 picks a free port)"""
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mem0-standin", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Mem0 API stand-in with latency and failure injection")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Added to every request")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Uniform +/- jitter on the latency")
+    parser.add_argument('--per-item-ms', type=float, default=0, help="Server work per stored memory")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Probability a memory fails (success: false)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability a request gets HTTP 503")
+    parser.add_argument('--no-batch', action='store_true', help="Do not offer POST /memory/batch")
+    parser.add_argument('--batch-max-items', type=int, default=BATCH_MAX_ITEMS)
+    parser.add_argument('--seed', type=int, help="Seed for jitter and failure injection")
+    args = parser.parse_args()
+
+    api = Mem0StandIn(args.latency_ms, args.jitter_ms, args.per_item_ms, args.failure_rate, args.error_rate,
+                      not args.no_batch, args.batch_max_items, args.seed)
+    server = serve(api, args.host, args.port)
+    print(f"🧪 Mem0 stand-in on http://{args.host}:{server.server_address[1]} "
+          f"(latency {args.latency_ms}ms, failures {args.failure_rate:.0%}, "
+          f"batch {'off' if args.no_batch else f'on, max {args.batch_max_items}'})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n🛑 Stopped - {api.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -10,18 +10,34 @@ import uuid
 import os
 import time
 import fcntl
-import requests
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import Any
+from mem0_queue_store import open_queue_store, notify_worker
+from mem0_transport import Mem0Transport
+from mcp_dispatcher import run_dispatcher, write_message
 
 # Configuration
-MEM0_API_URL = "http://31.220.104.244:8081"
-QUEUE_FILE = Path.home() / ".claude/mem0_queue.json"
+MEM0_API_URL = os.getenv("MEM0_API_URL", "http://31.220.104.244:8081")
 EMERGENCY_BUFFER = Path.home() / ".claude/mem0_emergency.json"
 LOCK_FILE = Path.home() / ".claude/mem0_queue.lock"
 LOCK_TIMEOUT = 30  # seconds (increased from 5s for Option C)
 
+# (connect, read) timeouts per tool - interactive reads fail fast
+TOOL_TIMEOUTS = {
+    "mem0_recall": (3.05, 15),
+    "mem0_search": (3.05, 20),
+    "mem0_list_projects": (3.05, 5),
+    "mem0_health": (3.05, 5),
+}
+DEFAULT_TIMEOUT = (3.05, 30)
+
+# Warm keep-alive pool + circuit breaker, shared by every tool call
+transport = Mem0Transport(MEM0_API_URL)
+
+queue_store = open_queue_store()  # MEM0_QUEUE_BACKEND=log|sqlite
+
 def acquire_lock_with_timeout(lock_file, timeout=LOCK_TIMEOUT):
     """Acquire file lock with timeout to prevent blocking indefinitely"""
     start = time.time()
@@ -35,9 +51,20 @@ def acquire_lock_with_timeout(lock_file, timeout=LOCK_TIMEOUT):
 
     return False  # Timeout
 
+@contextmanager
+def queue_lock(timeout=LOCK_TIMEOUT):
+    """Hold mem0_queue.lock if the queue backend needs it (SQLite locks itself)"""
+    if not queue_store.uses_file_lock:
+        yield True
+        return
+
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_FILE, 'w') as lock:
+        yield acquire_lock_with_timeout(lock, timeout)
+
 def send_response(response: dict):
-    """Send JSON-RPC response to stdout"""
-    print(json.dumps(response), flush=True)
+    """Send JSON-RPC response to stdout (serialized across worker threads)"""
+    write_message(response)
 
 def send_error(id: Any, code: int, message: str):
     """Send JSON-RPC error response"""
@@ -60,47 +87,12 @@ def send_result(id: Any, result: Any):
 # ============================================================================
 
 def load_queue() -> dict:
-    """Load queue from JSON file"""
-    if not QUEUE_FILE.exists():
-        return {
-            "queue": [],
-            "last_100": [],
-            "failed": [],
-            "stats": {
-                "total_queued": 0,
-                "total_synced": 0,
-                "total_failed": 0,
-                "last_sync": None
-            }
-        }
-
-    try:
-        with open(QUEUE_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        # Corrupted file, start fresh
-        return {
-            "queue": [],
-            "last_100": [],
-            "failed": [],
-            "stats": {
-                "total_queued": 0,
-                "total_synced": 0,
-                "total_failed": 0,
-                "last_sync": None
-            }
-        }
+    """Load queue state from the queue store"""
+    return queue_store.load()
 
 def save_queue(queue_data: dict):
-    """Save queue to JSON file (atomic write)"""
-    tmp_file = QUEUE_FILE.with_suffix('.tmp')
-    try:
-        with open(tmp_file, 'w') as f:
-            json.dump(queue_data, f, indent=2)
-        tmp_file.replace(QUEUE_FILE)
-    except:
-        if tmp_file.exists():
-            tmp_file.unlink()
+    """Persist queue state to the queue store"""
+    queue_store.save(queue_data)
 
 def emergency_queue_append(project_id: str, content: str) -> dict:
     """Append to emergency buffer when main queue locked (Option C)"""
@@ -126,19 +118,20 @@ def emergency_queue_append(project_id: str, content: str) -> dict:
         return entry
 
 def add_to_queue(project_id: str, content: str) -> dict:
-    """Add entry to queue with emergency buffer fallback (Option C)"""
-    # Ensure lock file directory exists
-    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(LOCK_FILE, 'w') as lock:
-        if not acquire_lock_with_timeout(lock, LOCK_TIMEOUT):
+    """Add entry to queue, then wake the worker up so it syncs right away"""
+    entry = append_to_queue(project_id, content)
+    notify_worker()  # Lock released: the worker can claim the entry at once
+    return entry
+
+def append_to_queue(project_id: str, content: str) -> dict:
+    """Append entry to queue with emergency buffer fallback (Option C)"""
+    with queue_lock(LOCK_TIMEOUT) as locked:
+        if not locked:
             # Option C: Don't fail, use emergency buffer
             print(f"⚠️  Queue lock timeout - using emergency buffer", file=sys.stderr)
             return emergency_queue_append(project_id, content)
 
         try:
-            queue = load_queue()
-
             entry = {
                 "id": str(uuid.uuid4()),
                 "project_id": project_id,
@@ -147,16 +140,8 @@ def add_to_queue(project_id: str, content: str) -> dict:
                 "retries": 0
             }
 
-            # Add to queue
-            queue["queue"].append(entry)
-            queue["stats"]["total_queued"] += 1
-
-            # Update last_100 cache
-            queue["last_100"].append(entry)
-            if len(queue["last_100"]) > 100:
-                queue["last_100"] = queue["last_100"][-100:]
-
-            save_queue(queue)
+            # O(1) append - no full queue rewrite on either backend
+            queue_store.append(entry)
             return entry
 
         except Exception as e:
@@ -165,11 +150,9 @@ def add_to_queue(project_id: str, content: str) -> dict:
             return emergency_queue_append(project_id, content)
 
 def get_queue_status() -> dict:
-    """Get queue status for monitoring (with file locking)"""
-    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(LOCK_FILE, 'w') as lock:
-        if not acquire_lock_with_timeout(lock):
+    """Get queue status for monitoring (SQLite readers never wait on the lock)"""
+    with queue_lock() as locked:
+        if not locked:
             return {
                 "status": "ERROR",
                 "message": "Could not acquire lock (queue busy)",
@@ -177,38 +160,41 @@ def get_queue_status() -> dict:
                 "failed_size": 0
             }
 
-        queue = load_queue()
-
-        queue_size = len(queue["queue"])
-        failed_size = len(queue["failed"])
-
-        # Determine VPS status
-        if queue_size >= 20 or failed_size > 5:
-            status = "critical" if failed_size > 5 else "warning"
-        else:
-            status = "healthy"
-
-        # Calculate age of oldest entry
-        oldest_age = None
-        if queue["queue"]:
-            oldest_timestamp = min(e["timestamp"] for e in queue["queue"])
-            oldest_age = int(datetime.now().timestamp()) - oldest_timestamp
-
-        return {
-            "queue_size": queue_size,
-            "failed_size": failed_size,
-            "last_sync": queue["stats"].get("last_sync"),
-            "total_queued": queue["stats"].get("total_queued", 0),
-            "total_synced": queue["stats"].get("total_synced", 0),
-            "total_failed": queue["stats"].get("total_failed", 0),
-            "oldest_age_seconds": oldest_age,
-            "vps_status": status
-        }
+        status = queue_store.status()
+
+    queue_size = status["queue_size"]
+    failed_size = status["failed_size"]
+    stats = status["stats"]
+
+    # Determine VPS status
+    if queue_size >= 20 or failed_size > 5:
+        vps_status = "critical" if failed_size > 5 else "warning"
+    else:
+        vps_status = "healthy"
+
+    # Calculate age of oldest entry
+    oldest_age = None
+    if status["oldest_timestamp"] is not None:
+        oldest_age = int(datetime.now().timestamp()) - status["oldest_timestamp"]
+
+    return {
+        "queue_size": queue_size,
+        "failed_size": failed_size,
+        "last_sync": stats.get("last_sync"),
+        "total_queued": stats.get("total_queued", 0),
+        "total_synced": stats.get("total_synced", 0),
+        "total_failed": stats.get("total_failed", 0),
+        "oldest_age_seconds": oldest_age,
+        "vps_status": vps_status
+    }
 
 # ============================================================================
 
 def handle_initialize(id: Any, params: dict):
     """Handle initialize request"""
+    # Open the first VPS connection while Claude is still starting up
+    transport.warm()
+
     send_result(id, {
         "protocolVersion": "2024-11-05",
         "capabilities": {
@@ -313,22 +299,12 @@ def handle_tools_list(id: Any):
     ]
     send_result(id, {"tools": tools})
 
-def call_mem0_api(method: str, endpoint: str, data: dict = None) -> dict:
-    """Make HTTP request to Mem0 API"""
-    url = f"{MEM0_API_URL}{endpoint}"
-    try:
-        if method == "GET":
-            response = requests.get(url, timeout=30)
-        elif method == "POST":
-            response = requests.post(url, json=data, timeout=30)
-        elif method == "DELETE":
-            response = requests.delete(url, timeout=30)
-        else:
-            return {"error": f"Unknown method: {method}"}
+def call_mem0_api(method: str, endpoint: str, data: dict = None, tool: str = None) -> dict:
+    """Make HTTP request to Mem0 API over the pooled transport"""
+    if method not in ("GET", "POST", "DELETE"):
+        return {"error": f"Unknown method: {method}"}
 
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": f"API request failed: {str(e)}"}
+    return transport.request(method, endpoint, data, timeout=TOOL_TIMEOUTS.get(tool, DEFAULT_TIMEOUT))
 
 def handle_tool_call(id: Any, params: dict):
     """Handle tool execution"""
@@ -339,7 +315,7 @@ def handle_tool_call(id: Any, params: dict):
         if tool_name == "mem0_recall":
             project_id = arguments.get("project_id")
             limit = arguments.get("limit", 20)
-            result = call_mem0_api("GET", f"/memory/{project_id}?limit={limit}")
+            result = call_mem0_api("GET", f"/memory/{project_id}?limit={limit}", tool=tool_name)
 
             if "error" in result:
                 content = f"Error retrieving memories: {result['error']}"
@@ -393,7 +369,7 @@ Queue locale : {status['queue_size']} mémoires en attente
 Le VPS semble inaccessible depuis {oldest_hours} heures
 
 💾 Tes données sont sauvegardées dans :
-   ✓ Queue locale : ~/.claude/mem0_queue.json
+   ✓ Queue locale : {queue_store.location}
    ✓ Knowledge graph : toujours à jour
 
 🔧 Actions recommandées :
@@ -416,7 +392,7 @@ Le système continue de fonctionner normalement.
                 "user_id": project_id,
                 "query": query,
                 "limit": limit
-            })
+            }, tool=tool_name)
 
             if "error" in result:
                 content = f"Error searching memories: {result['error']}"
@@ -442,7 +418,7 @@ Le système continue de fonctionner normalement.
         elif tool_name == "mem0_list_projects":
             # Note: Mem0 API doesn't have a direct "list projects" endpoint
             # We'll check the health and return a helpful message
-            result = call_mem0_api("GET", "/health")
+            result = call_mem0_api("GET", "/health", tool=tool_name)
             if "error" in result:
                 content = f"Error connecting to Mem0: {result['error']}"
             else:
@@ -455,9 +431,9 @@ Known projects (configured):
 To see memories for a project, use mem0_recall with the project_id."""
 
         elif tool_name == "mem0_health":
-            result = call_mem0_api("GET", "/health")
+            result = call_mem0_api("GET", "/health", tool=tool_name)
             if "error" in result:
-                content = f"Mem0 API is NOT healthy: {result['error']}"
+                content = f"Mem0 API is NOT healthy: {result['error']}\nCircuit breaker: {transport.breaker.state}"
             else:
                 content = f"""Mem0 API Status: HEALTHY
 
@@ -465,7 +441,8 @@ Version: {result.get('version', 'unknown')}
 LLM Provider: {result.get('llm_provider', 'unknown')}
 LLM Model: {result.get('llm_model', 'unknown')}
 Vector Store: {result.get('vector_store', 'unknown')}
-Backup Enabled: {result.get('backup_enabled', False)}"""
+Backup Enabled: {result.get('backup_enabled', False)}
+Circuit breaker: {transport.breaker.state}"""
 
         elif tool_name == "mem0_queue_status":
             status = get_queue_status()
@@ -507,7 +484,7 @@ Stats:
   - Total synced: {status["total_synced"]}
   - {last_sync_str}
 
-File: ~/.claude/mem0_queue.json"""
+Store: {queue_store.location}"""
 
         else:
             content = f"Unknown tool: {tool_name}"
@@ -522,33 +499,27 @@ File: ~/.claude/mem0_queue.json"""
             "isError": True
         })
 
-def main():
-    """Main loop - read JSON-RPC messages from stdin"""
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
+def handle_message(message: dict):
+    """Dispatch one JSON-RPC message"""
+    method = message.get("method")
+    id = message.get("id")
+    params = message.get("params", {})
+
+    if method == "initialize":
+        handle_initialize(id, params)
+    elif method == "notifications/initialized":
+        pass  # Acknowledgment, no response needed
+    elif method == "tools/list":
+        handle_tools_list(id)
+    elif method == "tools/call":
+        handle_tool_call(id, params)
+    else:
+        if id is not None:
+            send_error(id, -32601, f"Method not found: {method}")
 
-        try:
-            message = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-
-        method = message.get("method")
-        id = message.get("id")
-        params = message.get("params", {})
-
-        if method == "initialize":
-            handle_initialize(id, params)
-        elif method == "notifications/initialized":
-            pass  # Acknowledgment, no response needed
-        elif method == "tools/list":
-            handle_tools_list(id)
-        elif method == "tools/call":
-            handle_tool_call(id, params)
-        else:
-            if id is not None:
-                send_error(id, -32601, f"Method not found: {method}")
+def main():
+    """Main loop - tool calls run concurrently, responses tagged by id"""
+    run_dispatcher(handle_message)
 
 if __name__ == "__main__":
     main()
@@ -2,25 +2,46 @@
 """
 MCP Server for Mem0 - LOCAL Architecture (Qdrant + OpenAI)
 Replaces VPS-based architecture with local Qdrant vector store
+
+Startup is lazy: initialize/tools/list are answered at once, and the heavy
+clients (mem0, OpenAI, Qdrant, embedder) are built by a warm-up thread
+started after initialize, or by the first tool call that needs them.
+
+Usage:
+    python3 mem0_mcp_server_local.py                    # MCP server (stdio)
+    python3 mem0_mcp_server_local.py --profile-startup  # import/init time per component
 """
 
+import time
+STARTUP_T0 = time.perf_counter()
+
 import json
 import sys
 import uuid
 import os
+import queue
+import hashlib
+import importlib
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Any
-from mem0 import Memory
-from openai import OpenAI
-from qdrant_client import QdrantClient
+from mcp_dispatcher import run_dispatcher, write_message
+from embedding_cache import EmbeddingCache, CachedSearchEmbedder
+from obsidian_keyword_index import KeywordIndex, collapse_chunk_hits, rrf_fuse, score_label
+from embedders import get_embedder
 
 # Configuration
-QDRANT_HOST = "localhost"
-QDRANT_PORT = 6333
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+QDRANT_LOCATION = os.getenv("QDRANT_LOCATION", "")  # ":memory:" or a directory: embedded Qdrant, no server
 MEMORIES_BACKUP_DIR = Path.home() / "Documents/APP_HOME/CascadeProjects/windsurf-project/Memories/memories"
-OBSIDIAN_COLLECTION = "obsidian_vault"
+OBSIDIAN_COLLECTION = "obsidian_vault"  # suffixed per embedder backend, see embedders.py
+OBSIDIAN_CHUNK_FETCH = 4  # chunk hits fetched per requested file, collapsed per file
+OBSIDIAN_EMBED_TIMEOUT = 5  # seconds for the query embedding before falling back to keywords
 EMBEDDING_MODEL = "text-embedding-3-small"
+DOC_SUGGESTIONS_FILE = Path.home() / ".claude/mem0_doc_suggestions.json"
+INIT_RETRY_SECONDS = 30  # after a failed client init, wait before trying again
 
 # OpenAI API Key (from environment or .env file)
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
@@ -60,20 +81,103 @@ config = {
     }
 }
 
-try:
-    memory = Memory.from_config(config)
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    qdrant_client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
-    print(f"✅ Mem0 initialized (Qdrant: {QDRANT_HOST}:{QDRANT_PORT})", file=sys.stderr)
-except Exception as e:
-    print(f"❌ Failed to initialize Mem0: {e}", file=sys.stderr)
-    memory = None
-    openai_client = None
-    qdrant_client = None
+# Query-embedding cache shared by mem0_search and obsidian_search
+embedding_cache = EmbeddingCache()
+
+# Local BM25 index of the vault chunks (written by index_obsidian_vault_direct.py)
+keyword_index = KeywordIndex()
+
+# Heavy clients, built lazily by init_clients()
+memory = None
+openai_client = None
+qdrant_client = None
+embedder = None
+clients_lock = threading.Lock()
+clients_ready = False
+init_failed_at = 0
+warm_up_thread = None
+startup_profile = {}  # component -> seconds, in init order
+
+def timed(component: str, build):
+    """Run build() and record how long it took under component"""
+    start = time.perf_counter()
+    try:
+        return build()
+    finally:
+        startup_profile[component] = time.perf_counter() - start
+
+def init_clients() -> bool:
+    """Build embedder, Qdrant, OpenAI and Mem0 clients once. Returns whether Mem0 is ready."""
+    global memory, openai_client, qdrant_client, embedder, clients_ready, init_failed_at
+    global EMBEDDING_MODEL, OBSIDIAN_COLLECTION
+
+    with clients_lock:
+        if clients_ready:
+            return memory is not None
+        if init_failed_at and time.time() - init_failed_at < INIT_RETRY_SECONDS:
+            return False
+
+        try:
+            Memory = timed("import mem0", lambda: importlib.import_module("mem0").Memory)
+            OpenAI = timed("import openai", lambda: importlib.import_module("openai").OpenAI)
+            QdrantClient = timed("import qdrant_client", lambda: importlib.import_module("qdrant_client").QdrantClient)
+
+            # Embedder for queries/memories: OpenAI, or a local CPU model (EMBEDDING_BACKEND=local)
+            if embedder is None:
+                new_embedder = timed("embedder", get_embedder)
+                if new_embedder.backend != "openai":
+                    # Mem0 embeds with the same model, in its own collection (vector sizes differ)
+                    dim = timed("embedder model load", lambda: new_embedder.dim)
+                    config['embedder'] = new_embedder.mem0_config() or config['embedder']
+                    config['vector_store']['config'].update(
+                        collection_name=new_embedder.collection("mem0"),
+                        embedding_model_dims=dim
+                    )
+                EMBEDDING_MODEL = new_embedder.name
+                OBSIDIAN_COLLECTION = new_embedder.collection("obsidian_vault")
+                embedder = new_embedder
+
+            if qdrant_client is None:
+                if QDRANT_LOCATION:
+                    # Embedded Qdrant, shared with Mem0 (one process may open it only once)
+                    qdrant_client = timed("Qdrant client", lambda: QdrantClient(location=QDRANT_LOCATION)
+                                          if QDRANT_LOCATION == ":memory:" else QdrantClient(path=QDRANT_LOCATION))
+                    for key in ('host', 'port'):
+                        config['vector_store']['config'].pop(key, None)
+                    config['vector_store']['config']['client'] = qdrant_client
+                else:
+                    qdrant_client = timed("Qdrant client", lambda: QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT))
+            if openai_client is None:
+                openai_client = timed("OpenAI client", lambda: OpenAI(api_key=OPENAI_API_KEY))
+
+            new_memory = timed("Memory.from_config", lambda: Memory.from_config(config))
+            if hasattr(embedder, "mem0_embedder"):
+                new_memory.embedding_model = embedder.mem0_embedder()  # Backend Mem0 cannot build
+            if hasattr(new_memory, "embedding_model"):
+                new_memory.embedding_model = CachedSearchEmbedder(new_memory.embedding_model, EMBEDDING_MODEL, embedding_cache)
+            memory = new_memory
+
+            clients_ready = True
+            total = sum(startup_profile.values())
+            print(f"✅ Mem0 initialized (Qdrant: {QDRANT_LOCATION or f'{QDRANT_HOST}:{QDRANT_PORT}'}) in {total:.2f}s",
+                  file=sys.stderr)
+        except Exception as e:
+            # Whatever was built (embedder, Qdrant) still serves obsidian_search
+            init_failed_at = time.time()
+            print(f"❌ Failed to initialize Mem0: {e}", file=sys.stderr)
+
+        return memory is not None
+
+def start_warm_up():
+    """Build the clients in the background so the first tool call finds them ready"""
+    global warm_up_thread
+    if warm_up_thread is None:
+        warm_up_thread = threading.Thread(target=init_clients, name="warm-up", daemon=True)
+        warm_up_thread.start()
 
 def send_response(response: dict):
-    """Send JSON-RPC response to stdout"""
-    print(json.dumps(response), flush=True)
+    """Send JSON-RPC response to stdout (serialized across worker threads)"""
+    write_message(response)
 
 def send_error(id: Any, code: int, message: str):
     """Send JSON-RPC error response"""
@@ -164,6 +268,85 @@ Be strict: only suggest documentation for genuinely useful, reusable knowledge."
         print(f"⚠️  Documentation analysis error: {e}", file=sys.stderr)
         return None
 
+# ============================================================================
+# DOCUMENTATION SUGGESTIONS (background, off the mem0_save critical path)
+# ============================================================================
+
+doc_queue = queue.Queue()
+doc_lock = threading.Lock()
+doc_worker = None
+
+def load_doc_suggestions() -> dict:
+    """Load cached suggestions: {project_id: [suggestion, ...]}"""
+    try:
+        with open(DOC_SUGGESTIONS_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_doc_suggestions(suggestions: dict):
+    """Save cached suggestions (atomic write)"""
+    DOC_SUGGESTIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = DOC_SUGGESTIONS_FILE.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(suggestions, f, indent=2)
+    tmp_file.replace(DOC_SUGGESTIONS_FILE)
+
+def doc_analysis_worker():
+    """Run analyze_for_documentation for queued saves and cache the results"""
+    while True:
+        project_id, content = doc_queue.get()
+        try:
+            suggestion = analyze_for_documentation(content, project_id)
+            if suggestion:
+                suggestion["id"] = hashlib.sha1(content.encode()).hexdigest()[:12]
+                suggestion["created_at"] = datetime.now().isoformat()
+                with doc_lock:
+                    suggestions = load_doc_suggestions()
+                    project_suggestions = suggestions.setdefault(project_id, [])
+                    if all(s.get("id") != suggestion["id"] for s in project_suggestions):
+                        project_suggestions.append(suggestion)
+                        save_doc_suggestions(suggestions)
+        except Exception as e:
+            print(f"⚠️  Documentation worker error: {e}", file=sys.stderr)
+        finally:
+            doc_queue.task_done()
+
+def queue_doc_analysis(project_id: str, content: str):
+    """Hand a saved memory to the background documentation worker"""
+    global doc_worker
+
+    with doc_lock:
+        if doc_worker is None:
+            doc_worker = threading.Thread(target=doc_analysis_worker, name="doc-analysis", daemon=True)
+            doc_worker.start()
+
+    doc_queue.put((project_id, content))
+
+def get_doc_suggestions(project_id: str = None, clear: bool = False) -> dict:
+    """Cached suggestions for one project (or all), optionally clearing them"""
+    with doc_lock:
+        suggestions = load_doc_suggestions()
+        if project_id:
+            selected = {project_id: suggestions.get(project_id, [])}
+        else:
+            selected = suggestions
+
+        if clear:
+            for proj in selected:
+                suggestions.pop(proj, None)
+            save_doc_suggestions(suggestions)
+
+    return {proj: items for proj, items in selected.items() if items}
+
+def format_doc_suggestion(suggestion: dict) -> str:
+    """Render one cached suggestion"""
+    text = f"💡 {suggestion.get('title', 'N/A')}\n"
+    text += f"   Type: {suggestion.get('type', 'unknown')}\n"
+    text += f"   Confidence: {suggestion.get('confidence', 0):.0%}\n"
+    text += f"   Path: {suggestion.get('suggested_path', 'N/A')}\n"
+    return text
+
 def handle_initialize(id: Any, params: dict):
     """Handle initialize request"""
     send_result(id, {
@@ -177,6 +360,9 @@ def handle_initialize(id: Any, params: dict):
         }
     })
 
+    # Answered first: the session does not wait on Qdrant/OpenAI
+    start_warm_up()
+
 def handle_tools_list(id: Any):
     """Return list of available tools"""
     tools = [
@@ -258,6 +444,25 @@ def handle_tools_list(id: Any):
                 "required": []
             }
         },
+        {
+            "name": "mem0_doc_suggestions",
+            "description": "Get documentation suggestions detected in the background from recent mem0_save calls (type, target path, draft).",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "project_id": {
+                        "type": "string",
+                        "description": "Project identifier (omit for all projects)"
+                    },
+                    "clear": {
+                        "type": "boolean",
+                        "description": "Remove the returned suggestions once read (default: false)",
+                        "default": False
+                    }
+                },
+                "required": []
+            }
+        },
         {
             "name": "obsidian_search",
             "description": "Search in Obsidian vault documentation. Use to find documentation, guides, architecture, patterns. ALWAYS use AFTER mem0_search to get complete context.",
@@ -272,6 +477,12 @@ def handle_tools_list(id: Any):
                         "type": "integer",
                         "description": "Maximum results (default: 5)",
                         "default": 5
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["hybrid", "keyword", "vector"],
+                        "description": "hybrid = BM25 + vectors fused by rank (default), keyword = local BM25 only (no network), vector = embeddings only",
+                        "default": "hybrid"
                     }
                 },
                 "required": ["query"]
@@ -282,13 +493,18 @@ def handle_tools_list(id: Any):
 
 def handle_tool_call(id: Any, params: dict):
     """Handle tool execution"""
-    if memory is None:
-        send_error(id, -32000, "Mem0 not initialized - check OPENAI_API_KEY and Qdrant")
-        return
-
     tool_name = params.get("name")
     arguments = params.get("arguments", {})
 
+    # Keyword-only obsidian_search is served by the local index, no client needed
+    if not (tool_name == "obsidian_search" and arguments.get("mode") == "keyword"):
+        init_clients()  # no-op once ready, waits for a running warm-up
+
+    # obsidian_search still answers from the local keyword index without Mem0
+    if memory is None and tool_name != "obsidian_search":
+        send_error(id, -32000, "Mem0 not initialized - check OPENAI_API_KEY and Qdrant")
+        return
+
     try:
         if tool_name == "mem0_recall":
             project_id = arguments.get("project_id")
@@ -312,6 +528,14 @@ def handle_tool_call(id: Any, params: dict):
             else:
                 content = f"No memories found for project '{project_id}'. This might be a new project or first session."
 
+            # Documentation suggestions found in the background since the last save
+            pending_docs = get_doc_suggestions(project_id).get(project_id, [])
+            if pending_docs:
+                content += f"\n📝 {len(pending_docs)} documentation suggestion(s) pending:\n\n"
+                for suggestion in pending_docs:
+                    content += format_doc_suggestion(suggestion)
+                content += f"\n   [Use mem0_doc_suggestions to get drafts - Claude Code will propose creation]"
+
         elif tool_name == "mem0_save":
             project_id = arguments.get("project_id")
             memory_content = arguments.get("content")
@@ -328,20 +552,31 @@ def handle_tool_call(id: Any, params: dict):
                     "user_id": project_id
                 })
 
-            # Analyze for documentation (Phase 2)
-            doc_suggestion = analyze_for_documentation(memory_content, project_id)
+            # Analyze for documentation (Phase 2) in the background
+            queue_doc_analysis(project_id, memory_content)
 
-            # Base response
             content = f"Memory saved locally for project '{project_id}' ✅"
 
-            # Add suggestion if found
-            if doc_suggestion:
-                content += f"\n\n💡 Documentation suggestion detected:\n"
-                content += f"   Type: {doc_suggestion.get('type', 'unknown')}\n"
-                content += f"   Confidence: {doc_suggestion.get('confidence', 0):.0%}\n"
-                content += f"   Title: {doc_suggestion.get('title', 'N/A')}\n"
-                content += f"   Path: {doc_suggestion.get('suggested_path', 'N/A')}\n"
-                content += f"\n   [Draft ready - Claude Code will propose creation]"
+        elif tool_name == "mem0_doc_suggestions":
+            project_id = arguments.get("project_id")
+            clear = arguments.get("clear", False)
+
+            suggestions = get_doc_suggestions(project_id, clear=clear)
+
+            if suggestions:
+                content = ""
+                for proj, items in sorted(suggestions.items()):
+                    content += f"Documentation suggestions for '{proj}' ({len(items)}):\n\n"
+                    for suggestion in items:
+                        content += format_doc_suggestion(suggestion)
+                        content += f"\n   Draft:\n{suggestion.get('draft_content', '')}\n\n"
+                if clear:
+                    content += "[Suggestions cleared]"
+            else:
+                pending = doc_queue.unfinished_tasks
+                content = "No documentation suggestions yet."
+                if pending:
+                    content += f" ({pending} memory analysis still running)"
 
         elif tool_name == "mem0_search":
             project_id = arguments.get("project_id")
@@ -383,51 +618,87 @@ def handle_tool_call(id: Any, params: dict):
             # Check Qdrant connection
             try:
                 from qdrant_client import QdrantClient
-                client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+                client = qdrant_client or QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
                 collections = client.get_collections()
                 content = f"✅ Mem0 LOCAL healthy\n"
-                content += f"Qdrant: {QDRANT_HOST}:{QDRANT_PORT}\n"
+                content += f"Qdrant: {QDRANT_LOCATION or f'{QDRANT_HOST}:{QDRANT_PORT}'}\n"
                 content += f"Collections: {len(collections.collections)}\n"
                 content += f"OpenAI: Configured\n"
+                cache_stats = embedding_cache.stats()
+                content += (f"Embedding cache: {cache_stats['hits']} hits "
+                            f"({cache_stats['memory_hits']} memory / {cache_stats['disk_hits']} disk), "
+                            f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)\n")
+                keyword_stats = keyword_index.stats()
+                content += f"Keyword index: {keyword_stats['chunks']} chunks / {keyword_stats['files']} files\n"
+                content += "Startup: " + ", ".join(
+                    f"{component} {seconds * 1000:.0f}ms" for component, seconds in startup_profile.items()
+                ) + "\n"
             except Exception as e:
                 content = f"❌ Health check failed: {e}"
 
         elif tool_name == "obsidian_search":
             query = arguments.get("query")
             limit = arguments.get("limit", 5)
+            mode = arguments.get("mode", "hybrid")
 
-            if not openai_client or not qdrant_client:
-                content = "❌ Obsidian search not available (OpenAI/Qdrant not initialized)"
+            if mode == "vector" and (not embedder or not qdrant_client):
+                content = "❌ Obsidian search not available (embedder/Qdrant not initialized)"
             else:
                 try:
-                    # Create embedding for query
-                    embedding_response = openai_client.embeddings.create(
-                        model=EMBEDDING_MODEL,
-                        input=query
-                    )
-                    query_vector = embedding_response.data[0].embedding
-
-                    # Search in obsidian_vault collection
-                    search_results = qdrant_client.query_points(
-                        collection_name=OBSIDIAN_COLLECTION,
-                        query=query_vector,
-                        limit=limit
-                    ).points
+                    fetch = limit * OBSIDIAN_CHUNK_FETCH
+                    rankings = []
+                    warning = ""
+
+                    # Keyword hits from the local BM25 index (no network call)
+                    if mode != "vector":
+                        rankings.append(keyword_index.search(query, fetch))
+
+                    if mode != "keyword":
+                        try:
+                            if not embedder or not qdrant_client:
+                                raise RuntimeError("embedder/Qdrant not initialized")
+
+                            # Create embedding for query (cached by model + normalized text)
+                            query_vector = embedding_cache.get_or_create(
+                                EMBEDDING_MODEL, query,
+                                lambda text: embedder.embed_batch([text], timeout=OBSIDIAN_EMBED_TIMEOUT)[0]
+                            )
+
+                            # Search chunks in obsidian_vault collection
+                            rankings.append(qdrant_client.query_points(
+                                collection_name=OBSIDIAN_COLLECTION,
+                                query=query_vector,
+                                limit=fetch
+                            ).points)
+                        except Exception as e:
+                            if mode == "vector":
+                                raise
+                            warning = f"⚠️ Vector search unavailable ({e}) - keyword results only\n\n"
+
+                    # Fuse by reciprocal rank, then one result per file
+                    hits = rrf_fuse(rankings) if len(rankings) > 1 else rankings[0]
+                    search_results = collapse_chunk_hits(hits, limit)
+                    label = score_label(rankings, mode)
 
                     if search_results:
-                        content = f"Found {len(search_results)} Obsidian documents for '{query}':\n\n"
-                        for i, hit in enumerate(search_results, 1):
+                        content = warning + f"Found {len(search_results)} Obsidian documents for '{query}' ({mode}):\n\n"
+                        for i, (hit, matches) in enumerate(search_results, 1):
                             payload = hit.payload
                             file_path = payload.get('file_path', 'unknown')
                             file_type = payload.get('file_type', 'DOC')
                             project = payload.get('project_id', 'N/A')
                             preview = payload.get('content_preview', '')[:150]
 
-                            content += f"{i}. [{hit.score:.2f}] {file_path}\n"
+                            content += f"{i}. [{label} {hit.score:.3f}] {file_path}\n"
                             content += f"   Type: {file_type} | Project: {project}\n"
+                            if payload.get('heading_path'):
+                                content += f"   Section: {' > '.join(payload['heading_path'])}\n"
+                            if 'char_start' in payload:
+                                content += (f"   Chars: {payload['char_start']}-{payload['char_end']}"
+                                            f" ({matches} matching chunk{'s' if matches > 1 else ''})\n")
                             content += f"   Preview: {preview}...\n\n"
                     else:
-                        content = f"No Obsidian documentation found for query '{query}'"
+                        content = warning + f"No Obsidian documentation found for query '{query}'"
 
                 except Exception as e:
                     content = f"❌ Obsidian search error: {e}"
@@ -448,30 +719,51 @@ def handle_tool_call(id: Any, params: dict):
     except Exception as e:
         send_error(id, -32000, f"Tool execution failed: {str(e)}")
 
+def handle_message(request: dict):
+    """Dispatch one JSON-RPC message"""
+    method = request.get("method")
+    id = request.get("id")
+    params = request.get("params", {})
+
+    if method == "initialize":
+        handle_initialize(id, params)
+    elif method == "tools/list":
+        handle_tools_list(id)
+    elif method == "tools/call":
+        handle_tool_call(id, params)
+    else:
+        send_error(id, -32601, f"Unknown method: {method}")
+
+def profile_startup():
+    """Report import and init time per component, then exit"""
+    ready_s = time.perf_counter() - STARTUP_T0
+    print(f"Server module ready (initialize answerable): {ready_s * 1000:.0f} ms")
+
+    ok = init_clients()
+    if qdrant_client is not None:
+        try:
+            timed("Qdrant probe (get_collections)", qdrant_client.get_collections)
+        except Exception as e:
+            print(f"⚠️  Qdrant probe failed: {e}")
+
+    print()
+    print(f"{'Component':<36} {'Time':>10}")
+    print("-" * 47)
+    for component, seconds in startup_profile.items():
+        print(f"{component:<36} {seconds * 1000:>7.0f} ms")
+    print("-" * 47)
+    print(f"{'Total lazy init':<36} {sum(startup_profile.values()) * 1000:>7.0f} ms")
+    print(f"\n{'✅ Mem0 ready' if ok else '❌ Mem0 not ready'}")
+
 def main():
-    """Main MCP server loop"""
-    print("🚀 Mem0 LOCAL MCP Server starting...", file=sys.stderr)
+    """Main MCP server loop - tool calls run concurrently, responses tagged by id"""
+    if '--profile-startup' in sys.argv:
+        profile_startup()
+        return
 
-    for line in sys.stdin:
-        try:
-            request = json.loads(line)
-            method = request.get("method")
-            id = request.get("id")
-            params = request.get("params", {})
-
-            if method == "initialize":
-                handle_initialize(id, params)
-            elif method == "tools/list":
-                handle_tools_list(id)
-            elif method == "tools/call":
-                handle_tool_call(id, params)
-            else:
-                send_error(id, -32601, f"Unknown method: {method}")
+    print("🚀 Mem0 LOCAL MCP Server starting...", file=sys.stderr)
 
-        except json.JSONDecodeError as e:
-            print(f"❌ Invalid JSON: {e}", file=sys.stderr)
-        except Exception as e:
-            print(f"❌ Error: {e}", file=sys.stderr)
+    run_dispatcher(handle_message)
 
 if __name__ == "__main__":
     main()
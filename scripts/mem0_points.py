@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Mem0 Points - Write memory JSON backups straight to Mem0's Qdrant collection
+Used by reindex_missing_memories.py --direct and migrate_json_to_qdrant.py
+
+The JSON backups already hold distilled memories, so re-adding them through
+Memory.add() pays one LLM extraction per memory and gets new point IDs
+(which is how re-index runs created duplicates). Here the stored text is
+batch-embedded and upserted with:
+- the original memory ID as point ID (re-runs overwrite, never duplicate)
+- the payload Mem0 itself writes (data, hash, user_id, created_at, ...), so
+  mem0_search / get_all see these points like any other memory
+
+    points = [memory_point(project, memory_data, vector), ...]
+    upsert_points(session, points)
+"""
+
+import hashlib
+import uuid
+from datetime import datetime
+from embedders import estimate_tokens
+
+# Configuration
+QDRANT_HOST = "localhost"
+QDRANT_PORT = 6333
+MEM0_COLLECTION = "mem0"
+SCROLL_PAGE = 5000  # points per scroll request (IDs + original_id only)
+EMBEDDING_PRICE_PER_1M = 0.02  # USD, text-embedding-3-small
+
+def point_id(project_name: str, memory_id: str) -> str:
+    """Qdrant point ID for a memory: its own ID when it is a UUID (Mem0 IDs are)"""
+    try:
+        return str(uuid.UUID(memory_id))
+    except (ValueError, TypeError, AttributeError):
+        # Legacy IDs: deterministic, so re-runs still overwrite the same point
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"mem0/{project_name}/{memory_id}"))
+
+def memory_payload(project_name: str, memory_data: dict, source: str) -> dict:
+    """Payload in Mem0's format (Memory._create_memory) plus provenance keys"""
+    text = memory_data.get('memory', '')
+    payload = {
+        'data': text,
+        'hash': hashlib.md5(text.encode()).hexdigest(),
+        'user_id': project_name,
+        'created_at': memory_data.get('created_at') or datetime.now().isoformat(),
+        'source': source,
+        'original_id': memory_data.get('id', ''),
+    }
+    if memory_data.get('updated_at'):
+        payload['updated_at'] = memory_data['updated_at']
+    for key, value in (memory_data.get('metadata') or {}).items():
+        payload.setdefault(key, value)
+    return payload
+
+def memory_point(project_name: str, memory_data: dict, vector: list, source: str = 'reindex') -> dict:
+    return {
+        'id': point_id(project_name, memory_data.get('id', '')),
+        'vector': vector,
+        'payload': memory_payload(project_name, memory_data, source)
+    }
+
+def qdrant_url(path: str, collection: str = MEM0_COLLECTION) -> str:
+    return f"http://{QDRANT_HOST}:{QDRANT_PORT}/collections/{collection}{path}"
+
+def ensure_collection(session, dim: int, collection: str = MEM0_COLLECTION):
+    """Create the collection as Mem0 would (cosine) if it does not exist yet"""
+    response = session.get(qdrant_url("", collection), timeout=10)
+    if response.status_code == 200:
+        return
+    response = session.put(qdrant_url("", collection),
+                           json={'vectors': {'size': dim, 'distance': 'Cosine'}}, timeout=30)
+    if response.status_code != 200:
+        raise RuntimeError(f"Cannot create collection {collection}: HTTP {response.status_code}")
+
+def upsert_points(session, points: list, collection: str = MEM0_COLLECTION):
+    """PUT a batch of points (wait=true: written once this returns). Raises on failure."""
+    response = session.put(qdrant_url("/points?wait=true", collection), json={'points': points}, timeout=60)
+    if response.status_code != 200:
+        raise RuntimeError(f"Qdrant upsert failed: HTTP {response.status_code} {response.text[:200]}")
+
+def existing_memory_ids(session, project_name: str, collection: str = MEM0_COLLECTION) -> set:
+    """Memory IDs already in Qdrant for a project: point IDs and original_id payloads"""
+    existing = set()
+    offset = None
+
+    while True:
+        payload = {
+            'filter': {'must': [{'key': 'user_id', 'match': {'value': project_name}}]},
+            'limit': SCROLL_PAGE,
+            'with_payload': ['original_id'],
+            'with_vector': False
+        }
+        if offset is not None:
+            payload['offset'] = offset
+
+        response = session.post(qdrant_url("/points/scroll", collection), json=payload, timeout=30)
+        if response.status_code != 200:
+            raise RuntimeError(f"Qdrant scroll failed: HTTP {response.status_code}")
+
+        result = response.json().get('result', {})
+        for point in result.get('points', []):
+            existing.add(str(point['id']))
+            original_id = (point.get('payload') or {}).get('original_id')
+            if original_id:
+                existing.add(str(original_id))
+
+        offset = result.get('next_page_offset')
+        if offset is None:
+            break
+
+    return existing
+
+def estimate_batch_tokens(texts) -> int:
+    """Estimated tokens of texts, with the vault indexer's estimate (embedders.estimate_tokens)"""
+    return sum(estimate_tokens(text) for text in texts)
+
+def embedding_cost(tokens: int) -> float:
+    return tokens * EMBEDDING_PRICE_PER_1M / 1_000_000
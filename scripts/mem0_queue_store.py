@@ -0,0 +1,969 @@
+#!/usr/bin/env python3
+"""
+Mem0 Queue Store - Append-only segmented log (default) or SQLite (WAL)
+Shared by mem0_mcp_server.py (enqueue) and mem0_queue_worker.py (drain)
+
+Backend selection: MEM0_QUEUE_BACKEND=log|sqlite (default: log)
+
+Layout of ~/.claude/mem0_queue.d/:
+  segment-000001.log   one JSON record per queued entry (fsync'd appends)
+  checkpoint.json      ack offset, out-of-order acks, stats, last_100
+
+Enqueue is a single append, so mem0_save stays O(1) however large the
+backlog grows. Acknowledgements only rewrite the small checkpoint; fully
+acknowledged segments are dropped and the log is compacted periodically.
+
+The log backend expects callers to hold mem0_queue.lock around every call
+(uses_file_lock = True). The SQLite backend keeps the queue, the DLQ, the
+last_100 cache and the stats as tables in ~/.claude/mem0_queue.db; WAL mode
+lets status readers run while the worker writes, so it needs no flock.
+
+The DLQ is scheduled by next-attempt time: the worker only sees the items
+that are due (dlq_due) and sleeps until the next one (dlq_next_due). The
+log backend keeps a min-heap in memory and persists changes by appending to
+mem0_queue_dlq.journal (folded into mem0_queue_dlq.json every
+DLQ_JOURNAL_COMPACT records); SQLite indexes a next_attempt column.
+
+Failed queue entries get a next_retry_at (30s doubling per retry, see
+queue_retry_at): claim() only hands out entries that are due, so a wake-up
+delivers new saves sooner without retrying a failing entry sooner. With
+per-project ordering, entries queued behind a waiting one wait with it.
+
+Wake-up channel: the worker binds a Unix datagram socket
+(~/.claude/mem0_worker.sock) and blocks on it between cycles; enqueuers
+call notify_worker() after each append, so a save is drained within
+milliseconds instead of at the next poll.
+"""
+
+import heapq
+import json
+import os
+import select
+import socket
+import time
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime
+
+# Configuration
+QUEUE_BACKEND = os.getenv("MEM0_QUEUE_BACKEND", "log")
+QUEUE_DIR = Path.home() / ".claude/mem0_queue.d"
+QUEUE_DB = Path.home() / ".claude/mem0_queue.db"
+LEGACY_QUEUE_FILE = Path.home() / ".claude/mem0_queue.json"
+DLQ_FILE = Path.home() / ".claude/mem0_queue_dlq.json"
+SEGMENT_MAX_BYTES = 1024 * 1024  # Roll to a new segment after 1 MB
+COMPACT_MIN_ACKED = 500  # Rewrite the log once this many acks sit past the head
+LAST_100_SIZE = 100
+CLAIM_LEASE = 300  # seconds before a claimed SQLite row can be claimed again
+SQLITE_BUSY_TIMEOUT = 30  # seconds
+DLQ_BASE_DELAY = 30  # seconds before a DLQ retry, doubled per failed retry
+DLQ_MAX_BACKOFF = 3600  # 1 hour max
+DLQ_JOURNAL_COMPACT = 1000  # journal records before the DLQ file is rewritten
+QUEUE_RETRY_DELAY = 30  # seconds before a failed queue entry is retried, doubled per retry
+WAKE_SOCKET = Path.home() / ".claude/mem0_worker.sock"
+
+def empty_queue() -> dict:
+    """Return an empty queue structure"""
+    return {
+        "queue": [],
+        "last_100": [],
+        "failed": [],
+        "stats": {
+            "total_queued": 0,
+            "total_synced": 0,
+            "total_failed": 0,
+            "last_sync": None
+        }
+    }
+
+def _fsync_write(path: Path, data: bytes, append: bool = False):
+    """Write bytes to path and fsync before returning"""
+    flags = os.O_CREAT | (os.O_RDWR | os.O_APPEND if append else os.O_WRONLY | os.O_TRUNC)
+    fd = os.open(path, flags, 0o600)
+    try:
+        if append:
+            # Terminate a torn record left by a crash so the next one stays parseable
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                data = b'\n' + data
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def dlq_schedule(item: dict) -> dict:
+    """Set next_attempt: last attempt + 30s * 2^retry_count, capped at DLQ_MAX_BACKOFF"""
+    delay = min(2 ** min(item.get('retry_count', 0), 32) * DLQ_BASE_DELAY, DLQ_MAX_BACKOFF)
+    item['next_attempt'] = item.get('last_attempt', 0) + delay
+    return item
+
+def _next_attempt(item: dict) -> float:
+    """Items written before scheduling existed get their next_attempt computed"""
+    if 'next_attempt' not in item:
+        dlq_schedule(item)
+    return item['next_attempt']
+
+def queue_retry_at(retries: int, now: float = None) -> float:
+    """When an entry that failed `retries` times is due again: now + 30s * 2^(retries-1), capped"""
+    now = time.time() if now is None else now
+    return now + min(2 ** min(max(retries - 1, 0), 32) * QUEUE_RETRY_DELAY, DLQ_MAX_BACKOFF)
+
+def split_due(entries: list, now: float = None, ordered: bool = True) -> tuple:
+    """(due, deferred): entries whose next_retry_at has passed, order kept
+
+    ordered: a project's entries queued behind a deferred one are deferred
+    too, so the backoff never lets later memories overtake a failing one.
+    """
+    now = time.time() if now is None else now
+    due, deferred, blocked = [], [], set()
+    for entry in entries:
+        project_id = entry.get("project_id")
+        if entry.get("next_retry_at", 0) > now or (ordered and project_id in blocked):
+            deferred.append(entry)
+            if ordered:
+                blocked.add(project_id)
+        else:
+            due.append(entry)
+    return due, deferred
+
+def _encode(entry: dict) -> bytes:
+    return (json.dumps(entry, separators=(',', ':')) + '\n').encode()
+
+def _status(queue_size: int, dlq_size: int, oldest_timestamp, failed: list, stats: dict) -> dict:
+    return {
+        "queue_size": queue_size,
+        "failed_size": len(failed),
+        "dlq_size": dlq_size,
+        "oldest_timestamp": oldest_timestamp,
+        "stats": dict(empty_queue()["stats"], **stats)
+    }
+
+class SegmentedQueue:
+    """Append-only queue log with a checkpoint file for acknowledgements"""
+
+    uses_file_lock = True
+
+    def __init__(self, queue_dir: Path = QUEUE_DIR, legacy_file: Path = LEGACY_QUEUE_FILE,
+                 dlq_file: Path = DLQ_FILE):
+        self.dir = Path(queue_dir)
+        self.checkpoint_file = self.dir / "checkpoint.json"
+        self.legacy_file = Path(legacy_file)
+        self.dlq_file = Path(dlq_file)
+        self.dlq_journal = self.dlq_file.with_suffix('.journal')
+        self.location = str(self.dir)
+        self._dlq = None  # id -> item (insertion order), cached between worker cycles
+        self._dlq_heap = []  # (next_attempt, id), stale entries skipped lazily
+        self._dlq_records = 0  # journal records since the last rewrite
+        self._dlq_stamp = None  # (json, journal) file stamps the cache was built from
+
+    # ------------------------------------------------------------------
+    # Segments and checkpoint
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.dir / f"segment-{seq:06d}.log"
+
+    def _segments(self) -> list:
+        """Sorted sequence numbers of the segment files on disk"""
+        seqs = []
+        for path in self.dir.glob("segment-*.log"):
+            try:
+                seqs.append(int(path.stem.split('-', 1)[1]))
+            except ValueError:
+                continue
+        return sorted(seqs)
+
+    def _new_checkpoint(self, seq: int = 1, offset: int = 0) -> dict:
+        return {
+            "version": 1,
+            "head": [seq, offset],  # Every record before this is acknowledged
+            "seen": [seq, offset],  # Log end at the last save (for stats)
+            "acked": [],            # Acknowledged ids past the head
+            "retries": {},          # Retry counts of pending entries
+            "retry_at": {},         # next_retry_at of pending entries that failed
+            "stats": empty_queue()["stats"],
+            "last_100": [],
+            "failed": []
+        }
+
+    def _read_checkpoint(self) -> dict:
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return self._new_checkpoint(*(self._segments()[:1] or [1]))
+
+    def _write_checkpoint(self, ckpt: dict):
+        ckpt["updated_at"] = datetime.now().isoformat()
+        tmp_file = self.checkpoint_file.with_suffix('.tmp')
+        _fsync_write(tmp_file, json.dumps(ckpt).encode())
+        tmp_file.replace(self.checkpoint_file)
+
+    def _ensure(self):
+        """Create the store, importing a legacy mem0_queue.json if present"""
+        if self.checkpoint_file.exists():
+            return
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        legacy = None
+        if self.legacy_file.exists():
+            try:
+                with open(self.legacy_file, 'r') as f:
+                    legacy = json.load(f)
+            except (OSError, ValueError):
+                legacy = None
+
+        seq = (self._segments() or [1])[-1]
+        ckpt = self._new_checkpoint(seq)
+
+        if legacy:
+            entries = legacy.get("queue", [])
+            if entries:
+                _fsync_write(self._segment_path(seq), b''.join(_encode(e) for e in entries), append=True)
+            ckpt["seen"] = [seq, self._segment_path(seq).stat().st_size if entries else 0]
+            ckpt["stats"].update(legacy.get("stats", {}))
+            ckpt["last_100"] = legacy.get("last_100", [])[-LAST_100_SIZE:]
+            ckpt["failed"] = legacy.get("failed", [])
+
+        self._write_checkpoint(ckpt)
+
+        if legacy is not None:
+            self.legacy_file.replace(self.legacy_file.with_suffix('.json.migrated'))
+
+    def _scan(self, ckpt: dict):
+        """Yield (seq, end_offset, entry) for every complete record past the head"""
+        head_seq, head_offset = ckpt["head"]
+
+        for seq in self._segments():
+            if seq < head_seq:
+                continue
+
+            try:
+                with open(self._segment_path(seq), 'rb') as f:
+                    if seq == head_seq:
+                        f.seek(head_offset)
+                    offset = f.tell()
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break  # Torn tail, not yet a record
+                        offset += len(line)
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(entry, dict) and "id" in entry:
+                            yield seq, offset, entry
+            except FileNotFoundError:
+                continue
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def append(self, entry: dict):
+        """Append one entry to the active segment (O(1), fsync'd)"""
+        self._ensure()
+
+        segments = self._segments()
+        seq = segments[-1] if segments else self._read_checkpoint()["head"][0]
+        path = self._segment_path(seq)
+        if path.exists() and path.stat().st_size >= SEGMENT_MAX_BYTES:
+            path = self._segment_path(seq + 1)
+
+        _fsync_write(path, _encode(entry), append=True)
+
+    def load(self) -> dict:
+        """Replay the log into the classic queue structure"""
+        self._ensure()
+        ckpt = self._read_checkpoint()
+
+        acked = set(ckpt.get("acked", []))
+        retries = ckpt.get("retries", {})
+        retry_at = ckpt.get("retry_at", {})
+        seen_pos = tuple(ckpt.get("seen", ckpt["head"]))
+
+        pending = []
+        new_entries = []
+        logged = set()
+
+        for seq, end, entry in self._scan(ckpt):
+            entry_id = entry["id"]
+            if entry_id in logged:
+                continue  # Leftover copy from an interrupted compaction
+            logged.add(entry_id)
+
+            if (seq, end) > seen_pos:
+                new_entries.append(entry)
+
+            if entry_id in acked:
+                continue
+
+            if entry_id in retries:
+                entry["retries"] = retries[entry_id]
+            if entry_id in retry_at:
+                entry["next_retry_at"] = retry_at[entry_id]
+            pending.append(entry)
+
+        # Emergency buffer entries are merged late; keep the queue in timestamp order
+        pending.sort(key=lambda e: e.get("timestamp", 0))
+
+        stats = dict(empty_queue()["stats"], **ckpt.get("stats", {}))
+        stats["total_queued"] += len(new_entries)
+
+        return {
+            "queue": pending,
+            "last_100": (ckpt.get("last_100", []) + new_entries)[-LAST_100_SIZE:],
+            "failed": ckpt.get("failed", []),
+            "stats": stats
+        }
+
+    def save(self, queue_data: dict):
+        """Acknowledge every logged entry missing from queue_data["queue"]
+
+        Entries in queue_data["queue"] that are not in the log yet (e.g. merged
+        from the emergency buffer) are appended first.
+        """
+        self._ensure()
+        ckpt = self._read_checkpoint()
+
+        pending = {e["id"]: e for e in queue_data.get("queue", [])}
+
+        logged = set(entry["id"] for _, _, entry in self._scan(ckpt))
+        for entry_id, entry in pending.items():
+            if entry_id not in logged:
+                self.append(entry)
+
+        head = tuple(ckpt["head"])
+        seen = tuple(ckpt.get("seen", head))
+        advancing = True
+        acked = []
+        live = []
+        logged = set()
+
+        for seq, end, entry in self._scan(ckpt):
+            entry_id = entry["id"]
+            seen = max(seen, (seq, end))
+            if entry_id in logged:
+                if advancing:
+                    head = (seq, end)
+                continue
+            logged.add(entry_id)
+
+            if entry_id in pending:
+                advancing = False
+                live.append(pending[entry_id])
+            elif advancing:
+                head = (seq, end)  # Contiguous acks just move the offset
+            else:
+                acked.append(entry_id)
+
+        ckpt.update({
+            "head": list(head),
+            "seen": list(seen),
+            "acked": acked,
+            "retries": {i: e["retries"] for i, e in pending.items() if e.get("retries")},
+            "retry_at": {i: e["next_retry_at"] for i, e in pending.items() if e.get("next_retry_at")},
+            "stats": queue_data.get("stats", ckpt.get("stats", {})),
+            "last_100": queue_data.get("last_100", [])[-LAST_100_SIZE:],
+            "failed": queue_data.get("failed", [])
+        })
+
+        if len(acked) >= COMPACT_MIN_ACKED:
+            self._compact(ckpt, live)
+        else:
+            self._write_checkpoint(ckpt)
+            self._drop_segments_before(head[0])
+
+    def _compact(self, ckpt: dict, live: list):
+        """Rewrite pending entries into a fresh segment and drop the old ones"""
+        seq = (self._segments() or [0])[-1] + 1
+        path = self._segment_path(seq)
+        _fsync_write(path, b''.join(_encode(e) for e in live))
+
+        # Old segments stay until the checkpoint points past them, so a crash
+        # here only leaves duplicates that load() skips by id
+        size = path.stat().st_size
+        ckpt.update({"head": [seq, 0], "seen": [seq, size], "acked": []})
+        self._write_checkpoint(ckpt)
+        self._drop_segments_before(seq)
+
+    def _drop_segments_before(self, seq: int):
+        for old_seq in self._segments():
+            if old_seq >= seq:
+                break
+            try:
+                self._segment_path(old_seq).unlink()
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Worker API (shared with SQLiteQueue)
+    # ------------------------------------------------------------------
+
+    def status(self) -> dict:
+        """Queue size, DLQ size, oldest pending timestamp and stats"""
+        data = self.load()
+        oldest = min((e["timestamp"] for e in data["queue"]), default=None)
+        return _status(len(data["queue"]), len(self.load_dlq()), oldest, data["failed"], data["stats"])
+
+    def claim(self, ordered: bool = True) -> list:
+        """Due pending entries in timestamp order (the flock is the claim), see split_due"""
+        return split_due(self.load()["queue"], ordered=ordered)[0]
+
+    def commit(self, synced_ids: list, retried: dict, dead: list, released: list = ()):
+        """Acknowledge synced ids, record retries, move dead entries to the DLQ
+
+        retried maps id -> (retry count, next_retry_at).
+
+        released (claimed but not attempted) needs no bookkeeping here: the
+        flock held around claim() was the only claim.
+        """
+        data = self.load()
+        done = set(synced_ids) | set(e["id"] for e in dead)
+
+        data["queue"] = [e for e in data["queue"] if e["id"] not in done]
+        for entry in data["queue"]:
+            if entry["id"] in retried:
+                entry["retries"], entry["next_retry_at"] = retried[entry["id"]]
+
+        if synced_ids:
+            data["stats"]["total_synced"] += len(synced_ids)
+            data["stats"]["last_sync"] = datetime.now().isoformat()
+
+        if dead:
+            self.dlq_add(dead)
+        self.save(data)
+
+    def merge(self, entries: list) -> int:
+        """Merge entries by id (duplicates skipped), returns how many were new"""
+        data = self.load()
+        known = set(e["id"] for e in data["queue"])
+
+        new_entries = []
+        for entry in entries:
+            if entry.get("id") and entry["id"] not in known:
+                known.add(entry["id"])
+                new_entries.append(entry)
+
+        if new_entries:
+            data["queue"] = sorted(data["queue"] + new_entries, key=lambda e: e.get("timestamp", 0))
+            data["last_100"] = (data["last_100"] + new_entries)[-LAST_100_SIZE:]
+            data["stats"]["total_queued"] += len(new_entries)
+            self.save(data)
+
+        return len(new_entries)
+
+    # ------------------------------------------------------------------
+    # DLQ: JSON snapshot + append-only journal, min-heap in memory
+    # ------------------------------------------------------------------
+
+    def _dlq_file_stamp(self) -> tuple:
+        stamps = []
+        for path in (self.dlq_file, self.dlq_journal):
+            try:
+                stat = path.stat()
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _dlq_items(self) -> dict:
+        """The DLQ as {id: item}, rebuilt only when its files changed on disk"""
+        stamp = self._dlq_file_stamp()
+        if self._dlq is not None and stamp == self._dlq_stamp:
+            return self._dlq
+
+        items = {}
+        try:
+            with open(self.dlq_file, 'r') as f:
+                for item in json.load(f).get('items', []):
+                    items[item['id']] = item
+        except (OSError, ValueError):
+            pass
+
+        records = 0
+        try:
+            with open(self.dlq_journal, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # Torn tail
+                    records += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'item' in record:
+                        items[record['item']['id']] = record['item']
+                    else:
+                        items.pop(record.get('del'), None)
+        except FileNotFoundError:
+            pass
+
+        self._dlq = items
+        self._dlq_heap = [(_next_attempt(item), item_id) for item_id, item in items.items()]
+        heapq.heapify(self._dlq_heap)
+        self._dlq_records = records
+        self._dlq_stamp = stamp
+        return items
+
+    def _dlq_journal_append(self, records: list):
+        """Persist DLQ changes as journal records, rewriting the snapshot when it grows"""
+        items = self._dlq_items()
+        if self._dlq_records + len(records) >= DLQ_JOURNAL_COMPACT:
+            self.save_dlq(list(items.values()))
+            return
+
+        self.dlq_file.parent.mkdir(parents=True, exist_ok=True)
+        _fsync_write(self.dlq_journal, b''.join(_encode(record) for record in records), append=True)
+        self._dlq_records += len(records)
+        self._dlq_stamp = self._dlq_file_stamp()
+
+    def load_dlq(self) -> list:
+        """Load Dead Letter Queue items"""
+        return list(self._dlq_items().values())
+
+    def save_dlq(self, items: list):
+        """Replace Dead Letter Queue items (full rewrite, empties the journal)"""
+        self.dlq_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.dlq_file.with_suffix('.tmp')
+        _fsync_write(tmp_file, json.dumps({
+            'items': items,
+            'last_update': datetime.now().isoformat()
+        }, indent=2).encode())
+        tmp_file.replace(self.dlq_file)
+        try:
+            self.dlq_journal.unlink()
+        except FileNotFoundError:
+            pass
+        self._dlq = None  # Rebuilt (with its heap) on next access
+
+    def dlq_add(self, items: list):
+        """Add or replace DLQ items (O(log n) each, one journal append)"""
+        dlq = self._dlq_items()
+        for item in items:
+            dlq[item['id']] = item
+            heapq.heappush(self._dlq_heap, (_next_attempt(item), item['id']))
+        self._dlq_journal_append([{'item': item} for item in items])
+
+    def _dlq_head(self):
+        """Valid (next_attempt, id) at the top of the heap, stale entries dropped"""
+        dlq = self._dlq_items()
+        while self._dlq_heap:
+            next_attempt, item_id = self._dlq_heap[0]
+            item = dlq.get(item_id)
+            if item is not None and item.get('next_attempt') == next_attempt:
+                return self._dlq_heap[0]
+            heapq.heappop(self._dlq_heap)  # Removed or rescheduled since pushed
+        return None
+
+    def dlq_next_due(self):
+        """Earliest next_attempt in the DLQ (None when empty)"""
+        head = self._dlq_head()
+        return head[0] if head else None
+
+    def dlq_due(self, now: float = None) -> list:
+        """Pop the items whose next_attempt has passed, earliest first
+
+        Every returned item must be handed back to dlq_update() (recovered,
+        retried or released) so it is pushed back on the heap.
+        """
+        now = time.time() if now is None else now
+        due = {}
+        while True:
+            head = self._dlq_head()
+            if head is None or head[0] > now:
+                return list(due.values())
+            heapq.heappop(self._dlq_heap)
+            due.setdefault(head[1], dict(self._dlq[head[1]]))  # A rebuilt heap may hold an id twice
+
+    def dlq_update(self, recovered_ids: list, retried: list, released: list = ()):
+        """Drop recovered items, reschedule retried ones; released go back untouched"""
+        dlq = self._dlq_items()
+        for item in released:
+            if item['id'] in dlq:
+                heapq.heappush(self._dlq_heap, (_next_attempt(dlq[item['id']]), item['id']))
+
+        records = [{'del': item_id} for item_id in recovered_ids if dlq.pop(item_id, None) is not None]
+        for item in retried:
+            dlq[item['id']] = item
+            heapq.heappush(self._dlq_heap, (_next_attempt(item), item['id']))
+            records.append({'item': item})
+
+        if records:
+            self._dlq_journal_append(records)
+
+class SQLiteQueue:
+    """Queue, DLQ, last_100 and stats as tables in one SQLite database (WAL)"""
+
+    uses_file_lock = False
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS queue (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            project_id TEXT,
+            timestamp INTEGER NOT NULL,
+            retries INTEGER NOT NULL DEFAULT 0,
+            claimed_at REAL,
+            next_retry_at REAL NOT NULL DEFAULT 0,
+            entry TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS queue_timestamp ON queue(timestamp);
+        CREATE TABLE IF NOT EXISTS dlq (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            entry TEXT NOT NULL,
+            next_attempt REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS last_100 (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS stats (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_file: Path = QUEUE_DB, timeout: float = SQLITE_BUSY_TIMEOUT):
+        self.db_file = Path(db_file)
+        self.timeout = timeout
+        self.location = str(self.db_file)
+        self._schema_ready = False
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_file), timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA synchronous=FULL")
+        if not self._schema_ready:
+            self._init_schema(conn)
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fresh = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = 'queue'").fetchone()[0] == 0
+            for statement in self.SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            self._migrate_queue(conn)
+            self._migrate_dlq(conn)
+            if fresh:
+                self._import_legacy(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._schema_ready = True
+
+    def _migrate_queue(self, conn: sqlite3.Connection):
+        """Databases created before queue retry backoff: add next_retry_at (due now)"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(queue)")]
+        if 'next_retry_at' not in columns:
+            conn.execute("ALTER TABLE queue ADD COLUMN next_retry_at REAL NOT NULL DEFAULT 0")
+
+    def _migrate_dlq(self, conn: sqlite3.Connection):
+        """Databases created before DLQ scheduling: add and backfill next_attempt"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(dlq)")]
+        if 'next_attempt' not in columns:
+            conn.execute("ALTER TABLE dlq ADD COLUMN next_attempt REAL NOT NULL DEFAULT 0")
+            rows = conn.execute("SELECT id, entry FROM dlq").fetchall()
+            conn.executemany("UPDATE dlq SET next_attempt = ? WHERE id = ?",
+                             [(_next_attempt(json.loads(entry)), item_id) for item_id, entry in rows])
+        conn.execute("CREATE INDEX IF NOT EXISTS dlq_next_attempt ON dlq(next_attempt)")
+
+    def _import_legacy(self, conn: sqlite3.Connection):
+        """Seed a new database from the log store / JSON files"""
+        if (QUEUE_DIR / "checkpoint.json").exists() or LEGACY_QUEUE_FILE.exists():
+            legacy = SegmentedQueue(QUEUE_DIR, LEGACY_QUEUE_FILE, DLQ_FILE)
+            data = legacy.load()
+            for entry in data["queue"]:
+                self._insert(conn, entry)
+            for entry in data["last_100"]:
+                conn.execute("INSERT INTO last_100 (entry) VALUES (?)", (json.dumps(entry),))
+            for key, value in dict(data["stats"], failed=data["failed"]).items():
+                self._set_stat(conn, key, value)
+            for entry in legacy.load_dlq():
+                self._put_dlq(conn, entry)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT (one writer at a time, readers unaffected)"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _reader(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Row helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, entry: dict) -> bool:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO queue (id, project_id, timestamp, retries, next_retry_at, entry) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (entry["id"], entry.get("project_id"), entry.get("timestamp", 0),
+             entry.get("retries", 0), entry.get("next_retry_at", 0), json.dumps(entry))
+        )
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _row_entry(entry_json: str, retries: int, next_retry_at: float = 0) -> dict:
+        entry = json.loads(entry_json)
+        entry["retries"] = retries
+        if next_retry_at:
+            entry["next_retry_at"] = next_retry_at
+        return entry
+
+    @staticmethod
+    def _put_dlq(conn: sqlite3.Connection, item: dict):
+        next_attempt = _next_attempt(item)
+        conn.execute("INSERT OR REPLACE INTO dlq (id, entry, next_attempt) VALUES (?, ?, ?)",
+                     (item["id"], json.dumps(item), next_attempt))
+
+    @staticmethod
+    def _set_stat(conn: sqlite3.Connection, key: str, value):
+        conn.execute("INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    @staticmethod
+    def _stats(conn: sqlite3.Connection) -> dict:
+        stats = dict(empty_queue()["stats"], failed=[])
+        for key, value in conn.execute("SELECT key, value FROM stats"):
+            stats[key] = json.loads(value)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Public API (same surface as SegmentedQueue)
+    # ------------------------------------------------------------------
+
+    def append(self, entry: dict):
+        """Insert one entry, bump total_queued and the last_100 cache"""
+        with self._transaction() as conn:
+            if not self._insert(conn, entry):
+                return
+            conn.execute("INSERT INTO last_100 (entry) VALUES (?)", (json.dumps(entry),))
+            conn.execute("DELETE FROM last_100 WHERE seq <= (SELECT MAX(seq) FROM last_100) - ?",
+                         (LAST_100_SIZE,))
+            total = self._stats(conn)["total_queued"]
+            self._set_stat(conn, "total_queued", total + 1)
+
+    def load(self) -> dict:
+        """Read the whole state into the classic queue structure"""
+        with self._reader() as conn:
+            rows = conn.execute("SELECT entry, retries, next_retry_at FROM queue ORDER BY timestamp, seq").fetchall()
+            last_100 = conn.execute("SELECT entry FROM last_100 ORDER BY seq").fetchall()
+            stats = self._stats(conn)
+
+        failed = stats.pop("failed")
+        return {
+            "queue": [self._row_entry(*row) for row in rows],
+            "last_100": [json.loads(entry) for (entry,) in last_100],
+            "failed": failed,
+            "stats": stats
+        }
+
+    def save(self, queue_data: dict):
+        """Replace the state with queue_data (compatibility path)"""
+        pending = {e["id"]: e for e in queue_data.get("queue", [])}
+
+        with self._transaction() as conn:
+            existing = set(i for (i,) in conn.execute("SELECT id FROM queue"))
+            conn.executemany("DELETE FROM queue WHERE id = ?", [(i,) for i in existing - set(pending)])
+            for entry_id, entry in pending.items():
+                if entry_id in existing:
+                    conn.execute("UPDATE queue SET retries = ?, next_retry_at = ? WHERE id = ?",
+                                 (entry.get("retries", 0), entry.get("next_retry_at", 0), entry_id))
+                else:
+                    self._insert(conn, entry)
+
+            conn.execute("DELETE FROM last_100")
+            conn.executemany("INSERT INTO last_100 (entry) VALUES (?)",
+                             [(json.dumps(e),) for e in queue_data.get("last_100", [])[-LAST_100_SIZE:]])
+            for key, value in dict(queue_data.get("stats", {}), failed=queue_data.get("failed", [])).items():
+                self._set_stat(conn, key, value)
+
+    def status(self) -> dict:
+        """Indexed COUNT / MIN(timestamp) queries, no full parse"""
+        with self._reader() as conn:
+            queue_size, oldest = conn.execute("SELECT COUNT(*), MIN(timestamp) FROM queue").fetchone()
+            dlq_size = conn.execute("SELECT COUNT(*) FROM dlq").fetchone()[0]
+            stats = self._stats(conn)
+
+        failed = stats.pop("failed")
+        return _status(queue_size, dlq_size, oldest, failed, stats)
+
+    def claim(self, ordered: bool = True, lease: float = CLAIM_LEASE) -> list:
+        """Claim every due, unclaimed (or lease-expired) row in a single transaction (see split_due)"""
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT seq, entry, retries, next_retry_at FROM queue "
+                "WHERE claimed_at IS NULL OR claimed_at < ? ORDER BY timestamp, seq",
+                (now - lease,)
+            ).fetchall()
+            due = split_due([self._row_entry(*row[1:]) for row in rows], now, ordered)[0]
+            conn.executemany("UPDATE queue SET claimed_at = ? WHERE id = ?", [(now, e["id"]) for e in due])
+
+        return due
+
+    def commit(self, synced_ids: list, retried: dict, dead: list, released: list = ()):
+        """Acknowledge synced ids, record retries, move dead entries to the DLQ
+
+        retried maps id -> (retry count, next_retry_at). released ids were claimed but not attempted; their claim is dropped so
+        the next cycle picks them up without waiting for the lease.
+        """
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM queue WHERE id = ?", [(i,) for i in synced_ids])
+            conn.executemany("UPDATE queue SET claimed_at = NULL WHERE id = ?", [(i,) for i in released])
+            conn.executemany("UPDATE queue SET retries = ?, next_retry_at = ?, claimed_at = NULL WHERE id = ?",
+                             [(n, at, i) for i, (n, at) in retried.items()])
+            for entry in dead:
+                conn.execute("DELETE FROM queue WHERE id = ?", (entry["id"],))
+                self._put_dlq(conn, entry)
+
+            if synced_ids:
+                stats = self._stats(conn)
+                self._set_stat(conn, "total_synced", stats["total_synced"] + len(synced_ids))
+                self._set_stat(conn, "last_sync", datetime.now().isoformat())
+
+    def merge(self, entries: list) -> int:
+        """Merge entries by id (duplicates skipped), returns how many were new"""
+        merged = 0
+        with self._transaction() as conn:
+            for entry in entries:
+                if entry.get("id") and self._insert(conn, entry):
+                    conn.execute("INSERT INTO last_100 (entry) VALUES (?)", (json.dumps(entry),))
+                    merged += 1
+
+            if merged:
+                conn.execute("DELETE FROM last_100 WHERE seq <= (SELECT MAX(seq) FROM last_100) - ?",
+                             (LAST_100_SIZE,))
+                total = self._stats(conn)["total_queued"]
+                self._set_stat(conn, "total_queued", total + merged)
+
+        return merged
+
+    def load_dlq(self) -> list:
+        """Load Dead Letter Queue items"""
+        with self._reader() as conn:
+            return [json.loads(entry) for (entry,) in conn.execute("SELECT entry FROM dlq ORDER BY seq")]
+
+    def save_dlq(self, items: list):
+        """Replace Dead Letter Queue items"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM dlq")
+            for item in items:
+                self._put_dlq(conn, item)
+
+    def dlq_add(self, items: list):
+        """Add or replace DLQ items"""
+        with self._transaction() as conn:
+            for item in items:
+                self._put_dlq(conn, item)
+
+    def dlq_next_due(self):
+        """Earliest next_attempt in the DLQ (None when empty), from the index"""
+        with self._reader() as conn:
+            return conn.execute("SELECT MIN(next_attempt) FROM dlq").fetchone()[0]
+
+    def dlq_due(self, now: float = None) -> list:
+        """Items whose next_attempt has passed, earliest first (index range scan)"""
+        now = time.time() if now is None else now
+        with self._reader() as conn:
+            rows = conn.execute("SELECT entry FROM dlq WHERE next_attempt <= ? ORDER BY next_attempt",
+                                (now,)).fetchall()
+        return [json.loads(entry) for (entry,) in rows]
+
+    def dlq_update(self, recovered_ids: list, retried: list, released: list = ()):
+        """Drop recovered items, reschedule retried ones (released need nothing here)"""
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM dlq WHERE id = ?", [(i,) for i in recovered_ids])
+            for item in retried:
+                self._put_dlq(conn, item)
+
+def notify_worker(sock_path: Path = WAKE_SOCKET):
+    """Wake the queue worker up (best effort: never blocks, never raises)"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            sock.sendto(b"1", str(sock_path))
+    except OSError:
+        pass  # Worker not running, or a wake-up is already pending: it polls anyway
+
+class WakeChannel:
+    """Worker side of the wake-up socket; wait() falls back to sleep if it cannot bind"""
+
+    def __init__(self, sock_path: Path = WAKE_SOCKET):
+        self.path = Path(sock_path)
+        self.sock = None
+        self.error = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                self.path.unlink()  # Left behind by a previous worker
+            except FileNotFoundError:
+                pass
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(str(self.path))
+            sock.setblocking(False)
+            os.chmod(self.path, 0o600)
+            self.sock = sock
+        except OSError as e:
+            self.error = e
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to timeout seconds; True if woken up (pending wake-ups are coalesced)"""
+        timeout = max(0.0, timeout)
+        if self.sock is None:
+            time.sleep(timeout)
+            return False
+
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while True:
+                self.sock.recv(64)
+        except (BlockingIOError, InterruptedError):
+            pass
+        return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+def open_queue_store(backend: str = QUEUE_BACKEND):
+    """Return the configured queue store (log or sqlite)"""
+    if backend == "sqlite":
+        return SQLiteQueue()
+    if backend == "log":
+        return SegmentedQueue()
+    raise ValueError(f"Unknown MEM0_QUEUE_BACKEND: {backend}")
@@ -3,6 +3,14 @@
 Mem0 Queue Worker - Option C
 Always-running worker with VPS health checks, DLQ, and infinite retry
 Systemd service replaces cron
+
+Uploads use POST /memory/batch (per-item results) when /health lists
+"memory_batch" in its features, else one POST /memory per memory.
+mem0_api_standin.py implements both for offline measurements.
+
+Event-driven: mem0_save wakes the worker through ~/.claude/mem0_worker.sock,
+so new memories are drained within milliseconds. Between wake-ups the health
+probe backs off (doubling) while the queue is idle or the VPS is down.
 """
 
 import json
@@ -10,22 +18,53 @@ import time
 import fcntl
 import requests
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
+from mem0_queue_store import (open_queue_store, dlq_schedule, queue_retry_at, split_due,
+                              DLQ_MAX_BACKOFF, QUEUE_RETRY_DELAY, WakeChannel)
 
 # Configuration
-QUEUE_FILE = Path.home() / ".claude/mem0_queue.json"
-DLQ_FILE = Path.home() / ".claude/mem0_queue_dlq.json"
 METRICS_FILE = Path.home() / ".claude/mem0_metrics.json"
 LOCK_FILE = Path.home() / ".claude/mem0_queue.lock"
-MEM0_API_URL = "http://31.220.104.244:8081"
+EMERGENCY_BUFFER = Path.home() / ".claude/mem0_emergency.json"
+EMERGENCY_DRAINING = Path.home() / ".claude/mem0_emergency.draining"
+EMERGENCY_CURSOR = Path.home() / ".claude/mem0_emergency.cursor"
+MEM0_API_URL = os.getenv("MEM0_API_URL", "http://31.220.104.244:8081")
 VPS_HEALTH_URL = f"{MEM0_API_URL}/health"
 
 # Option C settings
-HEALTH_CHECK_INTERVAL = 30  # seconds
-MAX_BACKOFF = 3600  # 1 hour max
+HEALTH_CHECK_INTERVAL = 30  # seconds, probe interval while there is work
+HEALTH_IDLE_MAX = 600  # seconds, probe interval cap while idle (saves wake the worker)
+HEALTH_DOWN_MAX = 300  # seconds, probe interval cap while the VPS is down
+HEALTH_TTL = 10  # seconds a probe result is reused (one probe per cycle at most)
+HEALTH_TIMEOUT = 5  # seconds per probe
+HEALTH_WINDOW = 20  # probes kept for the rolling latency / success rate
+MAX_BACKOFF = DLQ_MAX_BACKOFF  # 1 hour max (applied by dlq_schedule)
 LOCK_TIMEOUT = 30  # increased from 5s
 DLQ_THRESHOLD = 5  # Move to DLQ after 5 failed attempts
+DLQ_MIN_SLEEP = 0.1  # seconds, floor between DLQ wake-ups (no busy loop)
+
+# Drain pipeline settings
+UPLOAD_CONCURRENCY = int(os.getenv("MEM0_UPLOAD_CONCURRENCY", "4"))  # parallel uploads
+PROJECT_ORDERING = os.getenv("MEM0_PROJECT_ORDERING", "strict")  # strict | relaxed
+COMMIT_ATTEMPTS = 3  # lock attempts to commit acknowledgements after a drain
+BATCH_MAX_ITEMS = int(os.getenv("MEM0_BATCH_MAX_ITEMS", "50"))  # memories per POST /memory/batch
+BATCH_TIMEOUT = 60  # seconds per batch request
+
+# Emergency buffer ingestion
+EMERGENCY_BATCH_BYTES = 256 * 1024  # read at most 256 KB of the buffer per cycle
+EMERGENCY_GRACE = 5  # seconds a drained buffer must stay quiet before it is deleted
+
+queue_store = open_queue_store()  # MEM0_QUEUE_BACKEND=log|sqlite (queue, DLQ, stats)
+
+# Keep-alive connection pool shared by the upload threads
+http_session = requests.Session()
+http_session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=UPLOAD_CONCURRENCY))
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=UPLOAD_CONCURRENCY))
 
 def acquire_lock_with_timeout(lock_file, timeout=LOCK_TIMEOUT):
     """Acquire file lock with timeout to prevent blocking indefinitely"""
@@ -40,101 +79,140 @@ def acquire_lock_with_timeout(lock_file, timeout=LOCK_TIMEOUT):
 
     return False  # Timeout
 
+@contextmanager
+def queue_lock(timeout=LOCK_TIMEOUT):
+    """Hold mem0_queue.lock if the queue backend needs it (SQLite locks itself)"""
+    if not queue_store.uses_file_lock:
+        yield True
+        return
+
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_FILE, 'w') as lock:
+        yield acquire_lock_with_timeout(lock, timeout)
+
 def load_queue() -> dict:
-    """Load queue from JSON file"""
-    if not QUEUE_FILE.exists():
-        return {
-            "queue": [],
-            "last_100": [],
-            "failed": [],
-            "stats": {
-                "total_queued": 0,
-                "total_synced": 0,
-                "total_failed": 0,
-                "last_sync": None
-            }
-        }
+    """Load queue state from the queue store"""
+    return queue_store.load()
 
-    try:
-        with open(QUEUE_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        # Corrupted file, start fresh
+def save_queue(queue_data: dict):
+    """Persist queue state to the queue store"""
+    queue_store.save(queue_data)
+
+class HealthMonitor:
+    """VPS health probe cached for HEALTH_TTL, with rolling latency and success rate
+
+    The main loop asks check() once per cycle; update_metrics() only reads
+    snapshot(), so a cycle costs one probe (and one timeout when the VPS is
+    down). Successful uploads also count as proof of health.
+    """
+
+    def __init__(self, url: str = VPS_HEALTH_URL, ttl: float = HEALTH_TTL,
+                 timeout: float = HEALTH_TIMEOUT, window: int = HEALTH_WINDOW):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.samples = deque(maxlen=window)  # (ok, latency_ms) per probe
+        self.healthy = None  # Unknown until the first probe
+        self.checked_at = 0.0
+        self.batch_max_items = 0  # > 0 when /health advertises POST /memory/batch
+        self._lock = threading.Lock()
+
+    def check(self, max_age: float = None) -> bool:
+        """Cached state if younger than max_age (default: ttl), else a fresh probe"""
+        max_age = self.ttl if max_age is None else max_age
+        if self.healthy is not None and time.time() - self.checked_at < max_age:
+            return self.healthy
+
+        start = time.monotonic()
+        features = None
+        try:
+            response = http_session.get(self.url, timeout=self.timeout)
+            ok = response.status_code == 200
+            if ok:
+                try:
+                    features = response.json()
+                except ValueError:
+                    features = {}
+        except Exception as e:
+            print(f"❌ VPS health check failed: {e}")
+            ok = False
+        latency_ms = (time.monotonic() - start) * 1000
+
+        if features is not None:
+            # Servers without the batch endpoint simply do not list it
+            batch = isinstance(features, dict) and 'memory_batch' in (features.get('features') or [])
+            self.batch_max_items = min(BATCH_MAX_ITEMS, int(features.get('batch_max_items') or BATCH_MAX_ITEMS)) if batch else 0
+
+        with self._lock:
+            self.samples.append((ok, latency_ms))
+            self.healthy = ok
+            self.checked_at = time.time()
+        return ok
+
+    def observe_success(self):
+        """An upload went through: the VPS is healthy, no probe needed for ttl"""
+        with self._lock:
+            self.healthy = True
+            self.checked_at = time.time()
+
+    def snapshot(self) -> dict:
+        """State for mem0_metrics.json (never probes)"""
+        with self._lock:
+            samples = list(self.samples)
+            healthy = self.healthy
+            checked_at = self.checked_at
+
+        latencies = sorted(latency for ok, latency in samples if ok)
         return {
-            "queue": [],
-            "last_100": [],
-            "failed": [],
-            "stats": {
-                "total_queued": 0,
-                "total_synced": 0,
-                "total_failed": 0,
-                "last_sync": None
-            }
+            'status': 'unknown' if healthy is None else ('healthy' if healthy else 'down'),
+            'last_check': datetime.fromtimestamp(checked_at).isoformat() if checked_at else None,
+            'probes': len(samples),
+            'success_rate': round(sum(1 for ok, _ in samples if ok) / len(samples), 3) if samples else None,
+            'latency_p50_ms': round(latencies[len(latencies) // 2], 1) if latencies else None,
+            'latency_max_ms': round(latencies[-1], 1) if latencies else None
         }
 
-def save_queue(queue_data: dict):
-    """Save queue to JSON file (atomic write)"""
-    tmp_file = QUEUE_FILE.with_suffix('.tmp')
-    try:
-        with open(tmp_file, 'w') as f:
-            json.dump(queue_data, f, indent=2)
-        tmp_file.replace(QUEUE_FILE)
-    except:
-        if tmp_file.exists():
-            tmp_file.unlink()
+health = HealthMonitor()
 
 def check_vps_health() -> bool:
-    """Check if VPS is accessible and healthy"""
-    try:
-        response = requests.get(VPS_HEALTH_URL, timeout=5)
-        return response.status_code == 200
-    except Exception as e:
-        print(f"❌ VPS health check failed: {e}")
-        return False
+    """Check if VPS is accessible and healthy (cached for HEALTH_TTL)"""
+    return health.check()
 
 def load_dlq() -> list:
-    """Load Dead Letter Queue from file"""
-    if not DLQ_FILE.exists():
-        return []
-
+    """Load Dead Letter Queue from the queue store"""
     try:
-        with open(DLQ_FILE, 'r') as f:
-            data = json.load(f)
-            return data.get('items', [])
-    except:
+        return queue_store.load_dlq()
+    except Exception as e:
+        print(f"❌ Failed to load DLQ: {e}")
         return []
 
 def save_dlq(items: list):
-    """Save Dead Letter Queue to file"""
-    DLQ_FILE.parent.mkdir(parents=True, exist_ok=True)
+    """Save Dead Letter Queue to the queue store"""
     try:
-        with open(DLQ_FILE, 'w') as f:
-            json.dump({
-                'items': items,
-                'last_update': datetime.now().isoformat()
-            }, f, indent=2)
+        queue_store.save_dlq(items)
     except Exception as e:
         print(f"❌ Failed to save DLQ: {e}")
 
-def move_to_dlq(entry: dict):
-    """Move failed entry from queue to DLQ"""
-    dlq = load_dlq()
+def prepare_dlq_entry(entry: dict) -> dict:
+    """Stamp a failed entry before it is moved from queue to DLQ"""
     entry['moved_to_dlq_at'] = time.time()
     entry['last_attempt'] = time.time()
-    dlq.append(entry)
-    save_dlq(dlq)
+    dlq_schedule(entry)
     print(f"📋 Moved to DLQ: {entry['project_id']} (ID: {entry['id'][:8]}...) after {entry.get('retries', 0)} retries")
+    return entry
 
-def update_metrics(queue_data: dict, dlq_items: list):
+def update_metrics(status: dict):
     """Update metrics file with current stats"""
     try:
+        vps_health = health.snapshot()  # State of this cycle's probe, no second probe
         metrics = {
             'last_update': datetime.now().isoformat(),
-            'vps_status': 'healthy' if check_vps_health() else 'down',
-            'queue_size': len(queue_data.get('queue', [])),
-            'dlq_size': len(dlq_items),
-            'total_synced': queue_data.get('stats', {}).get('total_synced', 0),
-            'total_queued': queue_data.get('stats', {}).get('total_queued', 0)
+            'vps_status': vps_health['status'],
+            'vps_health': vps_health,
+            'queue_size': status['queue_size'],
+            'dlq_size': status['dlq_size'],
+            'total_synced': status['stats'].get('total_synced', 0),
+            'total_queued': status['stats'].get('total_queued', 0)
         }
 
         with open(METRICS_FILE, 'w') as f:
@@ -145,7 +223,7 @@ def update_metrics(queue_data: dict, dlq_items: list):
 def try_upload(entry: dict) -> bool:
     """Attempt to upload entry to VPS Mem0"""
     try:
-        response = requests.post(
+        response = http_session.post(
             f"{MEM0_API_URL}/memory",
             json={
                 "user_id": entry["project_id"],
@@ -153,112 +231,392 @@ def try_upload(entry: dict) -> bool:
             },
             timeout=30
         )
-        return response.json().get("success", False)
+        success = response.json().get("success", False)
+        if success:
+            health.observe_success()
+        return success
     except Exception as e:
         print(f"  ⚠️  Upload failed: {e}")
         return False
 
+def try_upload_batch(entries: list, stop_on_error: bool) -> dict:
+    """POST /memory/batch; returns {id: True | False | None (not attempted)}
+
+    An empty dict means the request itself failed. A 404/405 means the
+    server dropped the endpoint: batching is switched off until the next
+    /health says otherwise, and None is returned so the caller falls back.
+    """
+    try:
+        response = http_session.post(
+            f"{MEM0_API_URL}/memory/batch",
+            json={
+                "stop_on_error": stop_on_error,
+                "items": [
+                    {"id": entry["id"], "user_id": entry["project_id"], "content": entry["content"]}
+                    for entry in entries
+                ]
+            },
+            timeout=BATCH_TIMEOUT
+        )
+        if response.status_code in (404, 405):
+            health.batch_max_items = 0
+            return None
+        results = response.json().get("results", [])
+    except Exception as e:
+        print(f"  ⚠️  Batch upload failed ({len(entries)} entries): {e}")
+        return {}
+
+    outcome = {}
+    for result in results:
+        if result.get("skipped"):
+            outcome[result.get("id")] = None
+        else:
+            outcome[result.get("id")] = bool(result.get("success"))
+    if any(outcome.values()):
+        health.observe_success()
+    return outcome
+
 def process_dlq():
-    """Process DLQ items with infinite retry and exponential backoff"""
-    dlq = load_dlq()
+    """Retry the DLQ items that are due (infinite retry, exponential backoff)
 
-    if not dlq:
+    The store hands back only items whose next_attempt has passed, earliest
+    first (min-heap / index), and persists just the recovered and retried
+    ones, so a cycle costs O(due * log n) however large the DLQ is.
+    """
+    try:
+        due = queue_store.dlq_due()
+    except Exception as e:
+        print(f"❌ Failed to load DLQ: {e}")
         return
 
-    print(f"\n🔄 Processing DLQ: {len(dlq)} items")
+    if not due:
+        return
 
-    recovered_items = []
+    print(f"\n🔄 Processing DLQ: {len(due)} due")
 
-    for item in dlq[:]:  # Copy for safe modification
-        # Calculate backoff delay
-        retry_count = item.get('retry_count', 0)
-        delay = min(2 ** retry_count * 30, MAX_BACKOFF)
-        last_attempt = item.get('last_attempt', 0)
-        age = time.time() - last_attempt
+    recovered_ids = []
+    retried = []
 
-        # Skip if backoff not elapsed
-        if age < delay:
-            next_retry_in = int(delay - age)
-            print(f"  ⏸️  Waiting backoff: {item['project_id']} (retry in {next_retry_in}s)")
-            continue
+    try:
+        for item in due:
+            retry_count = item.get('retry_count', 0)
 
-        # Retry upload
-        success = try_upload(item)
+            if try_upload(item):
+                recovered_ids.append(item['id'])
+                print(f"  ✅ DLQ recovered: {item['project_id']} (ID: {item['id'][:8]}...) after {retry_count} retries")
+            else:
+                item['retry_count'] = retry_count + 1
+                item['last_attempt'] = time.time()
+                dlq_schedule(item)
+                retried.append(item)
+                print(f"  ⏳ DLQ retry {item['retry_count']}: {item['project_id']} "
+                      f"(next in {int(item['next_attempt'] - item['last_attempt'])}s)")
+    finally:
+        done = set(recovered_ids) | set(item['id'] for item in retried)
+        try:
+            queue_store.dlq_update(recovered_ids, retried,
+                                   released=[item for item in due if item['id'] not in done])
+        except Exception as e:
+            print(f"❌ Failed to save DLQ: {e}")
 
-        if success:
-            recovered_items.append(item)
-            print(f"  ✅ DLQ recovered: {item['project_id']} (ID: {item['id'][:8]}...) after {retry_count} retries")
-        else:
-            item['retry_count'] = retry_count + 1
-            item['last_attempt'] = time.time()
-            print(f"  ⏳ DLQ retry {item['retry_count']}: {item['project_id']} (next in {delay}s)")
+def next_health_interval(interval: float, vps_healthy: bool, was_healthy: bool, busy: bool) -> float:
+    """Adaptive probe interval: base while there is work, doubling while idle or down"""
+    if busy or vps_healthy != was_healthy:
+        return HEALTH_CHECK_INTERVAL
+    return min(interval * 2, HEALTH_IDLE_MAX if vps_healthy else HEALTH_DOWN_MAX)
 
-    # Remove recovered items from DLQ
-    for item in recovered_items:
-        dlq.remove(item)
+def sleep_until_next_cycle(cycle_start: float, interval: float, vps_healthy: bool, wake: WakeChannel) -> bool:
+    """Sleep until the next health check; returns True when a save woke the worker
 
-    # Save updated DLQ
-    if recovered_items or any(item.get('retry_count', 0) > 0 for item in dlq):
-        save_dlq(dlq)
+    DLQ items falling due are retried on time. While the VPS is down a save
+    only brings the next probe forward to HEALTH_CHECK_INTERVAL after the
+    last one, so a burst of saves does not turn into a burst of probes.
+    """
+    deadline = cycle_start + interval
 
-def process_queue():
-    """Process normal queue with DLQ threshold (Option C)"""
-    # Acquire lock before processing
-    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        now = time.time()
+        if now >= deadline:
+            return False
 
-    with open(LOCK_FILE, 'w') as lock:
-        if not acquire_lock_with_timeout(lock):
+        try:
+            next_due = queue_store.dlq_next_due() if vps_healthy else None
+        except Exception as e:
+            print(f"⚠️  DLQ schedule unavailable: {e}")
+            next_due = None
+
+        wake_at = deadline if next_due is None else min(deadline, max(next_due, now + DLQ_MIN_SLEEP))
+        if wake.wait(wake_at - now):
+            if vps_healthy:
+                return True
+            deadline = min(deadline, cycle_start + HEALTH_CHECK_INTERVAL)
+            continue
+
+        if next_due is not None and time.time() < deadline:
+            process_dlq()
+
+def read_emergency_cursor(inode: int) -> int:
+    """Byte offset already ingested from the draining emergency buffer
+
+    The cursor records which file it belongs to (inode, kept by the rename):
+    a cursor left over from another buffer is ignored and the file is read
+    from the start (entries already merged are skipped as duplicates).
+    """
+    try:
+        cursor = json.loads(EMERGENCY_CURSOR.read_text())
+        if cursor["inode"] == inode:
+            return int(cursor["offset"])
+    except (OSError, ValueError, TypeError, KeyError):
+        pass
+    return 0
+
+def write_emergency_cursor(inode: int, offset: int):
+    tmp_file = EMERGENCY_CURSOR.with_suffix('.tmp')
+    tmp_file.write_text(json.dumps({"inode": inode, "offset": offset}))
+    tmp_file.replace(EMERGENCY_CURSOR)
+
+def ingest_emergency_buffer() -> int:
+    """Merge mem0_emergency.json back into the main queue (incremental)
+
+    The buffer is renamed to mem0_emergency.draining so new saves start a
+    fresh file, then read from a persisted byte-offset cursor a batch at a
+    time. Entries are deduped by id and merged in timestamp order. The
+    drained file is only removed once it has been quiet for EMERGENCY_GRACE
+    seconds, so a writer that opened it just before the rename is not lost.
+    """
+    if not EMERGENCY_DRAINING.exists():
+        if not EMERGENCY_BUFFER.exists() or EMERGENCY_BUFFER.stat().st_size == 0:
+            return 0
+        # Cursor first: a crash between the two steps cannot pair the new
+        # draining file with the previous one's offset
+        write_emergency_cursor(EMERGENCY_BUFFER.stat().st_ino, 0)
+        EMERGENCY_BUFFER.replace(EMERGENCY_DRAINING)
+
+    inode = EMERGENCY_DRAINING.stat().st_ino
+    offset = read_emergency_cursor(inode)
+    size = EMERGENCY_DRAINING.stat().st_size
+
+    with open(EMERGENCY_DRAINING, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read(EMERGENCY_BATCH_BYTES)
+        if chunk and not chunk.endswith(b'\n'):
+            chunk += f.readline()  # finish the last record of the batch
+
+    consumed = chunk.rfind(b'\n') + 1
+    entries = []
+    for line in chunk[:consumed].splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            print(f"⚠️  Skipping corrupted emergency record at offset {offset}")
+            continue
+        if isinstance(entry, dict) and entry.get("id"):
+            entries.append(entry)
+
+    merged = 0
+    if entries:
+        with queue_lock() as locked:
+            if not locked:
+                print("⚠️  Could not acquire lock to ingest emergency buffer. Will retry next cycle.")
+                return 0
+            merged = queue_store.merge(entries)
+        print(f"🚑 Emergency buffer: {merged} merged, {len(entries) - merged} duplicates skipped")
+
+    offset += consumed
+    write_emergency_cursor(inode, offset)
+
+    # Done once everything is read and the file has been quiet since the
+    # rename (st_ctime moves on both rename and write)
+    if offset >= size and time.time() - EMERGENCY_DRAINING.stat().st_ctime > EMERGENCY_GRACE:
+        if EMERGENCY_DRAINING.stat().st_size > offset:
+            return merged  # Late write arrived, next cycle picks it up
+        EMERGENCY_DRAINING.unlink()
+        EMERGENCY_CURSOR.unlink()
+
+    return merged
+
+def upload_chain(entries: list) -> tuple:
+    """Upload entries in order, stopping at the first failure
+
+    Returns (synced_ids, failed_entries, untried_entries). Stopping keeps a
+    project's memories reaching Mem0 in the order they were saved. With the
+    batch endpoint, a chain goes out in batches of up to batch_max_items.
+    """
+    if health.batch_max_items:
+        return upload_chain_batched(entries, health.batch_max_items)
+
+    synced_ids = []
+    for i, entry in enumerate(entries):
+        if try_upload(entry):
+            synced_ids.append(entry["id"])
+            print(f"  ✅ Synced: {entry['project_id']} (ID: {entry['id'][:8]}...)")
+        else:
+            return synced_ids, [entry], entries[i + 1:]
+    return synced_ids, [], []
+
+def upload_chain_batched(entries: list, batch_size: int) -> tuple:
+    """upload_chain over POST /memory/batch (strict: stop_on_error, relaxed: independent items)"""
+    strict = PROJECT_ORDERING != "relaxed"
+    synced_ids = []
+    failed = []
+    untried = []
+
+    for start in range(0, len(entries), batch_size):
+        batch = entries[start:start + batch_size]
+        outcome = try_upload_batch(batch, stop_on_error=strict)
+        if outcome is None:
+            # Endpoint gone: finish the chain one memory at a time
+            rest_synced, rest_failed, rest_untried = upload_chain(entries[start:])
+            return synced_ids + rest_synced, failed + rest_failed, untried + rest_untried
+
+        batch_failed = [entry for entry in batch if outcome.get(entry["id"]) is False]
+        batch_untried = [entry for entry in batch if outcome.get(entry["id"]) is None]
+        batch_synced = [entry["id"] for entry in batch if outcome.get(entry["id"])]
+        synced_ids.extend(batch_synced)
+        if batch_synced:
+            print(f"  ✅ Synced batch: {len(batch_synced)}/{len(batch)} ({batch[0]['project_id']}"
+                  + ("" if strict else ", relaxed") + ")")
+
+        if not outcome:
+            # The request failed: like a single failed upload
+            batch_failed, batch_untried = (batch[:1], batch[1:]) if strict else (batch, [])
+
+        if strict and (batch_failed or batch_untried):
+            return synced_ids, batch_failed or batch_untried[:1], \
+                (batch_untried if batch_failed else batch_untried[1:]) + entries[start + batch_size:]
+
+        failed.extend(batch_failed)
+        untried.extend(batch_untried)
+
+    return synced_ids, failed, untried
+
+def drain_chains(entries: list) -> tuple:
+    """Split a snapshot into upload chains (one per project unless relaxed)
+
+    Returns (chains, deferred): entries still waiting for their next_retry_at
+    (and, in strict ordering, their project's entries behind them) are left
+    out, so a wake-up never retries a failing entry before its backoff.
+    """
+    relaxed = PROJECT_ORDERING == "relaxed"
+    entries, deferred = split_due(entries, ordered=not relaxed)
+    if relaxed:
+        # Independent entries: one per chain, or one batch per chain when batching
+        size = max(1, health.batch_max_items)
+        return [entries[i:i + size] for i in range(0, len(entries), size)], deferred
+
+    chains = {}
+    for entry in entries:
+        chains.setdefault(entry["project_id"], []).append(entry)
+    return list(chains.values()), deferred
+
+def process_queue():
+    """Process normal queue with DLQ threshold (Option C)
+
+    Drain pipeline: snapshot pending entries under the lock, release it,
+    upload with a bounded thread pool over the keep-alive session, then
+    re-acquire the lock only to commit acknowledgements. A failed entry is
+    retried once per backoff window (queue_retry_at), however often saves
+    wake the worker.
+
+    Returns the number of entries claimed, or still waiting for a retry (0 when idle).
+    """
+    # 1. Snapshot (SQLite claims rows in a single transaction instead of the flock)
+    with queue_lock() as locked:
+        if not locked:
             print("⚠️  Could not acquire lock (timeout). Queue might be busy. Skipping this run.")
-            return
+            return 0
 
-        queue = load_queue()
+        entries = queue_store.claim(ordered=PROJECT_ORDERING != "relaxed")
 
-        print(f"\n📤 Processing queue: {len(queue['queue'])} pending")
+    print(f"\n📤 Processing queue: {len(entries)} pending (concurrency {UPLOAD_CONCURRENCY}, ordering {PROJECT_ORDERING})")
 
-        # Process normal queue with DLQ threshold
-        for entry in queue["queue"][:]:  # Copy for safe modification
-            success = try_upload(entry)
+    if not entries:
+        status = queue_store.status()
+        update_metrics(status)
+        return status['queue_size']  # Entries waiting for their retry keep the base interval
 
-            if success:
-                queue["queue"].remove(entry)
-                queue["stats"]["total_synced"] += 1
-                queue["stats"]["last_sync"] = datetime.now().isoformat()
-                print(f"  ✅ Synced: {entry['project_id']} (ID: {entry['id'][:8]}...)")
-            else:
-                entry["retries"] += 1
-                if entry["retries"] >= DLQ_THRESHOLD:
-                    # Move to DLQ after threshold retries
-                    queue["queue"].remove(entry)
-                    move_to_dlq(entry)
-                else:
-                    print(f"  ⏳ Retry {entry['retries']}/{DLQ_THRESHOLD}: {entry['project_id']}")
+    # 2. Upload without holding the lock - mem0_save callers are never blocked
+    synced_ids = []
+    retried = {}
+    dead = []
+    released = []
 
-        # Save updated queue
-        save_queue(queue)
+    chains, deferred = drain_chains(entries)
+    released.extend(e["id"] for e in deferred)
 
-        # Update metrics
-        dlq = load_dlq()
-        update_metrics(queue, dlq)
+    with ThreadPoolExecutor(max_workers=max(1, UPLOAD_CONCURRENCY)) as pool:
+        results = list(pool.map(upload_chain, chains))
 
-        # Final summary
-        print(f"\n✨ Queue processed:")
-        print(f"   Pending: {len(queue['queue'])}")
-        print(f"   DLQ: {len(dlq)}")
-        print(f"   Total synced: {queue['stats']['total_synced']}")
+    for chain_synced, failed_entries, untried in results:
+        synced_ids.extend(chain_synced)
+        released.extend(e["id"] for e in untried)
 
-        # Lock is automatically released when exiting the 'with' block
+        for failed_entry in failed_entries:
+            failed_entry["retries"] += 1
+            if failed_entry["retries"] >= DLQ_THRESHOLD:
+                # Move to DLQ after threshold retries
+                dead.append(prepare_dlq_entry(failed_entry))
+            else:
+                retry_at = queue_retry_at(failed_entry["retries"])
+                retried[failed_entry["id"]] = (failed_entry["retries"], retry_at)
+                print(f"  ⏳ Retry {failed_entry['retries']}/{DLQ_THRESHOLD}: {failed_entry['project_id']}"
+                      f", next attempt in {retry_at - time.time():.0f}s"
+                      + (f" ({len(untried)} queued behind it)" if untried else ""))
+
+    # 3. Commit acknowledgements, retry counts and DLQ moves
+    for attempt in range(1, COMMIT_ATTEMPTS + 1):
+        with queue_lock() as locked:
+            if locked:
+                queue_store.commit(synced_ids, retried, dead, released)
+                break
+        print(f"⚠️  Could not acquire lock to commit (attempt {attempt}/{COMMIT_ATTEMPTS})")
+    else:
+        print(f"❌ Commit skipped - {len(synced_ids)} synced entries will be uploaded again")
+
+    # Update metrics
+    status = queue_store.status()
+    update_metrics(status)
+
+    # Final summary
+    print(f"\n✨ Queue processed:")
+    print(f"   Synced this run: {len(synced_ids)}")
+    print(f"   Pending: {status['queue_size']}")
+    print(f"   DLQ: {status['dlq_size']}")
+    print(f"   Total synced: {status['stats']['total_synced']}")
+
+    return len(entries)
 
 def main_loop():
     """Main loop - always running with VPS health checks (Option C)"""
     print("🚀 Mem0 Worker Option C starting...")
-    print(f"   Health check interval: {HEALTH_CHECK_INTERVAL}s")
+    print(f"   Health check interval: {HEALTH_CHECK_INTERVAL}s (backs off to {HEALTH_IDLE_MAX}s idle, {HEALTH_DOWN_MAX}s down)")
     print(f"   VPS URL: {MEM0_API_URL}")
     print(f"   DLQ threshold: {DLQ_THRESHOLD} retries")
     print(f"   Max backoff: {MAX_BACKOFF}s (1 hour)")
+    print(f"   Queue retry backoff: {QUEUE_RETRY_DELAY}s, doubled per failed attempt")
+    print(f"   Upload concurrency: {UPLOAD_CONCURRENCY} ({PROJECT_ORDERING} per-project ordering)")
+    print(f"   Batch uploads: up to {BATCH_MAX_ITEMS} per request when /health advertises memory_batch")
+
+    wake = WakeChannel()
+    if wake.error:
+        print(f"⚠️  Wake-up socket unavailable ({wake.error}) - polling every {HEALTH_CHECK_INTERVAL}s")
+    else:
+        print(f"   Wake-up socket: {wake.path}")
     print("")
 
+    interval = HEALTH_CHECK_INTERVAL
+    vps_healthy = True
+
     while True:
+        cycle_start = time.time()
+        was_healthy = vps_healthy
+        vps_healthy = False
+        busy = False
+
         try:
+            # 0. Recover entries written to the emergency buffer during lock contention
+            ingest_emergency_buffer()
+
             # 1. VPS health check
             vps_healthy = check_vps_health()
 
@@ -269,21 +627,24 @@ def main_loop():
                 process_dlq()
 
                 # 3. Process normal queue
-                process_queue()
+                busy = process_queue() > 0
             else:
-                print(f"\n[{datetime.now().strftime('%H:%M:%S')}] ❌ VPS unhealthy - waiting {HEALTH_CHECK_INTERVAL}s...")
+                print(f"\n[{datetime.now().strftime('%H:%M:%S')}] ❌ VPS unhealthy - next probe in "
+                      f"{next_health_interval(interval, False, was_healthy, False):.0f}s (or on save)...")
 
                 # Update metrics even when VPS down
-                queue = load_queue()
-                dlq = load_dlq()
-                update_metrics(queue, dlq)
+                update_metrics(queue_store.status())
 
         except Exception as e:
             print(f"\n❌ Worker error: {e}")
             print(f"   Will retry in {HEALTH_CHECK_INTERVAL}s...")
+            busy = True  # Retry at the base interval
 
-        # Sleep before next cycle
-        time.sleep(HEALTH_CHECK_INTERVAL)
+        # Sleep until a save, a due DLQ item or the next probe
+        interval = next_health_interval(interval, vps_healthy, was_healthy, busy)
+        if wake.sock is None:
+            interval = min(interval, HEALTH_CHECK_INTERVAL)  # No wake-ups: keep polling
+        sleep_until_next_cycle(cycle_start, interval, vps_healthy, wake)
 
 if __name__ == "__main__":
     try:
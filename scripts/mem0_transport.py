@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Mem0 Transport - Pooled keep-alive HTTP client for the Mem0 VPS API
+Used by mem0_mcp_server.py
+
+- One requests.Session per process, so connections to the VPS are reused
+  across tool calls instead of paying a TCP handshake every time
+- (connect, read) timeouts chosen per call by the caller
+- Circuit breaker: after repeated failures calls fail in milliseconds until
+  a cool-down has elapsed, then a single probe decides whether to close it
+
+requests/urllib3 do not pipeline HTTP/1.1 requests; reuse of warm
+keep-alive connections is what this layer provides.
+"""
+
+import threading
+import time
+import requests
+
+# Configuration
+POOL_SIZE = 4  # keep-alive connections kept open to the VPS
+FAILURE_THRESHOLD = 3  # consecutive failures before the circuit opens
+RESET_TIMEOUT = 30  # seconds the circuit stays open before a probe
+DEFAULT_TIMEOUT = (3.05, 30)  # (connect, read) seconds
+
+class CircuitBreaker:
+    """closed -> open after FAILURE_THRESHOLD failures -> half_open after RESET_TIMEOUT"""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_in(self) -> int:
+        """Seconds until the next probe is allowed"""
+        if self.opened_at is None:
+            return 0
+        return max(0, int(self.reset_timeout - (time.time() - self.opened_at)))
+
+    def allow(self) -> bool:
+        """Whether a request may go out now (one probe at a time when half open)"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self.probing = False
+
+class Mem0Transport:
+    """Keep-alive session + circuit breaker around the Mem0 REST API"""
+
+    def __init__(self, base_url: str, pool_size: int = POOL_SIZE, breaker: CircuitBreaker = None):
+        self.base_url = base_url.rstrip('/')
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, endpoint: str, data: dict = None, timeout: tuple = DEFAULT_TIMEOUT) -> dict:
+        """Make an HTTP request, returning the JSON body or {"error": ...}"""
+        if not self.breaker.allow():
+            return {"error": f"Mem0 API unavailable (circuit open, next probe in {self.breaker.retry_in()}s)"}
+
+        try:
+            response = self.session.request(method, f"{self.base_url}{endpoint}", json=data, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
+            return {"error": f"API request failed: {str(e)}"}
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            return {"error": f"API request failed: HTTP {response.status_code}"}
+
+        self.breaker.record_success()
+        try:
+            return response.json()
+        except ValueError:
+            return {"error": f"Invalid JSON response (HTTP {response.status_code})"}
+
+    def warm(self, endpoint: str = "/health", timeout: tuple = (3.05, 5)):
+        """Open a pooled connection in the background so the first tool call is warm"""
+        thread = threading.Thread(target=self.request, args=("GET", endpoint, None, timeout), daemon=True)
+        thread.start()
+        return thread
@@ -2,125 +2,270 @@
 """
 Migration Script: JSON Files → Qdrant Vector Store
 Migrates all existing memory JSON files to Qdrant with embeddings
+
+Streaming pipeline with bounded queues, so the embedding API stays busy:
+    reader (JSON files) → N embedder workers (batches) → upserter (Qdrant)
+
+Memories are written directly (mem0_points.py): stored text embedded in
+batches, original ID as point ID, Mem0-compatible payload, no LLM call.
+After each upserted batch its IDs are appended to a checkpoint file, so an
+interrupted run continues with --resume instead of starting over.
+Memories already in Qdrant for the project (point ID or original_id, e.g.
+migrated earlier through memory.add) are skipped, not duplicated.
+
+If a stage dies on an unexpected error, the pipeline is aborted (every
+queue wait gives up) and the error is raised to the caller instead of
+leaving the other stages blocked on a full or empty queue.
 """
 
 import json
-import os
+import queue
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime
-from mem0 import Memory
+import requests
+from embedders import get_embedder, load_setting
+from mem0_points import (MEM0_COLLECTION, memory_point, ensure_collection, upsert_points,
+                         existing_memory_ids, estimate_batch_tokens, embedding_cost)
 
 # Configuration
 MEMORIES_DIR = Path.home() / "Documents/APP_HOME/CascadeProjects/windsurf-project/SecondBrain/memories"
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
+CHECKPOINT_FILE = Path.home() / ".claude/mem0_migration_checkpoint.jsonl"
+BATCH_SIZE = 100  # memories per embedding request / upsert
+WORKERS = 4  # embedding batches in flight
+QUEUE_SIZE = 8  # batches buffered between stages (bounds memory use)
+QUEUE_POLL = 0.2  # seconds between abort checks while a stage waits on a queue
+ABORTED = object()  # returned by take() once the pipeline is aborted
 
-# Load OpenAI API key
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
-if not OPENAI_API_KEY:
-    env_file = Path.home() / ".claude" / ".env"
-    if env_file.exists():
-        for line in env_file.read_text().splitlines():
-            if line.startswith('OPENAI_API_KEY='):
-                OPENAI_API_KEY = line.split('=', 1)[1].strip()
+def load_checkpoint(checkpoint_file: Path) -> dict:
+    """{project: set(memory IDs)} already migrated; a torn last line is ignored"""
+    done = {}
+    if not checkpoint_file.exists():
+        return done
+
+    with open(checkpoint_file, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Crash while appending
+            done.setdefault(entry['project'], set()).update(entry['ids'])
+    return done
+
+def put(q: queue.Queue, item, abort: threading.Event) -> bool:
+    """q.put that gives up (False) once the pipeline is aborted"""
+    while not abort.is_set():
+        try:
+            q.put(item, timeout=QUEUE_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def take(q: queue.Queue, abort: threading.Event):
+    """q.get that returns ABORTED once the pipeline is aborted"""
+    while not abort.is_set():
+        try:
+            return q.get(timeout=QUEUE_POLL)
+        except queue.Empty:
+            continue
+    return ABORTED
+
+def run_stage(target, args: tuple, abort: threading.Event, failures: list):
+    """Thread body: an unexpected error aborts the whole pipeline and is kept for the caller"""
+    try:
+        target(*args)
+    except Exception as e:
+        failures.append((threading.current_thread().name, e))
+        abort.set()
+
+def read_memories(session, collection: str, projects: list, done: dict, batches: queue.Queue, stats: dict,
+                  lock: threading.Lock, batch_size: int, workers: int, abort: threading.Event):
+    """Producer: batches of (project, [memory_data]) neither in the checkpoint nor in Qdrant"""
+    try:
+        _read_memories(session, collection, projects, done, batches, stats, lock, batch_size, abort)
+    finally:
+        # End of input for every embedder, also when reading failed
+        for _ in range(workers):
+            if not put(batches, None, abort):
                 break
 
-if not OPENAI_API_KEY:
-    print("❌ OPENAI_API_KEY not found in environment or ~/.claude/.env")
-    sys.exit(1)
-
-# Initialize Mem0
-config = {
-    'llm': {
-        'provider': 'openai',
-        'config': {
-            'model': 'gpt-4o-mini',
-            'temperature': 0.1,
-            'max_tokens': 2000,
-            'api_key': OPENAI_API_KEY
-        }
-    },
-    'vector_store': {
-        'provider': 'qdrant',
-        'config': {
-            'host': QDRANT_HOST,
-            'port': QDRANT_PORT,
-        }
-    },
-    'embedder': {
-        'provider': 'openai',
-        'config': {
-            'model': 'text-embedding-3-small',
-            'api_key': OPENAI_API_KEY
-        }
-    }
-}
-
-print("🔧 Initializing Mem0 with Qdrant...")
-try:
-    memory = Memory.from_config(config)
-    print(f"✅ Mem0 initialized (Qdrant: {QDRANT_HOST}:{QDRANT_PORT})")
-except Exception as e:
-    print(f"❌ Failed to initialize Mem0: {e}")
-    sys.exit(1)
-
-def migrate_project(project_name: str, dry_run: bool = False):
-    """Migrate all memories for a project"""
-    project_dir = MEMORIES_DIR / project_name
-
-    if not project_dir.exists():
-        print(f"⚠️  Project directory not found: {project_dir}")
-        return 0, 0
-
-    json_files = list(project_dir.glob("*.json"))
-
-    if not json_files:
-        print(f"⚠️  No JSON files found in {project_name}")
-        return 0, 0
-
-    print(f"\n📦 Migrating project: {project_name}")
-    print(f"   Found {len(json_files)} memory files")
-
-    success_count = 0
-    error_count = 0
-
-    for i, json_file in enumerate(json_files, 1):
+def _read_memories(session, collection: str, projects: list, done: dict, batches: queue.Queue, stats: dict,
+                   lock: threading.Lock, batch_size: int, abort: threading.Event):
+    for project_name in projects:
+        project_dir = MEMORIES_DIR / project_name
+        if not project_dir.exists():
+            print(f"⚠️  Project directory not found: {project_dir}")
+            continue
+
         try:
-            # Read memory from JSON
-            with open(json_file, 'r') as f:
-                memory_data = json.load(f)
-
-            memory_text = memory_data.get('memory', '')
-            if not memory_text:
-                print(f"   ⚠️  [{i}/{len(json_files)}] Empty memory: {json_file.name}")
-                error_count += 1
+            existing = existing_memory_ids(session, project_name, collection)
+        except Exception as e:
+            # Point IDs are the original IDs, so a rerun only re-embeds what memory.add wrote
+            print(f"⚠️  Error fetching existing IDs from Qdrant ({project_name}): {e}")
+            existing = set()
+
+        completed = done.get(project_name, set())
+        batch = []
+        found = 0
+        for json_file in project_dir.glob("*.json"):
+            found += 1
+            try:
+                with open(json_file, 'r') as f:
+                    memory_data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"   ❌ Error: {project_name}/{json_file.name} - {e}")
+                with lock:
+                    stats['errors'] += 1
+                continue
+
+            memory_data['id'] = str(memory_data.get('id') or json_file.stem)
+            if not memory_data.get('memory'):
+                print(f"   ⚠️  Empty memory: {project_name}/{json_file.name}")
+                with lock:
+                    stats['errors'] += 1
+                continue
+            if memory_data['id'] in completed:
+                with lock:
+                    stats['resumed'] += 1
                 continue
+            if memory_data['id'] in existing:
+                with lock:
+                    stats['existing'] += 1
+                continue
+
+            batch.append(memory_data)
+            if len(batch) == batch_size:
+                if not put(batches, (project_name, batch), abort):
+                    return
+                batch = []
+
+        if batch and not put(batches, (project_name, batch), abort):
+            return
+        print(f"📦 {project_name}: {found} memory files read")
 
-            if dry_run:
-                print(f"   🔍 [{i}/{len(json_files)}] Would migrate: {memory_text[:50]}...")
-                success_count += 1
-            else:
-                # Add to Qdrant via Mem0
-                result = memory.add(memory_text, user_id=project_name, metadata={
-                    'source': 'migration',
-                    'original_id': memory_data.get('id', ''),
-                    'created_at': memory_data.get('created_at', ''),
-                })
-
-                if result:
-                    if i % 10 == 0:
-                        print(f"   ✓ [{i}/{len(json_files)}] Migrated")
-                    success_count += 1
-                else:
-                    print(f"   ❌ [{i}/{len(json_files)}] Failed: {json_file.name}")
-                    error_count += 1
+def embed_batches(embedder, batches: queue.Queue, embedded: queue.Queue, stats: dict, lock: threading.Lock,
+                  abort: threading.Event):
+    """Consumer/producer: [memory_data] → [(memory_data, vector)]"""
+    try:
+        _embed_batches(embedder, batches, embedded, stats, lock, abort)
+    finally:
+        put(embedded, None, abort)  # This embedder is done, also when it failed
 
+def _embed_batches(embedder, batches: queue.Queue, embedded: queue.Queue, stats: dict, lock: threading.Lock,
+                   abort: threading.Event):
+    while True:
+        item = take(batches, abort)
+        if item is None or item is ABORTED:
+            return
+
+        project_name, batch = item
+        try:
+            vectors = embedder.embed_batch([data['memory'] for data in batch])
         except Exception as e:
-            print(f"   ❌ [{i}/{len(json_files)}] Error: {json_file.name} - {e}")
-            error_count += 1
+            print(f"   ❌ Embedding failed for {len(batch)} memories ({project_name}): {e}")
+            with lock:
+                stats['errors'] += len(batch)
+            continue
 
-    return success_count, error_count
+        with lock:
+            stats['tokens'] += estimate_batch_tokens(data['memory'] for data in batch)
+        if not put(embedded, (project_name, list(zip(batch, vectors))), abort):
+            return
+
+def upsert_batches(session, collection: str, embedded: queue.Queue, checkpoint, stats: dict, lock: threading.Lock,
+                   workers: int, abort: threading.Event):
+    """Consumer: upsert, then checkpoint the batch (only written IDs are checkpointed)"""
+    finished = 0
+    while finished < workers:
+        item = take(embedded, abort)
+        if item is ABORTED:
+            return
+        if item is None:
+            finished += 1
+            continue
+
+        project_name, pairs = item
+        try:
+            upsert_points(session, [memory_point(project_name, data, vector, source='migration')
+                                    for data, vector in pairs], collection)
+        except Exception as e:
+            print(f"   ❌ Upsert failed for {len(pairs)} memories ({project_name}): {e}")
+            with lock:
+                stats['errors'] += len(pairs)
+            continue
+
+        checkpoint.write(json.dumps({'project': project_name, 'ids': [data['id'] for data, _ in pairs]}) + "\n")
+        checkpoint.flush()
+        stats['migrated'] += len(pairs)
+        print(f"   ✓ {stats['migrated']} migrated ({project_name})")
+
+def count_pending(projects: list, done: dict) -> dict:
+    """Dry run: memories the pipeline would embed (files are named {id}.json)"""
+    total = 0
+    resumed = 0
+    for project_name in projects:
+        completed = done.get(project_name, set())
+        project_dir = MEMORIES_DIR / project_name
+        if not project_dir.exists():
+            continue
+        files = [json_file.stem for json_file in project_dir.glob("*.json")]
+        pending = sum(1 for memory_id in files if memory_id not in completed)
+        print(f"🔍 {project_name}: {pending} would be migrated")
+        total += pending
+        resumed += len(files) - pending
+    return {'migrated': total, 'resumed': resumed, 'existing': 0, 'errors': 0, 'tokens': 0}
+
+def migrate(projects: list, done: dict, checkpoint_file: Path, batch_size: int, workers: int, queue_size: int) -> dict:
+    """Run the reader → embedders → upserter pipeline. Returns stats.
+
+    Raises the first unexpected error of a stage (the checkpoint keeps what was written).
+    """
+    session = requests.Session()
+    embedder = get_embedder()
+    collection = embedder.collection(MEM0_COLLECTION)
+    ensure_collection(session, embedder.dim, collection)
+    print(f"🚀 Pipeline: batches of {batch_size}, {workers} embedders ({embedder.name} → {collection})")
+
+    stats = {'migrated': 0, 'resumed': 0, 'existing': 0, 'errors': 0, 'tokens': 0}
+    lock = threading.Lock()
+    batches = queue.Queue(maxsize=queue_size)
+    embedded = queue.Queue(maxsize=queue_size)
+    abort = threading.Event()
+    failures = []  # (thread name, exception)
+
+    checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(checkpoint_file, 'a+') as checkpoint:
+        if checkpoint.tell() > 0:
+            checkpoint.seek(checkpoint.tell() - 1)
+            if checkpoint.read(1) != "\n":
+                checkpoint.write("\n")  # Terminate a line torn by a crash, don't glue onto it
+        stages = [(read_memories, (session, collection, projects, done, batches, stats, lock, batch_size, workers,
+                                   abort), "reader")]
+        stages += [(embed_batches, (embedder, batches, embedded, stats, lock, abort), f"embedder-{i}")
+                   for i in range(workers)]
+        stages.append((upsert_batches, (session, collection, embedded, checkpoint, stats, lock, workers, abort),
+                       "upserter"))
+        threads = [threading.Thread(target=run_stage, args=(target, args, abort, failures), name=name, daemon=True)
+                   for target, args, name in stages]
+        for thread in threads:
+            thread.start()
+        # Daemon threads + join timeout: Ctrl-C stops the run, the checkpoint keeps what was written
+        try:
+            while any(thread.is_alive() for thread in threads):
+                threads[-1].join(timeout=0.5)
+        except KeyboardInterrupt:
+            abort.set()
+            print("\n⏸️  Interrupted: run again with --resume to continue")
+
+    if failures:
+        name, error = failures[0]
+        print(f"❌ Pipeline aborted: {name} failed ({type(error).__name__}: {error})")
+        raise error
+    return stats
 
 def main():
     """Main migration function"""
@@ -130,6 +275,15 @@ def main():
     parser.add_argument('--project', help='Migrate specific project only')
     parser.add_argument('--dry-run', action='store_true', help='Dry run (no actual migration)')
     parser.add_argument('--yes', '-y', action='store_true', help='Skip confirmation prompt')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'Skip memories recorded in the checkpoint ({CHECKPOINT_FILE})')
+    parser.add_argument('--checkpoint', type=Path, default=CHECKPOINT_FILE, help='Checkpoint file')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'Embedding batches in flight (default: {WORKERS})')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Memories per embedding request (default: {BATCH_SIZE})')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help=f'Batches buffered between stages (default: {QUEUE_SIZE})')
     args = parser.parse_args()
 
     print("=" * 70)
@@ -137,10 +291,19 @@ def main():
     print("=" * 70)
     print(f"Source: {MEMORIES_DIR}")
     print(f"Target: Qdrant ({QDRANT_HOST}:{QDRANT_PORT})")
+    print(f"Checkpoint: {args.checkpoint}{' (resume)' if args.resume else ''}")
     if args.dry_run:
         print("Mode: DRY RUN (no changes)")
     print("=" * 70)
 
+    if load_setting("EMBEDDING_BACKEND", "openai") == "openai" and not load_setting("OPENAI_API_KEY"):
+        print("❌ OPENAI_API_KEY not found in environment or ~/.claude/.env")
+        sys.exit(1)
+
+    done = load_checkpoint(args.checkpoint) if args.resume else {}
+    if args.resume:
+        print(f"⏯️  Resuming: {sum(len(ids) for ids in done.values())} memories already migrated")
+
     # Discover projects
     if args.project:
         projects = [args.project]
@@ -158,16 +321,19 @@ def main():
             print("❌ Migration cancelled")
             sys.exit(0)
 
-    # Migrate each project
-    total_success = 0
-    total_errors = 0
-
     start_time = datetime.now()
 
-    for project in projects:
-        success, errors = migrate_project(project, dry_run=args.dry_run)
-        total_success += success
-        total_errors += errors
+    if args.dry_run:
+        stats = count_pending(projects, done)
+    else:
+        if not args.resume and args.checkpoint.exists():
+            args.checkpoint.unlink()  # Fresh run: IDs are point IDs, so nothing is duplicated
+        try:
+            stats = migrate(projects, done, args.checkpoint, args.batch_size, max(1, args.workers), args.queue_size)
+        except Exception as e:
+            print(f"❌ Migration failed: {e}")
+            print("   Run again with --resume to continue from the checkpoint")
+            sys.exit(1)
 
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
@@ -176,13 +342,22 @@ def main():
     print("\n" + "=" * 70)
     print("  Migration Summary")
     print("=" * 70)
-    print(f"✅ Successfully migrated: {total_success}")
-    print(f"❌ Errors: {total_errors}")
+    print(f"✅ Successfully migrated: {stats['migrated']}")
+    if args.resume:
+        print(f"⏭️  Already migrated (checkpoint): {stats['resumed']}")
+    if stats['existing']:
+        print(f"⏭️  Already in Qdrant: {stats['existing']}")
+    print(f"❌ Errors: {stats['errors']}")
     print(f"⏱️  Duration: {duration:.2f}s")
-    print(f"💰 Estimated OpenAI cost: ~${(total_success * 0.000002):.4f}")
+    if not args.dry_run and duration > 0:
+        print(f"⚡ Throughput: {stats['migrated'] / duration:.1f} memories/s")
+        print(f"💰 Estimated OpenAI cost: ~${embedding_cost(stats['tokens']):.6f} (~{stats['tokens']} tokens)")
     print("=" * 70)
 
-    if not args.dry_run and total_success > 0:
+    if stats['errors'] and not args.dry_run:
+        print(f"\n⚠️  Failed batches are not checkpointed: rerun with --resume to retry them")
+
+    if not args.dry_run and stats['migrated'] > 0:
         print("\n✨ Migration complete! Memories are now in Qdrant.")
         print("   You can now use mem0_search for semantic search.")
 
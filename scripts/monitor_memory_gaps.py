@@ -12,6 +12,17 @@ Usage:
 - monitor_memory_gaps.py --project foo      # Check specific project
 - monitor_memory_gaps.py --threshold 10     # Custom threshold (%)
 - monitor_memory_gaps.py --alert-only       # Only output if gaps found
+- monitor_memory_gaps.py --json             # Machine-readable report
+- monitor_memory_gaps.py --diff             # ID-level diff + repair report
+
+Counts come from Qdrant's exact /points/count endpoint (one request per
+project), and all projects are checked concurrently over one pooled session.
+
+--diff compares IDs instead of counts (N missing + N duplicates is not "in
+sync"): Qdrant point IDs and original_id payloads are streamed by scroll,
+JSON memory IDs are read from each file's "id" field, and missing / extra /
+duplicate sets are written to ~/.claude/mem0_gap_report.json, which
+reindex_missing_memories.py --from-report consumes directly.
 """
 
 import json
@@ -19,7 +30,9 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Tuple
 
 # Configuration
@@ -27,6 +40,13 @@ MEMORIES_DIR = Path.home() / "Documents/APP_HOME/CascadeProjects/windsurf-projec
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
 DEFAULT_THRESHOLD = 5.0  # Alert if divergence > 5%
+MAX_WORKERS = 8  # projects checked concurrently
+SCROLL_PAGE = 5000  # points per scroll request in --diff (IDs + 2 payload keys only)
+DEFAULT_REPORT = Path.home() / ".claude/mem0_gap_report.json"
+
+# One keep-alive session shared by all project checks
+http_session = requests.Session()
+http_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
 
 # ANSI Colors for output
 GREEN = "\033[92m"
@@ -43,55 +63,32 @@ def get_json_count(project_name: str) -> int:
     if not project_dir.exists():
         return 0
 
-    json_files = list(project_dir.glob("*.json"))
-    return len(json_files)
+    # scandir: no Path objects or intermediate list per file
+    with os.scandir(project_dir) as entries:
+        return sum(1 for entry in entries if entry.name.endswith(".json") and entry.is_file())
 
 
 def get_qdrant_count(project_name: str) -> int:
     """Count vectors in Qdrant for a project"""
     try:
-        offset = None
-        total = 0
-
-        while True:
-            payload = {
+        response = http_session.post(
+            f"http://{QDRANT_HOST}:{QDRANT_PORT}/collections/mem0/points/count",
+            json={
                 "filter": {
                     "must": [
                         {"key": "user_id", "match": {"value": project_name}}
                     ]
                 },
-                "limit": 100,
-                "with_payload": False,
-                "with_vector": False
-            }
-
-            if offset:
-                payload["offset"] = offset
-
-            response = requests.post(
-                f"http://{QDRANT_HOST}:{QDRANT_PORT}/collections/mem0/points/scroll",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
-
-            if response.status_code != 200:
-                print(f"{YELLOW}⚠️  Qdrant query failed for {project_name}: {response.status_code}{RESET}", file=sys.stderr)
-                return -1
+                "exact": True
+            },
+            timeout=5
+        )
 
-            data = response.json()
-            points = data.get('result', {}).get('points', [])
+        if response.status_code != 200:
+            print(f"{YELLOW}⚠️  Qdrant query failed for {project_name}: {response.status_code}{RESET}", file=sys.stderr)
+            return -1
 
-            if not points:
-                break
-
-            total += len(points)
-            offset = data.get('result', {}).get('next_page_offset')
-
-            if not offset:
-                break
-
-        return total
+        return response.json().get('result', {}).get('count', 0)
 
     except requests.exceptions.RequestException as e:
         print(f"{YELLOW}⚠️  Qdrant connection failed: {e}{RESET}", file=sys.stderr)
@@ -157,16 +154,160 @@ def discover_projects() -> List[str]:
         return []
 
     projects = []
-    for item in MEMORIES_DIR.iterdir():
-        if item.is_dir() and not item.name.startswith('.'):
-            # Check if has JSON files
-            json_files = list(item.glob("*.json"))
-            if json_files:
-                projects.append(item.name)
+    with os.scandir(MEMORIES_DIR) as items:
+        for item in items:
+            if item.is_dir() and not item.name.startswith('.'):
+                # Check if has JSON files (stops at the first one)
+                with os.scandir(item.path) as entries:
+                    if any(entry.name.endswith(".json") for entry in entries):
+                        projects.append(item.name)
 
     return sorted(projects)
 
 
+def get_json_ids(project_name: str) -> Dict[str, str]:
+    """{memory ID: file name} of a project's JSON files
+
+    The ID is the file's own "id" field (a renamed or copied file keeps it),
+    the file name stem only when the content has none or cannot be read.
+    """
+    project_dir = MEMORIES_DIR / project_name
+
+    if not project_dir.exists():
+        return {}
+
+    json_ids = {}
+    with os.scandir(project_dir) as entries:
+        for entry in entries:
+            if not (entry.name.endswith(".json") and entry.is_file()):
+                continue
+            try:
+                with open(entry.path, 'r') as f:
+                    memory_id = json.load(f).get("id")
+            except (OSError, ValueError, AttributeError):
+                memory_id = None
+            json_ids[str(memory_id or entry.name[:-5])] = entry.name
+    return json_ids
+
+
+def scroll_point_keys(project_name: str = None):
+    """Yield (point_id, user_id, original_id) for every point of the mem0 collection"""
+    offset = None
+
+    while True:
+        payload = {
+            "limit": SCROLL_PAGE,
+            "with_payload": ["user_id", "original_id"],
+            "with_vector": False
+        }
+        if project_name:
+            payload["filter"] = {"must": [{"key": "user_id", "match": {"value": project_name}}]}
+        if offset is not None:
+            payload["offset"] = offset
+
+        response = http_session.post(
+            f"http://{QDRANT_HOST}:{QDRANT_PORT}/collections/mem0/points/scroll",
+            json=payload,
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Qdrant scroll failed: HTTP {response.status_code}")
+
+        result = response.json().get('result', {})
+        for point in result.get('points', []):
+            point_payload = point.get('payload') or {}
+            yield point['id'], point_payload.get('user_id'), point_payload.get('original_id')
+
+        offset = result.get('next_page_offset')
+        if offset is None:
+            break
+
+
+def diff_project(project_name: str, json_ids: Dict[str, str], points: List[Tuple], threshold: float) -> Dict:
+    """Missing / extra / duplicate sets for one project, in linear time.
+
+    A point stands for the memory in its original_id payload (re-indexed
+    memories get a new point ID), else for the memory with its own ID.
+    """
+    points_by_key = {}
+    for point_id, original_id in points:
+        points_by_key.setdefault(str(original_id or point_id), []).append(point_id)
+
+    missing = sorted(json_ids.keys() - points_by_key.keys())
+    extra = sorted(str(point_id) for key, point_ids in points_by_key.items() if key not in json_ids for point_id in point_ids)
+    duplicates = {key: point_ids for key, point_ids in points_by_key.items() if key in json_ids and len(point_ids) > 1}
+    duplicate_points = sum(len(point_ids) - 1 for point_ids in duplicates.values())
+
+    gaps = len(missing) + len(extra) + duplicate_points
+    divergence = gaps / len(json_ids) * 100 if json_ids else (100.0 if gaps else 0.0)
+
+    if gaps == 0:
+        status = "ok"
+        message = "✅ In sync (IDs)"
+    else:
+        status = "alert" if divergence > threshold else "warning"
+        message = f"{len(missing)} missing, {len(extra)} extra, {duplicate_points} duplicates ({divergence:.1f}%)"
+        if status == "alert":
+            message = "⚠️  " + message
+
+    return {
+        "project": project_name,
+        "json_count": len(json_ids),
+        "qdrant_count": len(points),
+        "missing": len(missing),
+        "extra": len(extra),
+        "duplicates": duplicate_points,
+        "divergence": divergence,
+        "status": status,
+        "message": message,
+        "ids": {"missing": missing, "extra": extra, "duplicates": duplicates,
+                # Missing memories whose file is not {id}.json
+                "files": {memory_id: json_ids[memory_id] for memory_id in missing
+                          if json_ids[memory_id] != f"{memory_id}.json"}}
+    }
+
+
+def diff_projects(projects: List[str], threshold: float = DEFAULT_THRESHOLD, single: bool = False) -> List[Dict]:
+    """ID-level diff of all projects with one scroll of the collection"""
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(projects))) as pool:
+        json_ids = dict(zip(projects, pool.map(get_json_ids, projects)))
+
+    points = {project: [] for project in projects}
+    try:
+        for point_id, user_id, original_id in scroll_point_keys(projects[0] if single else None):
+            # Points of users without JSON files are all extra
+            points.setdefault(user_id or "(no user_id)", []).append((point_id, original_id))
+    except Exception as e:
+        print(f"{YELLOW}⚠️  Qdrant scroll failed: {e}{RESET}", file=sys.stderr)
+        return [{
+            "project": project,
+            "json_count": len(json_ids[project]),
+            "qdrant_count": None,
+            "divergence": None,
+            "status": "error",
+            "message": "Qdrant query failed"
+        } for project in projects]
+
+    return [diff_project(project, json_ids.get(project, {}), project_points, threshold)
+            for project, project_points in points.items()]
+
+
+def write_gap_report(results: List[Dict], report_file: Path):
+    """Write the compact ID report consumed by reindex_missing_memories.py --from-report"""
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "collection": "mem0",
+        "memories_dir": str(MEMORIES_DIR),
+        "projects": {r["project"]: r["ids"] for r in results if "ids" in r}
+    }
+
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = report_file.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(report, f, separators=(',', ':'))
+    tmp_file.replace(report_file)
+
+
 def print_report(results: List[Dict], alert_only: bool = False):
     """Print monitoring report"""
 
@@ -233,6 +374,30 @@ def print_report(results: List[Dict], alert_only: bool = False):
         sys.exit(1)
 
 
+def print_json_report(results: List[Dict], threshold: float, alert_only: bool = False):
+    """Print the report as JSON (same exit code as print_report)"""
+    statuses = [r["status"] for r in results]
+    if alert_only:
+        results = [r for r in results if r["status"] in ["alert", "error"]]
+
+    print(json.dumps({
+        "timestamp": datetime.now().isoformat(),
+        "qdrant": f"{QDRANT_HOST}:{QDRANT_PORT}",
+        "threshold": threshold,
+        "summary": {status: statuses.count(status) for status in ["alert", "error", "warning", "ok"]},
+        "results": [{key: value for key, value in r.items() if key != "ids"} for r in results]
+    }, indent=2))
+
+    if "alert" in statuses or "error" in statuses:
+        sys.exit(1)
+
+
+def check_projects(projects: List[str], threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Check all projects concurrently (results keep the projects' order)"""
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(projects))) as pool:
+        return list(pool.map(lambda project: check_project(project, threshold=threshold), projects))
+
+
 def main():
     """Main monitoring function"""
     import argparse
@@ -243,6 +408,12 @@ def main():
                        help=f'Alert threshold in percent (default: {DEFAULT_THRESHOLD}%)')
     parser.add_argument('--alert-only', action='store_true',
                        help='Only output if gaps found (for cron)')
+    parser.add_argument('--json', action='store_true',
+                       help='Print the report as JSON')
+    parser.add_argument('--diff', action='store_true',
+                       help='Compare memory IDs (missing/extra/duplicates) instead of counts')
+    parser.add_argument('--report', type=Path, default=DEFAULT_REPORT,
+                       help=f'Where --diff writes the ID report (default: {DEFAULT_REPORT})')
     args = parser.parse_args()
 
     # Discover or use specified project
@@ -252,17 +423,26 @@ def main():
         projects = discover_projects()
 
     if not projects:
-        print(f"{RED}❌ No projects found in {MEMORIES_DIR}{RESET}")
+        print(f"{RED}❌ No projects found in {MEMORIES_DIR}{RESET}", file=sys.stderr if args.json else sys.stdout)
         sys.exit(1)
 
-    # Check each project
-    results = []
-    for project in projects:
-        result = check_project(project, threshold=args.threshold)
-        results.append(result)
+    if args.diff:
+        # One scroll for every project, IDs written for reindex_missing_memories.py
+        results = diff_projects(projects, threshold=args.threshold, single=bool(args.project))
+        if any("ids" in r for r in results):
+            write_gap_report(results, args.report)
+            if not args.json and not args.alert_only:
+                print(f"📝 Gap report: {args.report}")
+                print(f"   Repair: reindex_missing_memories.py --from-report {args.report}")
+    else:
+        # Check all projects concurrently
+        results = check_projects(projects, threshold=args.threshold)
 
     # Print report
-    print_report(results, alert_only=args.alert_only)
+    if args.json:
+        print_json_report(results, args.threshold, alert_only=args.alert_only)
+    else:
+        print_report(results, alert_only=args.alert_only)
 
 
 if __name__ == "__main__":
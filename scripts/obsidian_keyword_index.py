@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Obsidian Keyword Index - Local BM25 index over vault chunks
+Written by index_obsidian_vault_direct.py (and so by the watcher), read by
+mem0_mcp_server_local.py (obsidian_search) and search_obsidian.py
+
+Obsidian queries are often exact identifiers (script names, env vars,
+_INDEX.md) that cosine similarity ranks poorly. This index scores them with
+BM25 and is fused with Qdrant vector hits by reciprocal rank fusion (RRF).
+It is a local SQLite file, so keyword search needs no network call at all.
+
+Storage: SQLite (WAL) at ~/.claude/obsidian_keyword_index.db
+- chunks(point_id, file_path, length, payload): same IDs as the Qdrant points
+- postings(term, point_id, tf): inverted index, clustered by term
+"""
+
+import json
+import math
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, namedtuple
+from pathlib import Path
+
+# Configuration
+KEYWORD_DB = Path.home() / ".claude/obsidian_keyword_index.db"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # rank constant of reciprocal rank fusion
+
+# Identifiers keep their dots/dashes/underscores/slashes (index_vault.py, MEM0_API_URL)
+TOKEN_RE = re.compile(r"\w(?:[\w.\-/]*\w)?")
+PART_RE = re.compile(r"[._\-/]+")
+
+Hit = namedtuple("Hit", ["id", "score", "payload"])
+
+def _to_db(point_id: int) -> int:
+    """Qdrant IDs are unsigned 64-bit, SQLite INTEGER is signed"""
+    return point_id - (1 << 64) if point_id >= (1 << 63) else point_id
+
+def _from_db(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+def tokenize(text: str) -> list:
+    """Lowercase, accent-folded tokens; compound identifiers also yield their parts"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+
+    tokens = []
+    for token in TOKEN_RE.findall(text):
+        tokens.append(token)
+        parts = [part for part in PART_RE.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+def rrf_fuse(rankings: list, limit: int = None, k: int = RRF_K) -> list:
+    """Fuse ranked hit lists (each best first) into [Hit] by reciprocal rank"""
+    scores = {}
+    payloads = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, 1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + 1.0 / (k + rank)
+            payloads.setdefault(hit.id, hit.payload)
+
+    fused = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [Hit(point_id, scores[point_id], payloads[point_id]) for point_id in fused]
+
+def collapse_chunk_hits(hits: list, limit: int) -> list:
+    """Keep the best chunk per file (hits are score-ordered): [(hit, matching_chunks)]"""
+    files = {}
+    for hit in hits:
+        file_path = hit.payload.get('file_path', 'unknown')
+        if file_path in files:
+            files[file_path][1] += 1
+        else:
+            files[file_path] = [hit, 1]
+    return [tuple(entry) for entry in files.values()][:limit]
+
+def score_label(rankings: list, mode: str) -> str:
+    """What the hits' scores are: rrf (fused ranks, ~0.03), bm25 (keywords only) or cosine (vectors only)"""
+    if len(rankings) > 1:
+        return "rrf"
+    return "cosine" if mode == "vector" else "bm25"
+
+class KeywordIndex:
+    """BM25 over note chunks, updated one file at a time"""
+
+    def __init__(self, db_file: Path = KEYWORD_DB):
+        self.db_file = Path(db_file)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_file), timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "point_id INTEGER PRIMARY KEY, file_path TEXT NOT NULL, "
+                "length INTEGER NOT NULL, payload TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS chunks_file ON chunks(file_path);"
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "term TEXT NOT NULL, point_id INTEGER NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (term, point_id)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS postings_point ON postings(point_id);"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _delete(self, db: sqlite3.Connection, file_path: str):
+        db.execute(
+            "DELETE FROM postings WHERE point_id IN (SELECT point_id FROM chunks WHERE file_path = ?)",
+            (file_path,)
+        )
+        db.execute("DELETE FROM chunks WHERE file_path = ?", (file_path,))
+
+    def has_file(self, file_path: str) -> bool:
+        with self._lock:
+            row = self._db().execute("SELECT 1 FROM chunks WHERE file_path = ? LIMIT 1", (file_path,)).fetchone()
+        return row is not None
+
+    def replace_file(self, file_path: str, chunks: list):
+        """Replace a file's chunks with [(point_id, text, payload)]"""
+        with self._lock:
+            db = self._db()
+            with db:
+                self._delete(db, file_path)
+                for point_id, text, payload in chunks:
+                    counts = Counter(tokenize(text))
+                    db.execute(
+                        "INSERT OR REPLACE INTO chunks (point_id, file_path, length, payload) VALUES (?, ?, ?, ?)",
+                        (_to_db(point_id), file_path, sum(counts.values()), json.dumps(payload))
+                    )
+                    db.executemany(
+                        "INSERT OR REPLACE INTO postings (term, point_id, tf) VALUES (?, ?, ?)",
+                        [(term, _to_db(point_id), tf) for term, tf in counts.items()]
+                    )
+
+    def remove_files(self, file_paths):
+        with self._lock:
+            db = self._db()
+            with db:
+                for file_path in file_paths:
+                    self._delete(db, file_path)
+
+    def remove_missing(self, keep) -> int:
+        """Drop every file not in keep (a set of file paths). Returns files removed."""
+        with self._lock:
+            known = [row[0] for row in self._db().execute("SELECT DISTINCT file_path FROM chunks")]
+        missing = [file_path for file_path in known if file_path not in keep]
+        self.remove_files(missing)
+        return len(missing)
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """Top chunks for query as [Hit(point_id, bm25_score, payload)], best first"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            db = self._db()
+            total, avg_length = db.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not total:
+                return []
+
+            scores = {}
+            for term in terms:
+                rows = db.execute(
+                    "SELECT p.point_id, p.tf, c.length FROM postings p "
+                    "JOIN chunks c ON c.point_id = p.point_id WHERE p.term = ?",
+                    (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+                for point_id, tf, length in rows:
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[point_id] = scores.get(point_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+            best = sorted(scores, key=scores.get, reverse=True)[:limit]
+            payloads = {}
+            if best:
+                placeholders = ",".join("?" * len(best))
+                for point_id, payload in db.execute(
+                    f"SELECT point_id, payload FROM chunks WHERE point_id IN ({placeholders})", best
+                ):
+                    payloads[point_id] = json.loads(payload)
+
+        return [Hit(_from_db(point_id), scores[point_id], payloads.get(point_id, {})) for point_id in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            chunks, files = self._db().execute("SELECT COUNT(*), COUNT(DISTINCT file_path) FROM chunks").fetchone()
+        return {"chunks": chunks, "files": files}
@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 """
 Obsidian Vault Filesystem Watcher
-Automatically re-indexes Obsidian vault when .md files are created/modified/deleted.
+Automatically re-indexes Obsidian vault when .md files are created/modified/deleted/moved.
+
+Changed, deleted and moved paths are collected from watchdog events and,
+after a debounce, handed to index_obsidian_vault_direct.index_files() in
+process: only those files are re-embedded, points of deleted files are
+removed, moved files keep their vectors under the new path, and the
+OpenAI/Qdrant clients stay warm between events.
 
 Usage:
     python3 obsidian_vault_watcher.py
@@ -11,7 +17,7 @@ Run as LaunchAgent on macOS for automatic startup.
 
 import sys
 import time
-import subprocess
+import threading
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -20,33 +26,65 @@ from watchdog.events import FileSystemEventHandler
 VAULT_PATH = Path.home() / "Documents/APP_HOME/CascadeProjects/windsurf-project/Memories/vault"
 INDEX_SCRIPT = Path.home() / "Documents/APP_HOME/CascadeProjects/windsurf-project/SecondBrain/scripts/index_obsidian_vault_direct.py"
 DEBOUNCE_SECONDS = 2  # Wait 2s after last change before re-indexing
+RETRY_SECONDS = 30  # Wait before retrying paths that failed to index (embedder/Qdrant errors)
+
+def is_indexable(path: str) -> bool:
+    """.md files (generated _INDEX.md included, indexed as INDEX), except Obsidian's own config"""
+    path = Path(path)
+    return path.suffix == '.md' and '.obsidian' not in path.parts
 
 class ObsidianReindexHandler(FileSystemEventHandler):
     """Handler for Obsidian vault file changes"""
 
-    def __init__(self):
+    def __init__(self, indexer):
+        self.indexer = indexer
         self.last_event_time = 0
+        self.retry_after = 0  # No pass before this while retrying failed paths
         self.pending_reindex = False
+        self.changed = set()
+        self.deleted = set()
+        self.moved = []  # (src, dest)
+        self.lock = threading.Lock()  # events arrive on the observer thread
 
     def on_any_event(self, event):
         """Triggered on any file system event"""
-        # Ignore directory events and non-.md files
-        if event.is_directory:
-            return
-
-        if not event.src_path.endswith('.md'):
-            return
+        event_type = event.event_type
+        src_path = event.src_path
+        dest_path = getattr(event, 'dest_path', '')
 
-        # Ignore _INDEX.md files (they're auto-generated)
-        if Path(event.src_path).name == '_INDEX.md':
-            return
+        if event.is_directory:
+            # Only a removed/renamed folder matters: its files' points must go
+            if event_type not in ('deleted', 'moved') or '.obsidian' in Path(src_path).parts:
+                return
+        elif event_type == 'moved':
+            if not (is_indexable(src_path) or is_indexable(dest_path)):
+                return
+        elif event_type in ('created', 'modified', 'deleted'):
+            if not is_indexable(src_path):
+                return
+        else:
+            return  # opened/closed
+
+        with self.lock:
+            if event_type == 'deleted':
+                self.changed.discard(src_path)
+                self.deleted.add(src_path)
+            elif event_type == 'moved':
+                self.changed.discard(src_path)
+                self.deleted.discard(dest_path)
+                self.moved.append((src_path, dest_path))
+            else:
+                self.deleted.discard(src_path)
+                self.changed.add(src_path)
 
-        # Mark for reindex
-        self.last_event_time = time.time()
-        self.pending_reindex = True
+            # Mark for reindex (a new event also ends a retry wait)
+            self.last_event_time = time.time()
+            self.retry_after = 0
+            self.pending_reindex = True
 
-        event_type = event.event_type
-        file_name = Path(event.src_path).name
+        file_name = Path(src_path).name
+        if event_type == 'moved':
+            file_name += f" → {Path(dest_path).name}"
         print(f"📝 [{event_type}] {file_name}", file=sys.stderr)
 
     def check_and_reindex(self):
@@ -55,37 +93,48 @@ class ObsidianReindexHandler(FileSystemEventHandler):
             return
 
         # Wait for debounce period
-        if time.time() - self.last_event_time < DEBOUNCE_SECONDS:
+        if time.time() - self.last_event_time < DEBOUNCE_SECONDS or time.time() < self.retry_after:
             return
 
-        # Trigger re-indexation
-        print(f"\n🔄 Re-indexing Obsidian vault...", file=sys.stderr)
+        with self.lock:
+            changed, deleted, moved = self.changed, self.deleted, self.moved
+            self.changed, self.deleted, self.moved = set(), set(), []
+            self.pending_reindex = False
+
+        # Trigger re-indexation of just these paths
+        print(f"\n🔄 Re-indexing {len(changed)} changed, {len(deleted)} deleted, "
+              f"{len(moved)} moved...", file=sys.stderr)
         try:
-            result = subprocess.run(
-                ["python3", str(INDEX_SCRIPT)],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-
-            if result.returncode == 0:
-                # Extract indexed count from output
-                for line in result.stdout.split('\n'):
-                    if 'indexed successfully' in line:
-                        print(f"✅ {line.strip()}", file=sys.stderr)
-                        break
-                else:
-                    print(f"✅ Re-indexation completed", file=sys.stderr)
+            stats = self.indexer.index_files(VAULT_PATH, changed=changed, deleted=deleted, moved=moved)
+
+            if stats is None:
+                print(f"❌ Re-indexation failed: OpenAI/Qdrant unavailable", file=sys.stderr)
+            elif stats['errors']:
+                print(f"⚠️  Re-indexation completed with {stats['errors']} errors "
+                      f"({stats['embedded']} embedded, {stats['deleted']} deleted)", file=sys.stderr)
             else:
-                print(f"❌ Re-indexation failed: {result.stderr}", file=sys.stderr)
+                print(f"✅ Re-indexed: {stats['embedded']} embedded, {stats['moved']} moved, "
+                      f"{stats['deleted']} deleted, {stats['skipped']} unchanged", file=sys.stderr)
+
+            if stats is None:
+                self.requeue(changed, deleted, moved)
+            elif stats.get('failed'):
+                # Not in the manifest: retry them (index_files removes those that are gone)
+                print(f"🔁 Retrying {len(stats['failed'])} path(s) in {RETRY_SECONDS}s", file=sys.stderr)
+                self.requeue({str(VAULT_PATH / rel_path) for rel_path in stats['failed']}, set(), [])
 
-        except subprocess.TimeoutExpired:
-            print(f"⚠️  Re-indexation timeout (>60s)", file=sys.stderr)
         except Exception as e:
             print(f"❌ Re-indexation error: {e}", file=sys.stderr)
+            self.requeue(changed, deleted, moved)
 
-        # Reset state
-        self.pending_reindex = False
+    def requeue(self, changed, deleted, moved):
+        """Keep the paths for a retry in RETRY_SECONDS, unless an event comes first (newer events win)"""
+        with self.lock:
+            self.changed |= changed - self.deleted
+            self.deleted |= deleted - self.changed
+            self.moved = moved + self.moved
+            self.retry_after = time.time() + RETRY_SECONDS
+            self.pending_reindex = True
 
 def main():
     """Main watcher loop"""
@@ -99,13 +148,19 @@ def main():
         print(f"❌ Index script not found: {INDEX_SCRIPT}", file=sys.stderr)
         sys.exit(1)
 
+    # Import the indexer in process; clients are created once and kept warm
+    sys.path.insert(0, str(INDEX_SCRIPT.parent))
+    import index_obsidian_vault_direct as indexer
+    if not indexer.init_clients():
+        sys.exit(1)
+
     print(f"🚀 Obsidian Vault Watcher starting...", file=sys.stderr)
     print(f"   Watching: {VAULT_PATH}", file=sys.stderr)
     print(f"   Debounce: {DEBOUNCE_SECONDS}s", file=sys.stderr)
     print(f"", file=sys.stderr)
 
     # Create handler and observer
-    handler = ObsidianReindexHandler()
+    handler = ObsidianReindexHandler(indexer)
     observer = Observer()
     observer.schedule(handler, str(VAULT_PATH), recursive=True)
     observer.start()
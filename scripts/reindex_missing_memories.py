@@ -2,20 +2,35 @@
 """
 Re-index Missing Memories to Qdrant
 Only migrates memories that are NOT already in Qdrant (avoids duplicates)
+
+With --from-report, the missing IDs come from the gap report written by
+monitor_memory_gaps.py --diff: only those JSON files are read, and Qdrant
+is not scrolled again.
+
+With --direct, no LLM is involved: the stored memory text is embedded in
+concurrent batches and upserted with its original ID and a Mem0-compatible
+payload (mem0_points.py). Memories whose ID or original_id is already in
+Qdrant are skipped, and re-runs overwrite the same points, never duplicate.
 """
 
 import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from mem0 import Memory
 import requests
+from embedders import get_embedder
+from mem0_points import (MEM0_COLLECTION, point_id, memory_point, ensure_collection,
+                         upsert_points, existing_memory_ids, estimate_batch_tokens, embedding_cost)
 
 # Configuration
 MEMORIES_DIR = Path.home() / "Documents/APP_HOME/CascadeProjects/windsurf-project/Memories/memories"
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
+DIRECT_BATCH = 100  # memories per embedding request + upsert (--direct)
+DIRECT_WORKERS = 4  # batches in flight (--direct)
 
 # Load OpenAI API key
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
@@ -58,13 +73,24 @@ config = {
     }
 }
 
-print("🔧 Initializing Mem0 with Qdrant...")
-try:
-    memory = Memory.from_config(config)
-    print(f"✅ Mem0 initialized (Qdrant: {QDRANT_HOST}:{QDRANT_PORT})")
-except Exception as e:
-    print(f"❌ Failed to initialize Mem0: {e}")
-    sys.exit(1)
+memory = None
+
+def init_memory():
+    """Initialize Mem0 on first use (--direct and --dry-run never need it)"""
+    global memory
+    if memory is not None:
+        return memory
+
+    from mem0 import Memory
+
+    print("🔧 Initializing Mem0 with Qdrant...")
+    try:
+        memory = Memory.from_config(config)
+        print(f"✅ Mem0 initialized (Qdrant: {QDRANT_HOST}:{QDRANT_PORT})")
+    except Exception as e:
+        print(f"❌ Failed to initialize Mem0: {e}")
+        sys.exit(1)
+    return memory
 
 def get_existing_ids_from_qdrant(project_name: str) -> set:
     """Get all existing memory IDs from Qdrant for a project"""
@@ -107,6 +133,10 @@ def get_existing_ids_from_qdrant(project_name: str) -> set:
 
             for point in points:
                 existing_ids.add(point['id'])
+                # Mem0 gives re-added memories new point IDs, the JSON ID is in original_id
+                original_id = (point.get('payload') or {}).get('original_id')
+                if original_id:
+                    existing_ids.add(original_id)
 
             offset = data.get('result', {}).get('next_page_offset')
             if not offset:
@@ -119,15 +149,30 @@ def get_existing_ids_from_qdrant(project_name: str) -> set:
     print(f"   Found {len(existing_ids)} existing vectors in Qdrant")
     return existing_ids
 
-def reindex_project(project_name: str, dry_run: bool = False):
-    """Re-index missing memories for a project"""
+def load_gap_report(report_file: Path) -> dict:
+    """{project: [JSON file names of the missing memories]} from monitor_memory_gaps.py --diff"""
+    with open(report_file, 'r') as f:
+        report = json.load(f)
+
+    print(f"📝 Gap report: {report_file} (generated {report.get('generated_at', '?')})")
+    # Files are named {id}.json unless the report says otherwise
+    return {project: [ids.get('files', {}).get(memory_id, f"{memory_id}.json") for memory_id in ids['missing']]
+            for project, ids in report.get('projects', {}).items()
+            if ids.get('missing')}
+
+def reindex_project(project_name: str, dry_run: bool = False, missing_files: list = None):
+    """Re-index missing memories for a project (only missing_files when given)"""
     project_dir = MEMORIES_DIR / project_name
 
     if not project_dir.exists():
         print(f"⚠️  Project directory not found: {project_dir}")
         return 0, 0, 0
 
-    json_files = list(project_dir.glob("*.json"))
+    if missing_files is not None:
+        # Memories already diffed against Qdrant
+        json_files = [project_dir / file_name for file_name in missing_files]
+    else:
+        json_files = list(project_dir.glob("*.json"))
 
     if not json_files:
         print(f"⚠️  No JSON files found in {project_name}")
@@ -136,8 +181,8 @@ def reindex_project(project_name: str, dry_run: bool = False):
     print(f"\n📦 Processing project: {project_name}")
     print(f"   Found {len(json_files)} JSON files")
 
-    # Get existing IDs from Qdrant
-    existing_ids = get_existing_ids_from_qdrant(project_name)
+    # Get existing IDs from Qdrant (the gap report already excludes them)
+    existing_ids = set() if missing_files is not None else get_existing_ids_from_qdrant(project_name)
 
     success_count = 0
     skip_count = 0
@@ -169,7 +214,7 @@ def reindex_project(project_name: str, dry_run: bool = False):
                 success_count += 1
             else:
                 # Add to Qdrant via Mem0
-                result = memory.add(memory_text, user_id=project_name, metadata={
+                result = init_memory().add(memory_text, user_id=project_name, metadata={
                     'source': 'reindex',
                     'original_id': memory_id,
                     'created_at': memory_data.get('created_at', ''),
@@ -189,6 +234,109 @@ def reindex_project(project_name: str, dry_run: bool = False):
 
     return success_count, skip_count, error_count
 
+def load_pending(project_name: str, session, missing_files: list = None):
+    """(pending [memory_data], skipped, errors) for one project in --direct mode"""
+    project_dir = MEMORIES_DIR / project_name
+
+    if not project_dir.exists():
+        print(f"⚠️  Project directory not found: {project_dir}")
+        return [], 0, 0
+
+    if missing_files is not None:
+        json_files = [project_dir / file_name for file_name in missing_files]
+        existing = set()
+    else:
+        json_files = list(project_dir.glob("*.json"))
+        try:
+            existing = existing_memory_ids(session, project_name)
+        except Exception as e:
+            # Without the existing IDs a run would still be idempotent, just not cheap
+            print(f"⚠️  Error fetching from Qdrant: {e}")
+            existing = set()
+
+    print(f"\n📦 Processing project: {project_name}")
+    print(f"   Found {len(json_files)} JSON files, {len(existing)} IDs in Qdrant")
+
+    pending = []
+    skip_count = 0
+    error_count = 0
+    for json_file in json_files:
+        try:
+            with open(json_file, 'r') as f:
+                memory_data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ❌ Error: {json_file.name} - {e}")
+            error_count += 1
+            continue
+
+        memory_id = str(memory_data.get('id') or json_file.stem)
+        memory_data['id'] = memory_id
+        if not memory_data.get('memory'):
+            print(f"   ⚠️  Empty memory: {json_file.name}")
+            error_count += 1
+        elif memory_id in existing or point_id(project_name, memory_id) in existing:
+            skip_count += 1
+        else:
+            pending.append(memory_data)
+
+    print(f"   {len(pending)} to embed, {skip_count} already in Qdrant")
+    return pending, skip_count, error_count
+
+def reindex_direct(projects: list, dry_run: bool = False, gap_report: dict = None):
+    """Batch-embed + upsert missing memories without Mem0's LLM. Returns (success, skipped, errors)"""
+    session = requests.Session()
+    embedder = get_embedder()
+    collection = embedder.collection(MEM0_COLLECTION)
+
+    jobs = []
+    total_skipped = 0
+    total_errors = 0
+    for project in projects:
+        missing_files = gap_report.get(project, []) if gap_report is not None else None
+        pending, skipped, errors = load_pending(project, session, missing_files)
+        total_skipped += skipped
+        total_errors += errors
+        for i in range(0, len(pending), DIRECT_BATCH):
+            jobs.append((project, pending[i:i + DIRECT_BATCH]))
+
+    tokens = estimate_batch_tokens(data['memory'] for _, batch in jobs for data in batch)
+    count = sum(len(batch) for _, batch in jobs)
+
+    if dry_run:
+        print(f"\n🔍 Would embed {count} memories in {len(jobs)} batches "
+              f"(~{tokens} tokens, ~${embedding_cost(tokens):.6f} with {embedder.name})")
+        return count, total_skipped, total_errors
+    if not jobs:
+        return 0, total_skipped, total_errors
+
+    ensure_collection(session, embedder.dim, collection)
+
+    def run(job):
+        project, batch = job
+        vectors = embedder.embed_batch([data['memory'] for data in batch])
+        upsert_points(session, [memory_point(project, data, vector)
+                                for data, vector in zip(batch, vectors)], collection)
+        return len(batch)
+
+    print(f"\n🚀 Embedding {count} memories: {len(jobs)} batches, {DIRECT_WORKERS} in flight ({embedder.name} → {collection})")
+    start = time.time()
+    success_count = 0
+    with ThreadPoolExecutor(max_workers=DIRECT_WORKERS) as pool:
+        futures = {pool.submit(run, job): job for job in jobs}
+        for future in as_completed(futures):
+            project, batch = futures[future]
+            try:
+                success_count += future.result()
+                print(f"   ✓ {success_count}/{count} upserted")
+            except Exception as e:
+                print(f"   ❌ Batch of {len(batch)} ({project}) failed: {e}")
+                total_errors += len(batch)
+
+    duration = time.time() - start
+    print(f"⚡ Throughput: {success_count / duration if duration else 0:.1f} memories/s "
+          f"| ~{tokens} tokens, ~${embedding_cost(tokens):.6f} embeddings, 0 LLM calls")
+    return success_count, total_skipped, total_errors
+
 def main():
     """Main re-indexing function"""
     import argparse
@@ -197,6 +345,10 @@ def main():
     parser.add_argument('--project', help='Re-index specific project only')
     parser.add_argument('--dry-run', action='store_true', help='Dry run (no actual migration)')
     parser.add_argument('--yes', '-y', action='store_true', help='Skip confirmation prompt')
+    parser.add_argument('--from-report', type=Path, metavar='PATH',
+                        help='Only re-index the missing IDs of a monitor_memory_gaps.py --diff report')
+    parser.add_argument('--direct', action='store_true',
+                        help='Embed + upsert stored memories with their IDs (no LLM, concurrent batches)')
     args = parser.parse_args()
 
     print("=" * 70)
@@ -204,13 +356,29 @@ def main():
     print("=" * 70)
     print(f"Source: {MEMORIES_DIR}")
     print(f"Target: Qdrant ({QDRANT_HOST}:{QDRANT_PORT})")
-    print(f"Strategy: Skip existing IDs, add only missing memories")
+    if args.direct:
+        print("Path: direct (batch embeddings, original IDs, no LLM extraction)")
+    if args.from_report:
+        print(f"Strategy: Missing IDs from {args.from_report}")
+    else:
+        print(f"Strategy: Skip existing IDs, add only missing memories")
     if args.dry_run:
         print("Mode: DRY RUN (no changes)")
     print("=" * 70)
 
     # Discover projects
-    if args.project:
+    gap_report = None
+    if args.from_report:
+        try:
+            gap_report = load_gap_report(args.from_report)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read gap report: {e}")
+            sys.exit(1)
+        projects = [args.project] if args.project else sorted(gap_report)
+        if not projects:
+            print("✅ Gap report has no missing memories")
+            sys.exit(0)
+    elif args.project:
         projects = [args.project]
     else:
         projects = [d.name for d in MEMORIES_DIR.iterdir()
@@ -233,11 +401,15 @@ def main():
 
     start_time = datetime.now()
 
-    for project in projects:
-        success, skipped, errors = reindex_project(project, dry_run=args.dry_run)
-        total_success += success
-        total_skipped += skipped
-        total_errors += errors
+    if args.direct:
+        total_success, total_skipped, total_errors = reindex_direct(projects, args.dry_run, gap_report)
+    else:
+        for project in projects:
+            missing_files = gap_report.get(project, []) if gap_report is not None else None
+            success, skipped, errors = reindex_project(project, dry_run=args.dry_run, missing_files=missing_files)
+            total_success += success
+            total_skipped += skipped
+            total_errors += errors
 
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
@@ -250,7 +422,7 @@ def main():
     print(f"⏭️  Skipped (already exist): {total_skipped}")
     print(f"❌ Errors: {total_errors}")
     print(f"⏱️  Duration: {duration:.2f}s")
-    if total_success > 0:
+    if total_success > 0 and not args.direct:
         print(f"💰 Estimated OpenAI cost: ~${(total_success * 0.000002):.4f}")
     print("=" * 70)
 
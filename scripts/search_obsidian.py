@@ -1,60 +1,102 @@
 #!/usr/bin/env python3
 """
 Search in Obsidian vault Qdrant collection.
+
+Hybrid by default: local BM25 keyword hits fused with vector hits by
+reciprocal rank. Falls back to keywords alone if the embedding API fails.
+
+Usage:
+    python3 search_obsidian.py <query>            # hybrid
+    python3 search_obsidian.py --keyword <query>  # local BM25 only, no network
+    python3 search_obsidian.py --vector <query>   # embeddings only
 """
 
 import sys
-from openai import OpenAI
-from qdrant_client import QdrantClient
-import os
+from embedding_cache import EmbeddingCache
+from obsidian_keyword_index import KeywordIndex, collapse_chunk_hits, rrf_fuse, score_label
+from embedders import get_embedder
 
 # Configuration
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
-COLLECTION_NAME = "obsidian_vault"
-EMBEDDING_MODEL = "text-embedding-3-small"
-
-# OpenAI API Key
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
-if not OPENAI_API_KEY:
-    env_file = os.path.expanduser("~/.claude/.env")
-    if os.path.exists(env_file):
-        for line in open(env_file):
-            if line.startswith('OPENAI_API_KEY='):
-                OPENAI_API_KEY = line.split('=', 1)[1].strip()
-                break
-
-# Initialize
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-qdrant_client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
-
-def search(query, limit=5):
-    """Search in Obsidian vault."""
-    # Create embedding
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=query
+CHUNK_FETCH = 4  # chunk hits fetched per requested file, collapsed per file
+EMBED_TIMEOUT = 5  # seconds for the query embedding before falling back to keywords
+
+# Created on first vector search, so --keyword needs neither an embedder nor Qdrant
+embedder = None
+qdrant_client = None
+COLLECTION_NAME = None
+embedding_cache = EmbeddingCache()  # shared with the MCP server (~/.claude/embedding_cache.db)
+keyword_index = KeywordIndex()  # written by index_obsidian_vault_direct.py
+
+def init_clients():
+    """Embedder (EMBEDDING_BACKEND picks OpenAI or a local model, each with its own collection) and Qdrant"""
+    global embedder, qdrant_client, COLLECTION_NAME
+    if embedder is None:
+        from qdrant_client import QdrantClient
+        embedder = get_embedder()
+        COLLECTION_NAME = embedder.collection("obsidian_vault")
+        qdrant_client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+
+def vector_hits(query, limit):
+    """Chunk hits from Qdrant for the query embedding."""
+    init_clients()
+
+    # Create embedding (cached by model + normalized text)
+    query_vector = embedding_cache.get_or_create(
+        embedder.name, query,
+        lambda text: embedder.embed_batch([text], timeout=EMBED_TIMEOUT)[0]
     )
-    query_vector = response.data[0].embedding
 
-    # Search
-    results = qdrant_client.query_points(
+    return qdrant_client.query_points(
         collection_name=COLLECTION_NAME,
         query=query_vector,
         limit=limit
     ).points
 
-    print(f"\nFound {len(results)} results for: '{query}'\n")
+def search(query, limit=5, mode="hybrid"):
+    """Search in Obsidian vault."""
+    fetch = limit * CHUNK_FETCH
+    rankings = []
+
+    # Keyword hits from the local BM25 index (no network call)
+    if mode != "vector":
+        rankings.append(keyword_index.search(query, fetch))
+
+    if mode != "keyword":
+        try:
+            rankings.append(vector_hits(query, fetch))
+        except Exception as e:
+            if mode == "vector":
+                raise
+            print(f"⚠️  Vector search unavailable ({e}) - keyword results only")
+
+    # Fuse by reciprocal rank, then one result per file
+    hits = rrf_fuse(rankings) if len(rankings) > 1 else rankings[0]
+    results = collapse_chunk_hits(hits, limit)
+    label = score_label(rankings, mode)
+
+    print(f"\nFound {len(results)} results for: '{query}' ({mode})\n")
     print("="*70)
 
-    for i, hit in enumerate(results, 1):
+    for i, (hit, matches) in enumerate(results, 1):
         payload = hit.payload
-        print(f"\n{i}. [{hit.score:.3f}] {payload['file_path']}")
+        print(f"\n{i}. [{label} {hit.score:.3f}] {payload['file_path']}")
         print(f"   Type: {payload['file_type']} | Project: {payload['project_id']}")
+        if payload.get('heading_path'):
+            print(f"   Section: {' > '.join(payload['heading_path'])}")
+        if 'char_start' in payload:
+            print(f"   Chars: {payload['char_start']}-{payload['char_end']} ({matches} matching chunks)")
         print(f"   Preview: {payload['content_preview'][:200]}...")
 
     print("\n" + "="*70)
 
 if __name__ == "__main__":
-    query = " ".join(sys.argv[1:]) if len(sys.argv) > 1 else "_INDEX.md vides"
-    search(query, limit=10)
+    args = sys.argv[1:]
+    mode = "hybrid"
+    for flag in ("--keyword", "--vector"):
+        if flag in args:
+            args.remove(flag)
+            mode = flag[2:]
+    query = " ".join(args) if args else "_INDEX.md vides"
+    search(query, limit=10, mode=mode)
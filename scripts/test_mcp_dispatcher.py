@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for mcp_dispatcher.py: cancellation and JSON-RPC id reuse.
+
+stdin is replaced by a scripted reader whose lines can wait for an event,
+so each interleaving of worker threads and the asyncio loop is reproduced
+deterministically.
+
+    python3 -m unittest test_mcp_dispatcher
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+import mcp_dispatcher
+from mcp_dispatcher import run_dispatcher, write_message
+
+def call(request_id, n, **params) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call", "params": dict(params, n=n)}
+
+def cancel(request_id) -> dict:
+    return {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": request_id}}
+
+class ScriptedStdin:
+    """readline() returns each (message, wait) in turn; wait is an Event or a delay"""
+
+    def __init__(self, script: list):
+        self.script = list(script)
+
+    def readline(self) -> str:
+        if not self.script:
+            return ""
+        message, wait = self.script.pop(0)
+        if isinstance(wait, threading.Event):
+            wait.wait(timeout=5)
+        elif wait:
+            time.sleep(wait)
+        return json.dumps(message) + "\n"
+
+def handle(message: dict):
+    params = message.get("params") or {}
+    time.sleep(params.get("sleep", 0))
+    write_message({"jsonrpc": "2.0", "id": message["id"], "result": {"n": params["n"]}})
+
+class DispatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        mcp_dispatcher._answered.clear()
+        mcp_dispatcher._cancelled.clear()
+
+    def serve(self, script: list) -> list:
+        stdout = io.StringIO()
+        with mock.patch.object(sys, "stdin", ScriptedStdin(script)), \
+             mock.patch.object(sys, "stdout", stdout):
+            run_dispatcher(handle, max_workers=2)
+        return [json.loads(line)["result"]["n"] for line in stdout.getvalue().splitlines()]
+
+    def test_reuse_id_after_late_cancel(self):
+        # The cancel for id 1 is read after its handler returned but before the
+        # loop has forgotten the request: it must not swallow the next id-1 answer
+        handler_returned = threading.Event()
+        run_handler = mcp_dispatcher._run_handler
+
+        def slow_to_finish(handle_message, message):
+            run_handler(handle_message, message)
+            if message["params"]["n"] == "a":
+                handler_returned.set()
+                time.sleep(0.2)  # Keep the future running while the cancel is handled
+
+        with mock.patch.object(mcp_dispatcher, "_run_handler", slow_to_finish):
+            out = self.serve([
+                (call(1, "a"), None),
+                (cancel(1), handler_returned),
+                (call(1, "b"), 0.4),
+            ])
+        self.assertEqual(out, ["a", "b"])
+        self.assertEqual(mcp_dispatcher._cancelled, set())
+
+    def test_cancel_running_request_suppresses_response(self):
+        out = self.serve([
+            (call(2, "c", sleep=0.3), None),
+            (cancel(2), 0.1),
+            (call(2, "d"), 0.4),
+        ])
+        self.assertEqual(out, ["d"])
+
+if __name__ == "__main__":
+    unittest.main()
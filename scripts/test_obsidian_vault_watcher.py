@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for obsidian_vault_watcher.py: per-path re-indexing through
+index_obsidian_vault_direct.index_files(), against an embedded in-memory
+Qdrant and the hash embedder (no network).
+
+    python3 -m unittest test_obsidian_vault_watcher
+"""
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from qdrant_client import QdrantClient
+from watchdog.events import FileCreatedEvent, FileDeletedEvent
+
+import index_obsidian_vault_direct as indexer
+import obsidian_vault_watcher as watcher
+from embedders import HashEmbedder
+from obsidian_keyword_index import KeywordIndex
+
+class FlakyEmbedder(HashEmbedder):
+    """Hash embedder that raises while `failing` is set"""
+
+    failing = False
+
+    def embed_batch(self, texts, timeout=None):
+        if self.failing:
+            raise RuntimeError("embeddings API down")
+        return super().embed_batch(texts, timeout)
+
+class WatcherReindexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.vault = self.tmp / "vault"
+        self.vault.mkdir()
+
+        self.embedder = FlakyEmbedder(dim=32)
+        indexer.embedder = self.embedder
+        indexer.qdrant_client = QdrantClient(location=":memory:")
+        indexer.COLLECTION_NAME = self.embedder.collection(indexer.BASE_COLLECTION)
+        indexer.EMBEDDING_MODEL = self.embedder.name
+        indexer.EMBEDDING_DIM = self.embedder.dim
+        indexer.MANIFEST_FILE = self.tmp / "manifest.json"
+        indexer.keyword_index = KeywordIndex(self.tmp / "keywords.db")
+        watcher.VAULT_PATH = self.vault
+
+        self.handler = watcher.ObsidianReindexHandler(indexer)
+
+    def points(self) -> list:
+        records, _ = indexer.qdrant_client.scroll(collection_name=indexer.COLLECTION_NAME, limit=100)
+        return sorted(record.payload['file_path'] for record in records)
+
+    def reindex_now(self):
+        """Run the debounced pass without waiting for the debounce / retry delay"""
+        self.handler.last_event_time = 0
+        self.handler.retry_after = 0
+        self.handler.check_and_reindex()
+
+    def write_note(self, name: str, text: str) -> str:
+        path = self.vault / name
+        path.write_text(text)
+        self.handler.on_any_event(FileCreatedEvent(str(path)))
+        return str(path)
+
+    def test_embedding_failure_is_retried(self):
+        path = self.write_note("note.md", "# Note\n\nQdrant backup guide\n")
+
+        self.embedder.failing = True
+        self.reindex_now()
+        self.assertEqual(self.points(), [])
+        self.assertTrue(self.handler.pending_reindex)
+        self.assertIn(path, self.handler.changed)
+        self.assertGreater(self.handler.retry_after, time.time())
+
+        self.embedder.failing = False
+        self.reindex_now()
+        self.assertEqual(self.points(), ["note.md"])
+        self.assertFalse(self.handler.pending_reindex)
+        self.assertIn("note.md", indexer.load_manifest())
+
+    def test_index_notes_are_indexed_and_removed(self):
+        path = self.write_note("_INDEX.md", "# Index\n\n- [[note]]\n")
+        self.reindex_now()
+        self.assertEqual(self.points(), ["_INDEX.md"])
+        records, _ = indexer.qdrant_client.scroll(collection_name=indexer.COLLECTION_NAME, limit=1)
+        self.assertEqual(records[0].payload['file_type'], "INDEX")
+
+        Path(path).unlink()
+        self.handler.on_any_event(FileDeletedEvent(path))
+        self.reindex_now()
+        self.assertEqual(self.points(), [])
+
+if __name__ == "__main__":
+    unittest.main()